@@ -4,7 +4,7 @@ import os
 from PyQt5.QtWidgets import QApplication
 from pictocode.ui.main_window import MainWindow
 from pictocode.bug_report import install_excepthook
-from pictocode.logger import setup_logging
+from pictocode.logger import setup_logging, shutdown_logging
 
 
 def main():
@@ -18,7 +18,9 @@ def main():
     app = QApplication(sys.argv)
     win = MainWindow()
     win.show()
-    sys.exit(app.exec_())
+    code = app.exec_()
+    shutdown_logging()
+    sys.exit(code)
 
 
 if __name__ == "__main__":
@@ -6,7 +6,7 @@ from PyQt5.QtGui import QPixmap, QPainter, QColor, QFont
 from PyQt5.QtCore import Qt, QSettings
 from pictocode.ui.main_window import MainWindow
 from pictocode.bug_report import install_excepthook
-from pictocode.logger import setup_logging
+from pictocode.logger import setup_logging, shutdown_logging
 
 
 def main():
@@ -40,7 +40,9 @@ def main():
     if splash:
         splash.finish(window)
     window.show()
-    sys.exit(app.exec_())
+    code = app.exec_()
+    shutdown_logging()
+    sys.exit(code)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,432 @@
+# pictocode/assets.py
+"""
+Magasin d'images adressé par contenu.
+
+Chaque image est identifiée par le condensat SHA-256 de son contenu ; le
+même fichier inséré plusieurs fois, ou présent dans plusieurs projets,
+n'est enregistré qu'une fois. Un blob est adossé soit à un fichier du
+disque, soit à une entrée d'archive ``.ptc`` lue à la demande : ouvrir un
+projet n'extrait plus rien dans un répertoire temporaire.
+
+Les images ne sont décodées qu'au premier affichage, sur un thread de
+travail, puis partagées entre tous les ``ImageItem`` qui les affichent
+sous forme de pyramide (pleine résolution puis moitiés successives). Les
+versions lissées à la taille exacte d'affichage sont elles aussi
+calculées hors du thread GUI. Le tout est gardé dans un cache LRU borné
+par :attr:`AssetStore.budget` : au-delà, les images qui ne sont visibles
+dans aucune vue sont libérées. Le magasin est partagé par le canvas, le
+chargeur et l'écriture des archives via l'instance :data:`store`.
+"""
+
+import hashlib
+import logging
+import os
+import re
+import threading
+import weakref
+import zipfile
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from PyQt5.QtCore import (
+    QBuffer,
+    QByteArray,
+    QObject,
+    QRunnable,
+    QSize,
+    QThreadPool,
+    Qt,
+    pyqtSignal,
+)
+from PyQt5.QtGui import QImage, QImageReader
+
+logger = logging.getLogger(__name__)
+
+_READ_CHUNK = 1024 * 1024
+# octets lus pour connaître les dimensions d'une image sans la décoder
+_HEADER_BYTES = 64 * 1024
+# mémoire allouée par défaut aux images décodées
+DEFAULT_BUDGET = 256 * 1024 * 1024
+# plus petit côté d'un niveau de la pyramide
+MIN_MIP_SIZE = 32
+# entrée d'archive nommée d'après son condensat (images/<sha256>.<ext>)
+_HASHED_NAME = re.compile(r"^images/([0-9a-f]{64})(\.[^/]*)?$")
+
+# (chemin, taille, date de modification) -> condensat du contenu
+_digests: dict = {}
+_digests_lock = threading.Lock()
+
+
+def file_digest(path: str) -> str:
+    """Condensat SHA-256 du fichier, mis en cache tant qu'il est inchangé."""
+    st = os.stat(path)
+    key = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+    with _digests_lock:
+        digest = _digests.get(key)
+    if digest is None:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(_READ_CHUNK), b""):
+                h.update(block)
+        digest = h.hexdigest()
+        with _digests_lock:
+            _digests[key] = digest
+    return digest
+
+
+class Asset:
+    """Blob d'image : fichier du disque ou entrée d'archive."""
+
+    __slots__ = ("digest", "ext", "path", "archive", "member", "size")
+
+    def __init__(self, digest, ext, path=None, archive=None, member=None):
+        self.digest = digest
+        self.ext = ext
+        self.path = path
+        self.archive = archive
+        self.member = member
+        # dimensions en pixels, lues à la demande (voir ``image_size``)
+        self.size = None
+
+    @property
+    def entry_name(self) -> str:
+        """Nom de l'entrée dans une archive ``.ptc``."""
+        return f"images/{self.digest}{self.ext}"
+
+    def open(self):
+        """Flux binaire du contenu (fichier ou entrée d'archive)."""
+        if self.path is not None:
+            return open(self.path, "rb")
+        zf = zipfile.ZipFile(self.archive, "r")
+        try:
+            names = set(zf.namelist())
+            # l'archive a pu être réenregistrée sous les noms par condensat
+            for name in (self.member, self.entry_name):
+                if name in names:
+                    # le flux garde l'archive ouverte jusqu'à sa fermeture
+                    return zf.open(name)
+        finally:
+            zf.close()
+        raise FileNotFoundError(f"{self.member} absent de {self.archive}")
+
+    def read(self) -> bytes:
+        with self.open() as f:
+            return f.read()
+
+
+def build_mipmaps(image: QImage) -> list[QImage]:
+    """Pyramide de ``image`` : pleine résolution puis moitiés successives."""
+    image = image.convertToFormat(QImage.Format_ARGB32_Premultiplied)
+    levels = [image]
+    while min(image.width(), image.height()) >= 2 * MIN_MIP_SIZE:
+        image = image.scaled(
+            image.width() // 2,
+            image.height() // 2,
+            Qt.IgnoreAspectRatio,
+            Qt.SmoothTransformation,
+        )
+        levels.append(image)
+    return levels
+
+
+def _image_cost(image: QImage) -> int:
+    return image.bytesPerLine() * image.height()
+
+
+def _on_screen(item) -> bool:
+    """Vrai si ``item`` est visible dans l'une des vues de sa scène."""
+    try:
+        scene = item.scene()
+        if scene is None or not item.isVisible():
+            return False
+        rect = item.sceneBoundingRect()
+    except RuntimeError:  # élément Qt déjà détruit
+        return False
+    for view in scene.views():
+        area = view.mapToScene(view.viewport().rect()).boundingRect()
+        if area.intersects(rect):
+            return True
+    return False
+
+
+def _decode(asset: Asset) -> list[QImage]:
+    """Pyramide de l'image, vide si elle est illisible."""
+    try:
+        image = QImage.fromData(asset.read())
+    except OSError:
+        logger.warning(f"Image {asset.digest[:12]} is unavailable")
+        return []
+    return [] if image.isNull() else build_mipmaps(image)
+
+
+class _Notifier(QObject):
+    """Ramène sur le thread GUI les résultats des tâches de fond."""
+
+    ready = pyqtSignal(object, object)
+
+
+class _DecodeTask(QRunnable):
+    """Décode une image et construit sa pyramide."""
+
+    def __init__(self, asset: Asset, notifier: _Notifier):
+        super().__init__()
+        self.asset = asset
+        self.notifier = notifier
+
+    def run(self):
+        self.notifier.ready.emit(self.asset.digest, _decode(self.asset))
+
+
+class _ScaleTask(QRunnable):
+    """Redimensionne une image avec lissage à sa taille d'affichage."""
+
+    def __init__(self, key, source: QImage, notifier: _Notifier):
+        super().__init__()
+        self.key = key
+        self.source = source
+        self.notifier = notifier
+
+    def run(self):
+        _digest, w, h = self.key
+        image = self.source.scaled(
+            w, h, Qt.IgnoreAspectRatio, Qt.SmoothTransformation
+        )
+        self.notifier.ready.emit(self.key, [image])
+
+
+class AssetStore:
+    """Condensat -> blob, avec cache LRU des images décodées.
+
+    Le cache associe à chaque condensat sa pyramide et, à chaque clé
+    ``(condensat, largeur, hauteur)``, une version lissée à cette taille.
+    Les méthodes d'accès aux images décodées s'utilisent depuis le thread
+    GUI ; elles retournent ``None`` tant que le décodage est en cours et
+    les éléments qui affichent l'image sont redessinés à son arrivée.
+    """
+
+    def __init__(self, budget: int = DEFAULT_BUDGET):
+        self._lock = threading.Lock()
+        self._assets: dict[str, Asset] = {}
+        self.budget = budget
+        # clé -> images, de la moins à la plus récemment affichée
+        self._cache = OrderedDict()
+        self._cost = 0
+        self._pending = set()
+        # condensat -> clé du redimensionnement en cours (un seul à la fois)
+        self._scaling = {}
+        # condensat -> éléments qui l'affichent
+        self._users = {}
+        self._notifier = None
+        # > 0 : le rendu hors écran ne décode rien sur place (miniatures)
+        self._cached_only = 0
+
+    def __contains__(self, digest) -> bool:
+        return digest in self._assets
+
+    def get(self, digest: str) -> Asset | None:
+        return self._assets.get(digest)
+
+    def _register(self, asset: Asset) -> str:
+        with self._lock:
+            known = self._assets.get(asset.digest)
+            # un fichier du disque reste préférable à une entrée d'archive
+            if known is None or (known.path is None and asset.path is not None):
+                if known is not None:
+                    asset.size = known.size
+                self._assets[asset.digest] = asset
+        return asset.digest
+
+    def add_file(self, path: str) -> str:
+        """Enregistre le fichier ``path`` et retourne son condensat."""
+        ext = os.path.splitext(path)[1].lower()
+        return self._register(Asset(file_digest(path), ext, path=path))
+
+    def add_archive_member(self, archive: str, member: str) -> str:
+        """Enregistre une entrée d'archive sans l'extraire.
+
+        Les entrées nommées d'après leur condensat ne sont pas lues ; les
+        archives plus anciennes (noms de fichiers d'origine) sont lues une
+        fois pour calculer le condensat.
+        """
+        match = _HASHED_NAME.match(member)
+        if match:
+            digest, ext = match.group(1), (match.group(2) or "")
+        else:
+            with zipfile.ZipFile(archive, "r") as zf:
+                digest = hashlib.sha256(zf.read(member)).hexdigest()
+            ext = os.path.splitext(member)[1].lower()
+        return self._register(
+            Asset(digest, ext, archive=archive, member=member)
+        )
+
+    def image_size(self, digest: str) -> QSize:
+        """Dimensions de l'image, lues dans son en-tête sans la décoder.
+
+        Utilisable depuis un thread de travail.
+        """
+        asset = self._assets.get(digest)
+        if asset is None:
+            return QSize()
+        if asset.size is None:
+            size = QSize()
+            try:
+                with asset.open() as f:
+                    data = f.read(_HEADER_BYTES)
+                    size = self._read_size(data)
+                    if not size.isValid():
+                        size = self._read_size(data + f.read())
+            except OSError:
+                logger.warning(f"Image {digest[:12]} is unavailable")
+            asset.size = size
+        return QSize(asset.size)
+
+    @staticmethod
+    def _read_size(data: bytes) -> QSize:
+        buf = QBuffer()
+        buf.setData(QByteArray(data))
+        buf.open(QBuffer.ReadOnly)
+        return QImageReader(buf).size()
+
+    # -- Images décodées (thread GUI) --------------------------------
+    def attach(self, digest: str, item):
+        """Déclare ``item`` comme affichant ``digest`` (voir ``_evict``)."""
+        self._users.setdefault(digest, weakref.WeakSet()).add(item)
+
+    def set_budget(self, budget: int):
+        self.budget = budget
+        self._evict()
+
+    def mipmaps(self, digest: str, wait: bool = False) -> list[QImage] | None:
+        """Pyramide de l'image, ou ``None`` si elle est en cours de décodage.
+
+        Avec ``wait``, l'image est décodée sur place si besoin (rendu hors
+        écran : export), sauf dans un bloc :meth:`cached_only`.
+        """
+        levels = self._cache.get(digest)
+        if levels is not None:
+            self._cache.move_to_end(digest)
+            return levels
+        asset = self._assets.get(digest)
+        if asset is not None and wait and not self._cached_only:
+            levels = _decode(asset)
+            self._on_ready(digest, levels)
+            return levels
+        if asset is not None and digest not in self._pending:
+            self._pending.add(digest)
+            QThreadPool.globalInstance().start(
+                _DecodeTask(asset, self._get_notifier())
+            )
+        return None
+
+    @contextmanager
+    def cached_only(self):
+        """Rendu hors écran limité au cache, pour les miniatures prises sur
+        le thread GUI : une image absente est décodée en tâche de fond et
+        dessinée en attendant avec la couleur d'attente de l'élément."""
+        self._cached_only += 1
+        try:
+            yield
+        finally:
+            self._cached_only -= 1
+
+    def image(
+        self, digest: str, scale: float = 1.0, wait: bool = False
+    ) -> QImage | None:
+        """Niveau de la pyramide le mieux adapté à l'échelle ``scale``.
+
+        Le niveau retenu est le plus petit qui reste au moins aussi grand
+        que l'affichage ; il n'est donc jamais agrandi par plus de deux.
+        """
+        levels = self.mipmaps(digest, wait)
+        if not levels:
+            return None
+        level = 0
+        while level + 1 < len(levels) and scale <= 0.5:
+            scale *= 2
+            level += 1
+        return levels[level]
+
+    def scaled(self, digest: str, width: int, height: int) -> QImage | None:
+        """Image lissée à ``width`` x ``height`` pixels, calculée en tâche
+        de fond ; ``None`` tant qu'elle n'est pas prête.
+
+        Seules les réductions sont mises en cache : au-delà de la pleine
+        résolution, le niveau 0 filtré au dessin suffit.
+        """
+        key = (digest, width, height)
+        image = self._cache.get(key)
+        if image is not None:
+            self._cache.move_to_end(key)
+            return image[0]
+        levels = self.mipmaps(digest)
+        if not levels or digest in self._scaling:
+            return None
+        full = levels[0]
+        if width >= full.width() or height >= full.height():
+            return None
+        if width * height * 4 > self.budget // 4:
+            return None
+        source = self.image(digest, width / full.width())
+        if source.width() == width and source.height() == height:
+            return source
+        self._scaling[digest] = key
+        QThreadPool.globalInstance().start(
+            _ScaleTask(key, source, self._get_notifier())
+        )
+        return None
+
+    def _get_notifier(self) -> _Notifier:
+        if self._notifier is None:
+            self._notifier = _Notifier()
+            self._notifier.ready.connect(self._on_ready)
+        return self._notifier
+
+    def _on_ready(self, key, images):
+        if isinstance(key, tuple):
+            digest = key[0]
+            if self._scaling.get(digest) == key:
+                del self._scaling[digest]
+        else:
+            digest = key
+            self._pending.discard(key)
+        old = self._cache.pop(key, None)
+        if old:
+            self._cost -= sum(map(_image_cost, old))
+        self._cache[key] = images
+        self._cost += sum(map(_image_cost, images))
+        self._evict(keep=key)
+        for item in list(self._users.get(digest, ())):
+            try:
+                item.update()
+            except RuntimeError:
+                pass
+
+    def _evict(self, keep=None):
+        """Libère les images les moins récemment affichées.
+
+        Les pyramides des images visibles dans une vue sont conservées ;
+        les versions redimensionnées, recalculables, peuvent toujours être
+        libérées, sauf ``keep`` qui vient d'être produite.
+        """
+        if self._cost <= self.budget:
+            return
+        visible = {}
+        for key in list(self._cache):
+            if self._cost <= self.budget:
+                break
+            if key == keep:
+                continue
+            if not isinstance(key, tuple):
+                if key not in visible:
+                    users = list(self._users.get(key, ()))
+                    visible[key] = any(map(_on_screen, users))
+                if visible[key]:
+                    continue
+            self._cost -= sum(map(_image_cost, self._cache.pop(key)))
+        logger.debug(
+            f"Image cache: {len(self._cache)} entries, "
+            f"{self._cost / (1024 * 1024):.1f} MB"
+        )
+
+
+store = AssetStore()
@@ -3,6 +3,7 @@
 
 import math
 import logging
+from array import array
 from PyQt5.QtWidgets import (
     QGraphicsView,
     QGraphicsScene,
@@ -10,23 +11,87 @@ from PyQt5.QtWidgets import (
     QGraphicsItem,
     QGraphicsItemGroup,
     QGraphicsObject,
+    QRubberBand,
 )
 from .ui.animated_menu import AnimatedMenu
 from PyQt5 import sip
-from PyQt5.QtCore import Qt, QRectF, QPointF, QSizeF, pyqtSignal, QTimer
+from PyQt5.QtCore import (
+    Qt,
+    QRect,
+    QRectF,
+    QPointF,
+    QSize,
+    QSizeF,
+    pyqtSignal,
+    QTimer,
+)
 from PyQt5.QtGui import (
     QPainter,
     QColor,
     QPen,
-    QImage,
     QPainterPath,
+    QPainterPathStroker,
     QPdfWriter,
+    QPixmap,
     QTransform,
 )
 from collections import OrderedDict
-from .shapes import Rect, Ellipse, Line, Triangle, FreehandPath, TextItem, ImageItem
+from .shapes import (
+    Rect,
+    Ellipse,
+    Line,
+    Triangle,
+    FreehandPath,
+    StrokePreview,
+    TextItem,
+    ImageItem,
+)
 logger = logging.getLogger(__name__)
+from .assets import store
 from .utils import to_pixels
+from .tracking import ChangeTracker, notify_change
+from . import trace
+from .geometry import (
+    bezier_segments,
+    coords_from_points,
+    is_closed,
+    points_from_coords,
+    polygon_from_coords,
+)
+from .naming import NameIndex
+from .raster import THUMBNAIL_SIZE, TileSnapshot, snapshot_scene, write_tiled
+from .zorder import ZOrderIndex
+from .history import (
+    UndoStack,
+    AddItemsCommand,
+    RemoveItemsCommand,
+    MoveItemsCommand,
+    ItemStateCommand,
+    ReorderCommand,
+    TransformItemsCommand,
+    LayerOrderCommand,
+    RemoveLayerCommand,
+    GroupCommand,
+    UngroupCommand,
+    MacroCommand,
+)
+
+_trace_mouse = trace.category("mouse")
+_trace_groups = trace.category("groups")
+_trace_items = trace.category("items")
+
+# Voile assombrissant l'extérieur du document et étendue de ses bandes
+_DIM_COLOR = QColor(0, 0, 0, 100)
+_DIM_EXTENT = 1e7
+# Contour du lasso de sélection
+_LASSO_COLOR = QColor(0, 120, 215)
+# Déplacement de la sélection au clavier
+_NUDGE_KEYS = {
+    Qt.Key_Left: (-1, 0),
+    Qt.Key_Right: (1, 0),
+    Qt.Key_Up: (0, -1),
+    Qt.Key_Down: (0, 1),
+}
 
 
 class TransparentItemGroup(QGraphicsObject):
@@ -45,15 +110,14 @@ class TransparentItemGroup(QGraphicsObject):
         item.setFlag(QGraphicsItem.ItemIsMovable, True)
         item.setFlag(QGraphicsItem.ItemIsSelectable, True)
         item.setFlag(QGraphicsItem.ItemSendsGeometryChanges, True)
-        logger.debug(
-
-            "Added %s to %s flags=0x%x enabled=%s",
-            getattr(item, "layer_name", type(item).__name__),
-            getattr(self, "layer_name", "group"),
-            int(item.flags()),
-            self.isEnabled(),
-
-        )
+        if _trace_groups.on:
+            _trace_groups.trace(
+                "Added %s to %s flags=0x%x enabled=%s",
+                getattr(item, "layer_name", type(item).__name__),
+                getattr(self, "layer_name", "group"),
+                int(item.flags()),
+                self.isEnabled(),
+            )
 
     def removeFromGroup(self, item: QGraphicsItem):
         """Remove an item from this group."""
@@ -67,9 +131,12 @@ class TransparentItemGroup(QGraphicsObject):
 
     def itemChange(self, change, value):
         if change == QGraphicsItem.ItemSelectedHasChanged:
-            logger.debug(
-                f"Group {getattr(self, 'layer_name', '')} selected={bool(value)}"
-            )
+            if _trace_groups.on:
+                _trace_groups.trace(
+                    "Group %s selected=%s",
+                    getattr(self, "layer_name", ""),
+                    bool(value),
+                )
             if hasattr(self, "setHandlesChildEvents"):
                 self.setHandlesChildEvents(bool(value))
             if hasattr(self, "setFiltersChildEvents"):
@@ -79,6 +146,12 @@ class TransparentItemGroup(QGraphicsObject):
             self.setAcceptedMouseButtons(
                 Qt.AllButtons if value else Qt.NoButton
             )
+        elif change == QGraphicsItem.ItemPositionHasChanged:
+            notify_change(self, "moved")
+        elif change == QGraphicsItem.ItemZValueHasChanged:
+            notify_change(self, "reordered")
+        elif change == QGraphicsItem.ItemParentHasChanged:
+            notify_change(self, "reparented")
         return super().itemChange(change, value)
 
     def shape(self):
@@ -108,7 +181,11 @@ class TransparentItemGroup(QGraphicsObject):
 
 
 class CanvasScene(QGraphicsScene):
-    """QGraphicsScene emitting signals when items are added or removed."""
+    """QGraphicsScene emitting signals when items are added or removed.
+
+    ``tracker`` accumulates the items touched since the last refresh so the
+    canvas only processes what actually changed.
+    """
 
     itemAdded = pyqtSignal()
     itemRemoved = pyqtSignal()
@@ -116,6 +193,7 @@ class CanvasScene(QGraphicsScene):
     def __init__(self, *args, throttle_interval: int = 100, **kwargs):
         super().__init__(*args, **kwargs)
         self._throttle_interval = throttle_interval
+        self.tracker = ChangeTracker()
         self._add_timer = QTimer(self)
         self._add_timer.setSingleShot(True)
         self._add_timer.timeout.connect(self.itemAdded)
@@ -125,9 +203,11 @@ class CanvasScene(QGraphicsScene):
 
     def addItem(self, item):
         super().addItem(item)
+        self.tracker.mark(item, "added")
         self._add_timer.start(self._throttle_interval)
 
     def removeItem(self, item):
+        self.tracker.mark(item, "removed")
         super().removeItem(item)
         self._remove_timer.start(self._throttle_interval)
 
@@ -139,6 +219,13 @@ class CanvasWidget(QGraphicsView):
 
         # Scène
         self.scene = CanvasScene(self)
+        self.scene.tracker = ChangeTracker(self._on_item_changed)
+        # incrémenté à chaque modification du document (miniatures…)
+        self.revision = 0
+        # nom -> élément et élément -> calque
+        self._names = NameIndex(self._is_layer)
+        # zValue triées par parent (calque ou groupe)
+        self._z_order = ZOrderIndex()
         self.setScene(self.scene)
         self.scene.itemAdded.connect(self._schedule_scene_changed)
         self.scene.itemRemoved.connect(self._schedule_scene_changed)
@@ -175,6 +262,26 @@ class CanvasWidget(QGraphicsView):
         self.grid_size = 50
         self.show_grid = True
         self.snap_to_grid = False
+        # tuile de grille (taille en pixels écran, pixmap), voir drawBackground
+        self._grid_tile = None
+        # fond et grille ne dépendent que du document : mis en cache par Qt
+        self.setCacheMode(QGraphicsView.CacheBackground)
+
+        # Simplification des tracés libres à la validation
+        # stroke_tolerance est exprimée en pixels écran (0 = désactivée)
+        self.stroke_tolerance = 1.0
+        self.stroke_smoothing = False
+
+        # Gomme : diamètre en pixels écran et éléments touchés pendant le geste
+        self.eraser_size = 12
+        self._erase_hits = None
+        self._erase_last = None
+
+        # Sélection par zone : rectangle (vue) ou lasso (scène, Alt)
+        self._band_origin = None
+        self._band_mode = Qt.ReplaceSelection
+        self._rubber_band = None
+        self._lasso_item = None
 
         # Anti-aliasing
         self.setRenderHint(QPainter.Antialiasing)
@@ -188,25 +295,37 @@ class CanvasWidget(QGraphicsView):
 
         # Cadre de la zone de travail (sera redessiné par new_document)
         self._doc_rect = QRectF(0, 0, 800, 800)
+        self._dim_bands = _dim_bands(self._doc_rect)
         self._frame_item = None
         self._draw_doc_frame()
 
         # sélection -> inspecteur
         self.scene.selectionChanged.connect(self._on_selection_changed)
-        self.scene.changed.connect(lambda _: self._schedule_scene_changed())
+        # bouton de souris enfoncé : l'historique attend le relâchement
+        self._pointer_down = False
 
         # Historique pour annuler/rétablir
-        self._history = []
-        self._history_index = -1
-        self._loading_snapshot = False
+        self._undo_stack = UndoStack()
+        # état de référence des éléments en cours d'édition interactive
+        self._edit_baseline = {}
         self._name_counters = {}
 
         # Gestion des calques
         self.layers = OrderedDict()
         self.current_layer = None
+        # calques masqués dont les formes ne sont pas encore décodées
+        self._deferred_layers = {}
         self.lock_others = False
         self.create_layer("Layer 1")
 
+    def _set_doc_rect(self, rect: QRectF):
+        self.revision += 1
+        self._doc_rect = rect
+        self._dim_bands = _dim_bands(rect)
+        self._draw_doc_frame()
+        self.setSceneRect(rect.adjusted(-500, -500, 500, 500))
+        self.resetCachedContent()
+
     def _draw_doc_frame(self):
         """Dessine le contour en pointillés de la zone de travail."""
         if self._frame_item:
@@ -229,8 +348,20 @@ class CanvasWidget(QGraphicsView):
         if base is None:
             base = type(item).__name__.lower()
         count = self._name_counters.get(base, 0) + 1
+        while f"{base} {count}" in self._names:
+            count += 1
         self._name_counters[base] = count
         item.layer_name = f"{base} {count}"
+        notify_change(item, "renamed")
+
+    def _unique_name(self, name: str) -> str:
+        """Retourne ``name`` ou une variante numérotée encore libre."""
+        if name not in self._names and name not in self.layers:
+            return name
+        i = 1
+        while f"{name} {i}" in self._names or f"{name} {i}" in self.layers:
+            i += 1
+        return f"{name} {i}"
 
     def set_tool(self, tool_name: str):
         """Définit l’outil courant depuis la toolbar."""
@@ -255,6 +386,10 @@ class CanvasWidget(QGraphicsView):
         if self._temp_item:
             self.scene.removeItem(self._temp_item)
             self._temp_item = None
+        if self._erase_hits is not None:
+            self._cancel_erase()
+        if self._band_origin is not None:
+            self._cancel_selection_band()
 
     def new_document(
         self, width, height, unit, orientation, color_mode, dpi, name=""
@@ -272,14 +407,18 @@ class CanvasWidget(QGraphicsView):
         elif orientation == "portrait" and w > h:
             w, h = h, w
         self.scene.clear()
+        self.scene.tracker.reset()
+        self._names.clear()
+        self._z_order.clear()
+        self._deferred_layers.clear()
         self._frame_item = None
         self._name_counters = {}
+        self._undo_stack.clear()
+        self._edit_baseline.clear()
         self.layers.clear()
         self.current_layer = None
         self.create_layer("Layer 1")
-        self._doc_rect = QRectF(0, 0, w, h)
-        self._draw_doc_frame()
-        self.setSceneRect(self._doc_rect.adjusted(-500, -500, 500, 500))
+        self._set_doc_rect(QRectF(0, 0, w, h))
         self.current_meta = {
             "name": name,
             "width": width,
@@ -291,8 +430,6 @@ class CanvasWidget(QGraphicsView):
         }
         window = self.window()
 
-        if not self._loading_snapshot:
-            self._snapshot()
         if hasattr(window, "layout"):
             window.layout.populate()
 
@@ -306,9 +443,7 @@ class CanvasWidget(QGraphicsView):
             w, h = h, w
         elif orientation == "portrait" and w > h:
             w, h = h, w
-        self._doc_rect = QRectF(0, 0, w, h)
-        self._draw_doc_frame()
-        self.setSceneRect(self._doc_rect.adjusted(-500, -500, 500, 500))
+        self._set_doc_rect(QRectF(0, 0, w, h))
         if not hasattr(self, "current_meta"):
             self.current_meta = {}
         self.current_meta.update(
@@ -330,14 +465,43 @@ class CanvasWidget(QGraphicsView):
         for s in shapes:
             self._create_item(s)
         self.scene.blockSignals(False)
-        # Ensure layer and layout views stay in sync with the scene
-        self._schedule_scene_changed()
+        # Ensure layer and layout views stay in sync with the scene; a freshly
+        # loaded document is not considered modified.
+        self.flush_scene_changes(mark_dirty=False)
+
+    def defer_layers(self, deferred):
+        """Enregistre des calques dont les formes seront décodées à la demande.
 
+        ``deferred`` associe un nom de calque à une fonction retournant la
+        liste de ses formes ; elle est appelée quand le calque devient
+        visible ou que le document entier est nécessaire.
+        """
+        for name, loader in deferred.items():
+            if name in self.layers:
+                self._deferred_layers[name] = loader
+            else:
+                self.load_shapes(loader())
+
+    def _materialize_layer(self, name: str):
+        loader = self._deferred_layers.pop(name, None)
+        if loader is None:
+            return
+        # les modifications en attente restent comptées normalement
+        self.flush_scene_changes()
+        try:
+            shapes = loader()
+        except Exception:
+            logger.exception(f"Unable to decode layer {name}")
+            return
+        self.load_shapes(shapes)
 
     def export_project(self):
         """
         Exporte la meta (self.current_meta) + toutes les formes en dict.
         Prêt à sérialiser en JSON.
+
+        Les calques encore différés sont repris depuis leurs formes décodées,
+        sans créer d'éléments graphiques.
         """
         shapes = []
         logger.debug("Exporting project")
@@ -347,6 +511,12 @@ class CanvasWidget(QGraphicsView):
             data = self._serialize_item(item)
             if data:
                 shapes.append(data)
+        for loader in self._deferred_layers.values():
+            for data in loader():
+                points = data.get("points")
+                if isinstance(points, array):
+                    data["points"] = points_from_coords(points)
+                shapes.append(data)
         meta = getattr(self, "current_meta", {})
         layers = []
         for name, layer in list(self.layers.items()):
@@ -369,17 +539,33 @@ class CanvasWidget(QGraphicsView):
             )
         return {**meta, "shapes": shapes, "layers": layers}
 
-    def export_image(self, path: str, img_format: str = "PNG"):
-        """Enregistre la scène actuelle dans un fichier image."""
-        w = int(self._doc_rect.width())
+    def document_dpi(self) -> float:
+        meta = getattr(self, "current_meta", None) or {}
+        return float(meta.get("dpi") or 72)
+
+    def snapshot_image(self, dpi: float | None = None) -> TileSnapshot:
+        """Instantané en tuiles du document, à ``dpi`` (celle du document
+        par défaut), pour un export raster hors du thread GUI."""
+        doc_dpi = self.document_dpi()
+        dpi = float(dpi or doc_dpi)
+        return snapshot_scene(self.scene, self._doc_rect, dpi / doc_dpi, dpi)
+
+    def snapshot_thumbnail(self, size: int = THUMBNAIL_SIZE) -> TileSnapshot:
+        """Instantané du document réduit à ``size`` pixels de côté.
+
+        Pris à chaque enregistrement : les images sorties du cache ne sont
+        pas redécodées ici, sur le thread GUI.
+        """
+        longest = max(self._doc_rect.width(), self._doc_rect.height(), 1)
+        with store.cached_only():
+            return snapshot_scene(self.scene, self._doc_rect, size / longest)
+
+    def export_image(
+        self, path: str, img_format: str = "PNG", dpi: float | None = None
+    ):
+        """Enregistre la scène actuelle dans un fichier image (bloquant)."""
         logger.debug(f"Exporting image to {path}")
-        h = int(self._doc_rect.height())
-        image = QImage(w, h, QImage.Format_ARGB32)
-        image.fill(Qt.white)
-        painter = QPainter(image)
-        self.scene.render(painter, QRectF(0, 0, w, h), self._doc_rect)
-        painter.end()
-        image.save(path, img_format)
+        write_tiled(self.snapshot_image(dpi), path, img_format)
 
     def export_svg(self, path: str):
         """Enregistre la scène actuelle au format SVG (très basique)."""
@@ -443,17 +629,26 @@ class CanvasWidget(QGraphicsView):
                     stroke=stroke,
                 )
             elif cls == "FreehandPath":
-                path = item.path()
-                pts = [
-                    path.elementAt(i)
-                    for i in range(path.elementCount())
-                ]
-                if (
-                    len(pts) > 2
-                    and pts[0].x == pts[-1].x
-                    and pts[0].y == pts[-1].y
-                ):
-                    points = " ".join(f"{p.x},{p.y}" for p in pts[:-1])
+                coords = item.coords()
+                if item.is_smooth() and len(coords) >= 4:
+                    cmds = [f"M{coords[0]} {coords[1]}"]
+                    cmds.extend(
+                        f"C{c1x} {c1y} {c2x} {c2y} {x} {y}"
+                        for c1x, c1y, c2x, c2y, x, y in bezier_segments(coords)
+                    )
+                    if is_closed(coords):
+                        cmds.append("Z")
+                    SubElement(
+                        root,
+                        "path",
+                        d=" ".join(cmds),
+                        fill="none",
+                        stroke=stroke,
+                    )
+                elif is_closed(coords):
+                    points = " ".join(
+                        f"{x},{y}" for x, y in points_from_coords(coords[:-2])
+                    )
                     SubElement(
                         root,
                         "polygon",
@@ -462,10 +657,10 @@ class CanvasWidget(QGraphicsView):
                         stroke=stroke,
                     )
                 else:
-                    cmds = []
-                    for i, ept in enumerate(pts):
-                        cmd = "M" if i == 0 else "L"
-                        cmds.append(f"{cmd}{ept.x} {ept.y}")
+                    cmds = [
+                        f"{'M' if i == 0 else 'L'}{x} {y}"
+                        for i, (x, y) in enumerate(points_from_coords(coords))
+                    ]
                     SubElement(
                         root,
                         "path",
@@ -491,30 +686,11 @@ class CanvasWidget(QGraphicsView):
         self.scale(factor, factor)
 
     def mousePressEvent(self, event):
+        self._pointer_down = True
         scene_pos = self.mapToScene(event.pos())
         item = self.scene.itemAt(scene_pos, QTransform())
-        item_name = getattr(item, "layer_name", type(item).__name__ if item else None)
-        logger.debug(
-            f"Mouse press {event.button()} at {scene_pos.x():.1f},{scene_pos.y():.1f} "
-            f"tool={self.current_tool} item={item_name}"
-        )
-        if item:
-            flags = int(item.flags())
-            logger.debug(
-
-                "Item flags=0x%x movable=%s selectable=%s enabled=%s",
-                flags,
-                bool(flags & QGraphicsItem.ItemIsMovable),
-                bool(flags & QGraphicsItem.ItemIsSelectable),
-                item.isEnabled(),
-            )
-            parent = item.parentItem()
-            if parent:
-                logger.debug(
-                    "Parent %s enabled=%s",
-                    getattr(parent, "layer_name", type(parent).__name__),
-                    parent.isEnabled(),
-                )
+        if _trace_mouse.on:
+            self._trace_press(event, scene_pos, item)
 
         if self.current_tool == "pan":
             super().mousePressEvent(event)
@@ -554,23 +730,23 @@ class CanvasWidget(QGraphicsView):
                 and not (event.modifiers() & self.override_select_modifier)
             ):
                 super().mousePressEvent(event)
+                self._begin_item_edit(self.scene.selectedItems())
+                return
+            if self.current_tool == "erase":
+                self._erase_hits = {}
+                self._erase_last = scene_pos
+                self._erase_along(scene_pos, scene_pos)
+                return
+            if self.current_tool == "select":
+                self._start_selection_band(event)
                 return
             if base_item:
                 self._new_item_z = base_item.zValue() + 0.1
             else:
-                existing = [
-                    it.zValue()
-                    for it in self.scene.items()
-                    if it is not self._frame_item
-                ]
-                self._new_item_z = (min(existing) if existing else 0) - 0.1
-            if self.current_tool == "erase":
-                items = self.scene.items(scene_pos)
-                if items and items[0] is not self._frame_item:
-                    self.scene.removeItem(items[0])
-                    self._mark_dirty()
-                    self._schedule_scene_changed()
-            elif self.current_tool in ("rect", "ellipse", "line", "triangle"):
+                # au premier plan du calque courant
+                top = self._z_order.top(self.current_layer)
+                self._new_item_z = 0 if top is None else top + 1
+            if self.current_tool in ("rect", "ellipse", "line", "triangle"):
                 items = [
                     it
                     for it in self.scene.items(scene_pos)
@@ -618,8 +794,7 @@ class CanvasWidget(QGraphicsView):
                 self.scene.clearSelection()
                 item.setSelected(True)
                 item.setTextInteractionFlags(Qt.TextEditorInteraction)
-                self._mark_dirty()
-                self._schedule_scene_changed()
+                self._push_command(AddItemsCommand(self, [item]))
             elif self.current_tool == "polygon":
                 if self._polygon_points is None:
                     self._polygon_points = [scene_pos]
@@ -650,10 +825,11 @@ class CanvasWidget(QGraphicsView):
                         scene_pos.y(),
                     )
             elif self.current_tool == "freehand":
-                self._freehand_points = [scene_pos]
-                self._current_path_item = FreehandPath.from_points(
-                    self._freehand_points, self.pen_color, 2
+                self._current_path_item = StrokePreview(
+                    scene_pos, self.pen_color, 2
                 )
+                # sommets du tracé en cours, tenus par l'aperçu
+                self._freehand_points = self._current_path_item.coords()
                 self._current_path_item.setZValue(self._new_item_z)
                 self._current_path_item.setOpacity(0.6)
                 self.scene.addItem(self._current_path_item)
@@ -661,19 +837,58 @@ class CanvasWidget(QGraphicsView):
             self._show_context_menu(event)
             return
         super().mousePressEvent(event)
-        if event.button() == Qt.LeftButton:
-            sel = [
-                getattr(it, "layer_name", type(it).__name__)
-                for it in self.scene.selectedItems()
-            ]
-            logger.debug(f"Selection after press: {sel}")
+        if event.button() == Qt.LeftButton and _trace_mouse.on:
+            sel = self._selection_names()
+            _trace_mouse.trace("Selection after press: %s", sel)
             if item and not sel:
-                logger.debug(
+                _trace_mouse.trace(
                     "Clicked %s but nothing selected; layer enabled=%s",
                     getattr(item, "layer_name", type(item).__name__),
                     item.isEnabled(),
                 )
 
+    def _selection_names(self) -> list[str]:
+        return [
+            getattr(it, "layer_name", type(it).__name__)
+            for it in self.scene.selectedItems()
+        ]
+
+    def _trace_press(self, event, scene_pos, item):
+        _trace_mouse.trace(
+            "Mouse press %s at %.1f,%.1f tool=%s item=%s",
+            event.button(),
+            scene_pos.x(),
+            scene_pos.y(),
+            self.current_tool,
+            getattr(item, "layer_name", type(item).__name__ if item else None),
+        )
+        if not item:
+            return
+        flags = int(item.flags())
+        _trace_mouse.trace(
+            "Item flags=0x%x movable=%s selectable=%s enabled=%s",
+            flags,
+            bool(flags & QGraphicsItem.ItemIsMovable),
+            bool(flags & QGraphicsItem.ItemIsSelectable),
+            item.isEnabled(),
+        )
+        parent = item.parentItem()
+        if parent:
+            _trace_mouse.trace(
+                "Parent %s enabled=%s",
+                getattr(parent, "layer_name", type(parent).__name__),
+                parent.isEnabled(),
+            )
+
+    def _trace_selection_positions(self):
+        for it in self.scene.selectedItems():
+            pos = it.pos()
+            _trace_mouse.trace(
+                "Selected %s at %.1f,%.1f",
+                getattr(it, "layer_name", type(it).__name__),
+                pos.x(),
+                pos.y(),
+            )
 
     def mouseMoveEvent(self, event):
         scene_pos = self.mapToScene(event.pos())
@@ -707,13 +922,15 @@ class CanvasWidget(QGraphicsView):
             self.current_tool == "freehand"
             and self._freehand_points is not None
         ):
-            self._freehand_points.append(scene_pos)
             if self._current_path_item:
-                path = self._current_path_item.path()
-                if path.elementCount() == 0:
-                    path.moveTo(self._freehand_points[0])
-                path.lineTo(scene_pos)
-                self._current_path_item.setPath(path)
+                self._current_path_item.append(scene_pos)
+        elif self.current_tool == "erase" and self._erase_hits is not None:
+            self._erase_along(self._erase_last, scene_pos)
+            self._erase_last = scene_pos
+            return
+        elif self._band_origin is not None:
+            self._update_selection_band(event.pos())
+            return
         elif self._temp_item and self._start_pos:
             x0, y0 = self._start_pos.x(), self._start_pos.y()
             if self.current_tool in ("rect", "ellipse", "triangle"):
@@ -726,19 +943,20 @@ class CanvasWidget(QGraphicsView):
                 self._temp_item.setLine(x0, y0, scene_pos.x(), scene_pos.y())
             return
         super().mouseMoveEvent(event)
-        for it in self.scene.selectedItems():
-            pos = it.pos()
-            logger.debug(
-                f"Selected {getattr(it, 'layer_name', type(it).__name__)} "
-                f"at {pos.x():.1f},{pos.y():.1f}"
-            )
+        if _trace_mouse.on:
+            self._trace_selection_positions()
 
     def mouseReleaseEvent(self, event):
+        self._pointer_down = False
         scene_pos = self.mapToScene(event.pos())
-        logger.debug(
-            f"Mouse release {event.button()} at {scene_pos.x():.1f},{scene_pos.y():.1f} "
-            f"tool={self.current_tool}"
-        )
+        if _trace_mouse.on:
+            _trace_mouse.trace(
+                "Mouse release %s at %.1f,%.1f tool=%s",
+                event.button(),
+                scene_pos.x(),
+                scene_pos.y(),
+                self.current_tool,
+            )
         if self.current_tool == "pan":
             super().mouseReleaseEvent(event)
             return
@@ -751,6 +969,13 @@ class CanvasWidget(QGraphicsView):
             grid = self.grid_size / scale
             scene_pos.setX(round(scene_pos.x() / grid) * grid)
             scene_pos.setY(round(scene_pos.y() / grid) * grid)
+        if self.current_tool == "erase" and self._erase_hits is not None:
+            self._erase_along(self._erase_last, scene_pos)
+            self._finish_erase()
+            return
+        if self._band_origin is not None:
+            self._finish_selection_band(event.pos())
+            return
         if self.current_tool == "polygon" and self._polygon_points:
             self._polygon_points.append(scene_pos)
             path = self._polygon_item.path()
@@ -760,24 +985,25 @@ class CanvasWidget(QGraphicsView):
                 scene_pos.x(), scene_pos.y(), scene_pos.x(), scene_pos.y()
             )
         elif self.current_tool == "freehand" and self._freehand_points:
-            self._freehand_points.append(scene_pos)
             if self._current_path_item:
-                path = self._current_path_item.path()
-                if path.elementCount() == 0:
-                    path.moveTo(self._freehand_points[0])
-                path.lineTo(scene_pos)
-                self._current_path_item.setPath(path)
-                self._current_path_item.setOpacity(1.0)
-                self._assign_layer_name(self._current_path_item)
+                preview = self._current_path_item
+                preview.append(scene_pos)
+                self.scene.removeItem(preview)
+                item = FreehandPath.from_coords(
+                    preview.coords(), self.pen_color, 2
+                )
+                item.setZValue(preview.zValue())
+                self.scene.addItem(item)
+                self._finish_stroke(item)
+                self._assign_layer_name(item)
                 if self.current_layer:
-                    self.current_layer.addToGroup(self._current_path_item)
-                    self._current_path_item.layer = self.current_layer.layer_name
+                    self.current_layer.addToGroup(item)
+                    item.layer = self.current_layer.layer_name
                 self.scene.clearSelection()
-                self._current_path_item.setSelected(True)
+                item.setSelected(True)
+                self._push_command(AddItemsCommand(self, [item]))
             self._current_path_item = None
             self._freehand_points = None
-            self._mark_dirty()
-            self._schedule_scene_changed()
         elif self._temp_item and self._start_pos:
             x0, y0 = self._start_pos.x(), self._start_pos.y()
             if self.current_tool in ("rect", "ellipse", "triangle"):
@@ -795,25 +1021,18 @@ class CanvasWidget(QGraphicsView):
                 self._temp_item.layer = self.current_layer.layer_name
             self.scene.clearSelection()
             self._temp_item.setSelected(True)
+            self._push_command(AddItemsCommand(self, [self._temp_item]))
             self._temp_item = None
-            self._mark_dirty()
-            self._schedule_scene_changed()
             self._start_pos = None
             return
         self._start_pos = None
         super().mouseReleaseEvent(event)
-        if event.button() == Qt.LeftButton:
-            sel = [
-                getattr(it, "layer_name", type(it).__name__)
-                for it in self.scene.selectedItems()
-            ]
-            logger.debug(f"Selection after release: {sel}")
-            for it in self.scene.selectedItems():
-                pos = it.pos()
-                logger.debug(
-                    f"Selected {getattr(it, 'layer_name', type(it).__name__)} "
-                    f"at {pos.x():.1f},{pos.y():.1f}"
-                )
+        self.commit_item_edits()
+        if event.button() == Qt.LeftButton and _trace_mouse.on:
+            _trace_mouse.trace(
+                "Selection after release: %s", self._selection_names()
+            )
+            self._trace_selection_positions()
 
 
     def mouseDoubleClickEvent(self, event):
@@ -838,11 +1057,10 @@ class CanvasWidget(QGraphicsView):
             self.scene.clearSelection()
             self._polygon_item.setSelected(True)
             self.scene.removeItem(self._poly_preview_line)
+            self._push_command(AddItemsCommand(self, [self._polygon_item]))
             self._poly_preview_line = None
             self._polygon_item = None
             self._polygon_points = None
-            self._mark_dirty()
-            self._schedule_scene_changed()
         elif items and isinstance(items[0], TextItem):
             ti = items[0]
             ti.setTextInteractionFlags(Qt.TextEditorInteraction)
@@ -856,39 +1074,54 @@ class CanvasWidget(QGraphicsView):
         painter.fillRect(self._doc_rect, Qt.white)
         if not self.show_grid:
             return
-        pen = QPen(QColor(220, 220, 220), 0)
-        painter.setPen(pen)
-        # Taille de la grille en coordonnées scène pour conserver
-        # un espacement constant à l'écran malgré le zoom
-        scale = self.transform().m11()
-        if scale == 0:
-            scale = 1
-        gs = self.grid_size / scale
         r = rect.intersected(self._doc_rect)
-        left = int(math.floor(r.left()))
-        right = int(math.ceil(r.right()))
-        top = int(math.floor(r.top()))
-        bottom = int(math.ceil(r.bottom()))
-        # verticales
-        x = left - int(left % gs)
-        while x < right:
-            painter.drawLine(int(x), top, int(x), bottom)
-            x += gs
-        # horizontales
-        y = top - int(top % gs)
-        while y < bottom:
-            painter.drawLine(left, int(y), right, int(y))
-            y += gs
+        if r.isEmpty():
+            return
+        # La grille garde un espacement constant à l'écran malgré le zoom :
+        # on dessine en pixels écran une tuile répétée, quel que soit le
+        # nombre de lignes visibles.
+        scale = abs(self.transform().m11()) or 1
+        tile = self._grid_tile_pixmap()
+        target = QRectF(
+            r.left() * scale,
+            r.top() * scale,
+            r.width() * scale,
+            r.height() * scale,
+        )
+        size = tile.width()
+        painter.save()
+        painter.scale(1 / scale, 1 / scale)
+        painter.drawTiledPixmap(
+            target,
+            tile,
+            QPointF(target.left() % size, target.top() % size),
+        )
+        painter.restore()
+
+    def _grid_tile_pixmap(self) -> QPixmap:
+        """Tuile transparente de plusieurs cases, recréée si la grille change."""
+        gs = self.grid_size
+        if self._grid_tile is None or self._grid_tile[0] != gs:
+            cells = max(1, math.ceil(64 / gs))
+            size = cells * gs
+            tile = QPixmap(size, size)
+            tile.fill(Qt.transparent)
+            painter = QPainter(tile)
+            painter.setPen(QPen(QColor(220, 220, 220), 0))
+            for i in range(cells):
+                painter.drawLine(i * gs, 0, i * gs, size)
+                painter.drawLine(0, i * gs, size, i * gs)
+            painter.end()
+            self._grid_tile = (gs, tile)
+        return self._grid_tile[1]
 
     def drawForeground(self, painter, rect):
         super().drawForeground(painter, rect)
-        painter.setPen(Qt.NoPen)
-        painter.setBrush(QColor(0, 0, 0, 100))
-        outer = QPainterPath()
-        outer.addRect(rect)
-        inner = QPainterPath()
-        inner.addRect(self._doc_rect)
-        painter.drawPath(outer.subtracted(inner))
+        # hors document : au plus quatre bandes, sans opération booléenne
+        for band in self._dim_bands:
+            r = band.intersected(rect)
+            if not r.isEmpty():
+                painter.fillRect(r, _DIM_COLOR)
 
     def _show_context_menu(self, event):
         menu = AnimatedMenu(self)
@@ -926,14 +1159,42 @@ class CanvasWidget(QGraphicsView):
                 )
             )
             menu.addAction(act_flip_v)
-            act_delete = QAction("Supprimer", self)
-            act_delete.triggered.connect(
+            for label, angle in (("Pivoter de 90°", 90), ("Pivoter de -90°", -90)):
+                act_rotate = QAction(label, self)
+                act_rotate.triggered.connect(
+                    lambda _checked=False, angle=angle: (
+                        item.setSelected(True),
+                        self.rotate_selected(angle),
+                    )
+                )
+                menu.addAction(act_rotate)
+            act_front = QAction("Premier plan", self)
+            act_front.triggered.connect(
                 lambda: (
-                    self.scene.removeItem(item),
-                    self._mark_dirty(),
-                    self._schedule_scene_changed(),
+                    item.setSelected(True),
+                    self.bring_to_front_selected(),
+                )
+            )
+            menu.addAction(act_front)
+            act_back = QAction("Arrière-plan", self)
+            act_back.triggered.connect(
+                lambda: (
+                    item.setSelected(True),
+                    self.send_to_back_selected(),
                 )
             )
+            menu.addAction(act_back)
+            if isinstance(item, FreehandPath):
+                act_simplify = QAction("Simplifier le tracé", self)
+                act_simplify.triggered.connect(
+                    lambda: (
+                        item.setSelected(True),
+                        self.simplify_selected(),
+                    )
+                )
+                menu.addAction(act_simplify)
+            act_delete = QAction("Supprimer", self)
+            act_delete.triggered.connect(lambda: self._remove_items([item]))
             menu.addAction(act_delete)
             act_props = QAction("Propriétés…", self)
             menu.addAction(act_props)
@@ -946,15 +1207,176 @@ class CanvasWidget(QGraphicsView):
             menu.addAction(act_snap)
         menu.exec_(self.mapToGlobal(event.pos()))
 
+    # --- Gomme -------------------------------------------------------
+    def _erasable(self, item) -> bool:
+        return (
+            item is not self._frame_item
+            and not isinstance(item, TransparentItemGroup)
+            and bool(item.flags() & QGraphicsItem.ItemIsSelectable)
+            and item.isVisible()
+            and item.isEnabled()
+        )
+
+    def _erase_along(self, start: QPointF, end: QPointF):
+        """Collecte les éléments touchés par la gomme entre deux positions.
+
+        L'index de la scène fournit les candidats dont le rectangle croise la
+        zone balayée ; seule leur forme est ensuite testée. Les éléments
+        touchés sont masqués jusqu'à la fin du geste.
+        """
+        radius = self._scene_tolerance(self.eraser_size / 2)
+        swept = QPainterPath()
+        if start == end:
+            swept.addEllipse(start, radius, radius)
+        else:
+            line = QPainterPath(start)
+            line.lineTo(end)
+            stroker = QPainterPathStroker()
+            stroker.setWidth(2 * radius)
+            stroker.setCapStyle(Qt.RoundCap)
+            swept = stroker.createStroke(line)
+        hits = self._erase_hits
+        for it in self.scene.items(
+            swept.boundingRect(), Qt.IntersectsItemBoundingRect
+        ):
+            if it in hits or not self._erasable(it):
+                continue
+            if it.collidesWithPath(it.mapFromScene(swept), Qt.IntersectsItemShape):
+                hits[it] = None
+                it.setVisible(False)
+
+    def _cancel_erase(self):
+        for it in self._erase_hits:
+            if not sip.isdeleted(it):
+                it.setVisible(True)
+        self._erase_hits = None
+        self._erase_last = None
+
+    def _finish_erase(self):
+        """Supprime en une seule opération annulable tout ce que la gomme a touché."""
+        items = [it for it in self._erase_hits if not sip.isdeleted(it)]
+        self._cancel_erase()
+        if items:
+            self._remove_items(items)
+
+    # --- Sélection par zone ------------------------------------------
+    def _start_selection_band(self, event):
+        """Commence une sélection au rectangle, ou au lasso avec Alt.
+
+        Avec le modificateur de surcharge (Maj), la zone s'ajoute à la
+        sélection courante au lieu de la remplacer.
+        """
+        self._band_origin = event.pos()
+        if event.modifiers() & self.override_select_modifier:
+            self._band_mode = Qt.AddToSelection
+        else:
+            self._band_mode = Qt.ReplaceSelection
+        if event.modifiers() & Qt.AltModifier:
+            self._lasso_item = StrokePreview(
+                self.mapToScene(event.pos()), _LASSO_COLOR, 1
+            )
+            self._lasso_item.setZValue(_DIM_EXTENT)
+            self.scene.addItem(self._lasso_item)
+            return
+        if self._rubber_band is None:
+            self._rubber_band = QRubberBand(
+                QRubberBand.Rectangle, self.viewport()
+            )
+        self._rubber_band.setGeometry(QRect(self._band_origin, QSize()))
+        self._rubber_band.show()
+
+    def _update_selection_band(self, pos):
+        if self._lasso_item is not None:
+            self._lasso_item.append(self.mapToScene(pos))
+        else:
+            self._rubber_band.setGeometry(
+                QRect(self._band_origin, pos).normalized()
+            )
+
+    def _finish_selection_band(self, pos):
+        """Applique la zone tracée à la sélection.
+
+        ``setSelectionArea`` interroge l'index spatial de la scène pour ne
+        visiter que les éléments touchés et n'émet qu'un seul
+        ``selectionChanged`` pour l'ensemble.
+        """
+        self._update_selection_band(pos)
+        path = QPainterPath()
+        if self._lasso_item is not None:
+            path.addPolygon(polygon_from_coords(self._lasso_item.coords()))
+        else:
+            path.addPolygon(self.mapToScene(self._rubber_band.geometry()))
+        path.closeSubpath()
+        mode = self._band_mode
+        self._cancel_selection_band()
+        self.scene.setSelectionArea(
+            path, mode, Qt.IntersectsItemShape, self.viewportTransform()
+        )
+        if _trace_mouse.on:
+            _trace_mouse.trace(
+                "Selection area: %d items", len(self.scene.selectedItems())
+            )
+
+    def _cancel_selection_band(self):
+        if self._lasso_item is not None:
+            self.scene.removeItem(self._lasso_item)
+            self._lasso_item = None
+        if self._rubber_band is not None:
+            self._rubber_band.hide()
+        self._band_origin = None
+
     def _toggle_grid(self):
         self.show_grid = not self.show_grid
+        self.resetCachedContent()
         self.viewport().update()
 
     def _toggle_snap(self):
         self.snap_to_grid = not self.snap_to_grid
 
+    def set_stroke_options(self, tolerance: float, smoothing: bool):
+        """Configure la simplification (pixels écran) et le lissage des tracés."""
+        self.stroke_tolerance = max(0.0, float(tolerance))
+        self.stroke_smoothing = bool(smoothing)
+
+    def _scene_tolerance(self, tolerance: float | None = None) -> float:
+        """Convertit une tolérance en pixels écran en unités de scène."""
+        if tolerance is None:
+            tolerance = self.stroke_tolerance
+        scale = self.transform().m11() or 1
+        return tolerance / abs(scale)
+
+    def _finish_stroke(self, item):
+        """Simplifie et lisse un tracé libre qui vient d'être dessiné."""
+        before = len(item.coords()) // 2
+        item.simplify(self._scene_tolerance())
+        if self.stroke_smoothing:
+            item.set_smooth(True)
+        logger.debug(
+            "Stroke simplified from %d to %d points",
+            before,
+            len(item.coords()) // 2,
+        )
+
+    def simplify_selected(
+        self, tolerance: float | None = None, smooth: bool | None = None
+    ):
+        """Simplifie (et lisse si demandé) les tracés libres sélectionnés."""
+        if smooth is None:
+            smooth = self.stroke_smoothing
+        tolerance = self._scene_tolerance(tolerance)
+        changes = []
+        for it in self.scene.selectedItems():
+            if not isinstance(it, FreehandPath):
+                continue
+            changes.append((it, self._item_state(it)))
+            it.simplify(tolerance)
+            if smooth:
+                it.set_smooth(True)
+        self._push_state_change(changes, "Simplifier les tracés")
+
     def set_grid_size(self, size: int):
         self.grid_size = max(1, int(size))
+        self.resetCachedContent()
         self.viewport().update()
 
     def _change_pen_color(self, item):
@@ -962,19 +1384,27 @@ class CanvasWidget(QGraphicsView):
 
         color = QColorDialog.getColor(item.pen().color(), self)
         if color.isValid():
-            pen = item.pen()
-            pen.setColor(color)
-            item.setPen(pen)
+            def apply(it):
+                if hasattr(it, "setPen"):
+                    pen = it.pen()
+                    pen.setColor(color)
+                    it.setPen(pen)
+
+            self.edit_items(self._edit_targets(item), apply)
 
     def _change_brush_color(self, item):
         from PyQt5.QtWidgets import QColorDialog
 
         color = QColorDialog.getColor(item.brush().color(), self)
         if color.isValid():
-            brush = item.brush()
-            brush.setColor(color)
-            brush.setStyle(Qt.SolidPattern)
-            item.setBrush(brush)
+            def apply(it):
+                if hasattr(it, "setBrush"):
+                    brush = it.brush()
+                    brush.setColor(color)
+                    brush.setStyle(Qt.SolidPattern)
+                    it.setBrush(brush)
+
+            self.edit_items(self._edit_targets(item), apply)
 
     def insert_image(self, path: str, pos: QPointF | None = None):
         if not path:
@@ -984,8 +1414,7 @@ class CanvasWidget(QGraphicsView):
         item = ImageItem(pos.x(), pos.y(), path)
         self.scene.addItem(item)
         self._assign_layer_name(item)
-        self._mark_dirty()
-        self._schedule_scene_changed()
+        self._push_command(AddItemsCommand(self, [item]))
         return item
 
     def _change_pen_width(self, item):
@@ -995,9 +1424,13 @@ class CanvasWidget(QGraphicsView):
             self, "Épaisseur", "Largeur :", item.pen().width(), 1, 20
         )
         if ok:
-            pen = item.pen()
-            pen.setWidth(width)
-            item.setPen(pen)
+            def apply(it):
+                if hasattr(it, "setPen"):
+                    pen = it.pen()
+                    pen.setWidth(width)
+                    it.setPen(pen)
+
+            self.edit_items(self._edit_targets(item), apply)
 
     # ─── Couleur et sélection ─────────────────────────────────────────
     def set_pen_color(self, color: QColor):
@@ -1006,8 +1439,13 @@ class CanvasWidget(QGraphicsView):
 
     def _on_selection_changed(self):
         items = self.scene.selectedItems()
-        names = [getattr(it, "layer_name", type(it).__name__) for it in items]
-        logger.debug(f"Selection changed: {names}")
+        if _trace_mouse.on:
+            _trace_mouse.trace("Selection changed: %s", self._selection_names())
+        # Les modifications faites sur l'ancienne sélection (texte, inspecteur)
+        # sont enregistrées avant de changer d'élément de référence.
+        self.commit_item_edits()
+        self._edit_baseline.clear()
+        self._begin_item_edit(items[:1])
         window = self.window()
         if hasattr(window, "inspector"):
             # reuse computed items list above
@@ -1021,6 +1459,7 @@ class CanvasWidget(QGraphicsView):
 
 
     def _mark_dirty(self):
+        self.revision += 1
         window = self.window()
         if hasattr(window, "set_dirty"):
             window.set_dirty(True)
@@ -1029,21 +1468,75 @@ class CanvasWidget(QGraphicsView):
         """Debounce calls to _on_scene_changed to avoid UI freezes."""
         self._scene_changed_timer.start()
 
+    def _on_item_changed(self, item, kind):
+        """Tient les index à jour puis planifie le rafraîchissement."""
+        self.revision += 1
+        if kind == "removed":
+            self._names.remove(item)
+            self._unindex_z(item)
+        elif kind in ("added", "reparented", "renamed"):
+            self._names.add(item)
+            if kind != "renamed":
+                self._index_z(item)
+        elif kind == "reordered":
+            self._z_order.update(item)
+        self._schedule_scene_changed()
+
+    def _index_z(self, item):
+        """Indexe ``item`` et ses descendants sous leur parent direct."""
+        if item is not self._frame_item and not self._is_layer(item):
+            self._z_order.add(item, item.parentItem())
+        for child in item.childItems():
+            self._index_z(child)
+
+    def _unindex_z(self, item):
+        self._z_order.remove(item)
+        for child in item.childItems():
+            self._unindex_z(child)
+
+    def _is_layer(self, item) -> bool:
+        name = getattr(item, "layer_name", None)
+        return name is not None and self.layers.get(name) is item
+
     def _on_scene_changed(self):
-        self._mark_dirty()
+        self._apply_scene_diff(self.scene.tracker.flush())
+
+    def flush_scene_changes(self, mark_dirty: bool = True):
+        """Traite immédiatement les changements en attente."""
+        self._scene_changed_timer.stop()
+        self._apply_scene_diff(self.scene.tracker.flush(), mark_dirty)
+
+    def _apply_scene_diff(self, diff, mark_dirty: bool = True):
+        """Propage aux vues le différentiel des éléments modifiés."""
+        if diff.is_empty():
+            return
+        if mark_dirty:
+            self._mark_dirty()
         window = self.window()
+        touched = [
+            it
+            for it in diff.touched()
+            if not sip.isdeleted(it) and it.scene() is self.scene
+        ]
 
         # Agrandit automatiquement la zone de la scène pour permettre
         # le déplacement libre des formes en dehors du document initial.
-        bounds = self.scene.itemsBoundingRect().adjusted(-50, -50, 50, 50)
-        if not bounds.contains(self._doc_rect):
-            bounds = bounds.united(self._doc_rect)
-            self.setSceneRect(bounds)
+        bounds = QRectF()
+        for it in touched:
+            if it is not self._frame_item:
+                bounds = bounds.united(it.sceneBoundingRect())
+        if not bounds.isNull():
+            bounds = bounds.adjusted(-50, -50, 50, 50)
+            rect = self.sceneRect()
+            if not rect.contains(bounds):
+                self.setSceneRect(rect.united(bounds))
 
-        if not self._loading_snapshot:
-            self._snapshot()
-        if hasattr(window, "layout"):
-            window.layout.populate()
+        # Modifications faites hors souris/inspecteur (API, clavier…)
+        if not self._pointer_down:
+            self.commit_item_edits(touched)
+
+        if diff.is_structural() and hasattr(window, "layout"):
+            window.layout.apply_changes(diff)
 
     # --- Clipboard / editing helpers ---------------------------------
     def _serialize_item(self, item):
@@ -1080,6 +1573,22 @@ class CanvasWidget(QGraphicsView):
                 "rotation": item.rotation(),
                 "z": item.zValue(),
             }
+        if cls == "Triangle":
+            r = item.rect()
+            return {
+                "type": "triangle",
+                "name": getattr(item, "layer_name", ""),
+                "layer": getattr(item, "layer", ""),
+                "x": item.x(),
+                "y": item.y(),
+                "w": r.width(),
+                "h": r.height(),
+                "color": item.pen().color().name(),
+                "pen_width": item.pen().width(),
+                "fill": item.brush().color().name(),
+                "rotation": item.rotation(),
+                "z": item.zValue(),
+            }
         if cls == "Line":
             line = item.line()
             return {
@@ -1098,11 +1607,7 @@ class CanvasWidget(QGraphicsView):
                 "z": item.zValue(),
             }
         if cls == "FreehandPath":
-            path = item.path()
-            pts = [
-                (path.elementAt(i).x, path.elementAt(i).y)
-                for i in range(path.elementCount())
-            ]
+            pts = item.points()
             return {
                 "type": "path",
                 "name": getattr(item, "layer_name", ""),
@@ -1110,6 +1615,7 @@ class CanvasWidget(QGraphicsView):
                 "x": item.x(),
                 "y": item.y(),
                 "points": pts,
+                "smooth": item.is_smooth(),
                 "color": item.pen().color().name(),
                 "pen_width": item.pen().width(),
                 "fill": item.brush().color().name(),
@@ -1140,6 +1646,7 @@ class CanvasWidget(QGraphicsView):
                 "w": r.width(),
                 "h": r.height(),
                 "path": item.path,
+                "asset": item.asset,
                 "rotation": item.rotation(),
                 "z": item.zValue(),
             }
@@ -1175,6 +1682,20 @@ class CanvasWidget(QGraphicsView):
             item.setBrush(brush)
             item.setRotation(float(data.get("rotation", 0)))
             item.setZValue(float(data.get("z", 0)))
+        elif t == "triangle":
+            item = Triangle(
+                data["x"], data["y"], data["w"], data["h"], QColor(
+                    data["color"])
+            )
+            pen = item.pen()
+            pen.setWidth(int(data.get("pen_width", pen.width())))
+            item.setPen(pen)
+            brush = item.brush()
+            brush.setColor(QColor(data.get("fill", brush.color().name())))
+            brush.setStyle(Qt.SolidPattern)
+            item.setBrush(brush)
+            item.setRotation(float(data.get("rotation", 0)))
+            item.setZValue(float(data.get("z", 0)))
         elif t == "line":
             item = Line(
                 data["x1"], data["y1"], data["x2"], data["y2"], QColor(
@@ -1187,9 +1708,11 @@ class CanvasWidget(QGraphicsView):
             item.setRotation(float(data.get("rotation", 0)))
             item.setZValue(float(data.get("z", 0)))
         elif t == "path":
-            pts = [QPointF(p[0], p[1]) for p in data.get("points", [])]
+            pts = data.get("points", [])
             item = FreehandPath.from_points(
                 pts, QColor(data.get("color", "black")))
+            if data.get("smooth"):
+                item.set_smooth(True)
             pen = item.pen()
             pen.setWidth(int(data.get("pen_width", pen.width())))
             item.setPen(pen)
@@ -1214,19 +1737,24 @@ class CanvasWidget(QGraphicsView):
                 data.get("x", 0),
                 data.get("y", 0),
                 data.get("path", ""),
+                data.get("asset"),
+                data.get("w"),
+                data.get("h"),
             )
             item.setRotation(float(data.get("rotation", 0)))
             item.setZValue(float(data.get("z", 0)))
         else:
             return None
         self.scene.addItem(item)
-        logger.debug(
-            "Created %s flags=0x%x movable=%s selectable=%s",
-            type(item).__name__,
-            int(item.flags()),
-            bool(item.flags() & QGraphicsItem.ItemIsMovable),
-            bool(item.flags() & QGraphicsItem.ItemIsSelectable),
-        )
+        if _trace_items.on:
+            flags = int(item.flags())
+            _trace_items.trace(
+                "Created %s flags=0x%x movable=%s selectable=%s",
+                type(item).__name__,
+                flags,
+                bool(flags & QGraphicsItem.ItemIsMovable),
+                bool(flags & QGraphicsItem.ItemIsSelectable),
+            )
         layer = data.get("layer")
         if layer and layer in self.layers:
             self.layers[layer].addToGroup(item)
@@ -1235,65 +1763,62 @@ class CanvasWidget(QGraphicsView):
             self.current_layer.addToGroup(item)
             item.layer = self.current_layer.layer_name
         name = data.get("name")
-        if name:
+        if name and name not in self._names:
             item.layer_name = name
             self._register_name(name)
+            notify_change(item, "renamed")
         else:
+            # noms absents ou déjà pris (collage) : nouveau nom unique
             self._assign_layer_name(item)
         return item
 
     def copy_selected(self):
-        items = self.scene.selectedItems()
-        if not items:
-            return None
-        return self._serialize_item(items[0])
+        """Sérialise toute la sélection (liste de formes) ou ``None``."""
+        data = [
+            d for d in map(self._serialize_item, self.selected_roots()) if d
+        ]
+        return data or None
 
     def cut_selected(self):
         data = self.copy_selected()
         if data:
-            for it in self.scene.selectedItems():
-                self.scene.removeItem(it)
-            self._mark_dirty()
-            self._schedule_scene_changed()
+            self._remove_items(self.selected_roots())
         return data
 
-    def paste_item(self, data):
+    def paste_item(self, data, offset: float = 0):
+        """Recrée une forme ou une liste de formes en une seule opération."""
         if not data:
             return
-        data = dict(data)
-        data.pop("name", None)
-        item = self._create_item(data)
-        if item:
-            item.setSelected(True)
-            self._mark_dirty()
-            self._schedule_scene_changed()
+        if isinstance(data, dict):
+            data = [data]
+        items = []
+        for entry in data:
+            entry = dict(entry)
+            entry.pop("name", None)
+            if offset:
+                for key in ("x", "y", "x1", "x2", "y1", "y2"):
+                    if key in entry:
+                        entry[key] += offset
+            item = self._create_item(entry)
+            if item:
+                items.append(item)
+        if items:
+            self._select_items(items)
+            self._push_command(AddItemsCommand(self, items))
 
     def duplicate_selected(self):
-        data = self.copy_selected()
-        if not data:
-            return
-        if "x" in data:
-            data["x"] += 10
-        if "y" in data:
-            data["y"] += 10
-        if "x1" in data:
-            data["x1"] += 10
-            data["x2"] += 10
-        if "y1" in data:
-            data["y1"] += 10
-            data["y2"] += 10
-        self.paste_item(data)
+        self.paste_item(self.copy_selected(), offset=10)
 
     def delete_selected(self):
-        for it in self.scene.selectedItems():
-            self.scene.removeItem(it)
-        self._mark_dirty()
-        self._schedule_scene_changed()
+        self._remove_items(self.selected_roots())
 
     def select_all(self):
-        for it in self.scene.items():
-            if it is not self._frame_item:
-                it.setSelected(True)
+        """Sélectionne tout en une seule mise à jour de la sélection."""
+        path = QPainterPath()
+        path.addRect(self.scene.itemsBoundingRect())
+        self.scene.setSelectionArea(
+            path, Qt.ReplaceSelection, Qt.IntersectsItemBoundingRect
+        )
 
     def deselect_all(self):
         """Clear selection on the scene."""
@@ -1305,34 +1830,156 @@ class CanvasWidget(QGraphicsView):
     def zoom_out(self):
         self.scale(0.8, 0.8)
 
-    # --- Flip --------------------------------------------------------
-    def flip_horizontal_selected(self):
-        """Flip selected items horizontally around their center."""
-        items = [it for it in self.scene.selectedItems() if it is not self._frame_item]
+    # --- Sélection multiple -----------------------------------------
+    def selected_roots(self):
+        """Éléments sélectionnés dont aucun ancêtre n'est sélectionné.
+
+        Une opération groupée ne doit pas traiter un enfant en plus de son
+        groupe, sans quoi il serait transformé (ou supprimé) deux fois.
+        """
+        selected = [
+            it for it in self.scene.selectedItems() if it is not self._frame_item
+        ]
+        chosen = set(selected)
+        roots = []
+        for it in selected:
+            parent = it.parentItem()
+            while parent is not None and parent not in chosen:
+                parent = parent.parentItem()
+            if parent is None:
+                roots.append(it)
+        return roots
+
+    def _select_items(self, items):
+        """Remplace la sélection par ``items`` avec un seul ``selectionChanged``."""
+        blocked = self.scene.blockSignals(True)
+        try:
+            self.scene.clearSelection()
+            for it in items:
+                it.setSelected(True)
+        finally:
+            self.scene.blockSignals(blocked)
+        self.scene.selectionChanged.emit()
+
+    def _edit_targets(self, item):
+        """Toute la sélection si ``item`` en fait partie, sinon ``item`` seul."""
+        if item.isSelected():
+            return self.selected_roots()
+        return [item]
+
+    def edit_items(self, items, func, label: str | None = None, merge_key=None):
+        """Applique ``func`` à chaque élément ; une seule entrée d'historique."""
+        items = [it for it in items if it is not self._frame_item]
+        # les éditions en attente (texte saisi…) restent une entrée distincte
+        self.commit_item_edits(items)
+        before = [(it, self._item_state(it)) for it in items]
+        for it in items:
+            func(it)
+        self._push_state_change(before, label, merge_key)
+
+    def transform_selected(self, matrix: QTransform, label: str = "transform"):
+        """Applique ``matrix`` à la sélection, centrée sur son rectangle commun.
+
+        La transformation est exprimée dans le repère de la scène ; chaque
+        élément la reçoit dans son propre repère via ``setTransform``, sans
+        toucher à sa position ni à sa géométrie, ce qui reste linéaire en
+        nombre d'éléments et produit une seule entrée d'historique.
+
+        Qt applique ``rotation()``/``scale()`` avant ``transform()`` : la
+        nouvelle matrice se calcule donc dans le repère du parent
+        (``T(pos) · parent``), jamais à partir de ``sceneTransform()``.
+        """
+        items = self.selected_roots()
         if not items:
             return
+        bounds = QRectF()
         for it in items:
-            center = it.boundingRect().center()
-            orig = it.transformOriginPoint()
-            it.setTransformOriginPoint(center)
-            it.scale(-1, 1)
-            it.setTransformOriginPoint(orig)
-        self._mark_dirty()
-        self._schedule_scene_changed()
+            bounds = bounds.united(it.sceneBoundingRect())
+        c = bounds.center()
+        around = (
+            QTransform.fromTranslate(-c.x(), -c.y())
+            * matrix
+            * QTransform.fromTranslate(c.x(), c.y())
+        )
+        changes = []
+        for it in items:
+            pos = it.pos()
+            to_scene = QTransform.fromTranslate(pos.x(), pos.y())
+            parent = it.parentItem()
+            if parent is not None:
+                to_scene *= parent.sceneTransform()
+            inverse, ok = to_scene.inverted()
+            if not ok:
+                continue
+            old = it.transform()
+            changes.append((it, old, old * to_scene * around * inverse))
+        if changes:
+            self._push_command(
+                TransformItemsCommand(self, changes, label), applied=False
+            )
+
+    def move_selected(self, dx: float, dy: float):
+        """Décale la sélection de ``(dx, dy)`` unités de scène."""
+        moves = []
+        for it in self.selected_roots():
+            target = it.scenePos() + QPointF(dx, dy)
+            parent = it.parentItem()
+            if parent is not None:
+                target = parent.mapFromScene(target)
+            moves.append((it, it.pos(), target))
+        if moves:
+            self._push_command(MoveItemsCommand(self, moves), applied=False)
+
+    def rotate_selected(self, angle: float):
+        """Fait pivoter la sélection de ``angle`` degrés autour de son centre."""
+        self.transform_selected(QTransform().rotate(angle), "rotate")
+
+    def scale_selected(self, sx: float, sy: float | None = None):
+        """Met la sélection à l'échelle ``(sx, sy)`` autour de son centre."""
+        if sy is None:
+            sy = sx
+        self.transform_selected(QTransform.fromScale(sx, sy), "scale")
+
+    # --- Flip --------------------------------------------------------
+    def flip_horizontal_selected(self):
+        """Flip the selection horizontally around its center."""
+        self.transform_selected(QTransform.fromScale(-1, 1), "flip")
 
     def flip_vertical_selected(self):
-        """Flip selected items vertically around their center."""
-        items = [it for it in self.scene.selectedItems() if it is not self._frame_item]
+        """Flip the selection vertically around its center."""
+        self.transform_selected(QTransform.fromScale(1, -1), "flip")
+
+    # --- Ordre d'empilement -----------------------------------------
+    def bring_to_front_selected(self):
+        """Place la sélection au premier plan de son calque."""
+        self._restack_selected(front=True)
+
+    def send_to_back_selected(self):
+        """Place la sélection à l'arrière-plan de son calque."""
+        self._restack_selected(front=False)
+
+    def _restack_selected(self, front: bool):
+        items = [
+            it
+            for it in self.scene.selectedItems()
+            if it is not self._frame_item and it in self._z_order
+        ]
         if not items:
             return
+        # l'ordre relatif de la sélection est conservé
+        items.sort(key=lambda it: it.zValue())
+        by_parent = {}
         for it in items:
-            center = it.boundingRect().center()
-            orig = it.transformOriginPoint()
-            it.setTransformOriginPoint(center)
-            it.scale(1, -1)
-            it.setTransformOriginPoint(orig)
-        self._mark_dirty()
-        self._schedule_scene_changed()
+            by_parent.setdefault(it.parentItem(), []).append(it)
+        changes = []
+        for parent, group in by_parent.items():
+            if front:
+                start = self._z_order.top(parent) + 1
+            else:
+                start = self._z_order.bottom(parent) - len(group)
+            for i, it in enumerate(group):
+                changes.append((it, it.zValue(), start + i))
+        self._push_command(ReorderCommand(self, changes), applied=False)
 
     def keyPressEvent(self, event):
         if event.key() == Qt.Key_Escape and self._temp_item:
@@ -1340,39 +1987,209 @@ class CanvasWidget(QGraphicsView):
             self._temp_item = None
             self._start_pos = None
             return
+        if event.key() == Qt.Key_Escape and self._band_origin is not None:
+            self._cancel_selection_band()
+            return
+        step = _NUDGE_KEYS.get(event.key())
+        if step and self.scene.focusItem() is None and self.scene.selectedItems():
+            # Maj : déplacement d'un pas de grille
+            factor = 1
+            if event.modifiers() & Qt.ShiftModifier:
+                factor = self.grid_size / (self.transform().m11() or 1)
+            self.move_selected(step[0] * factor, step[1] * factor)
+            return
         super().keyPressEvent(event)
 
     # --- Historique --------------------------------------------------
-    def _snapshot(self):
-        data = self.export_project()
-        self._history = self._history[: self._history_index + 1]
-        self._history.append(data)
-        self._history_index += 1
-
-    def _load_snapshot(self, snap):
-        self._loading_snapshot = True
-        self.new_document(
-            snap.get("width", 0),
-            snap.get("height", 0),
-            snap.get("unit", "px"),
-            snap.get("orientation", "portrait"),
-            snap.get("color_mode", "RGB"),
-            snap.get("dpi", 72),
-            name=snap.get("name", ""),
+    def set_history_limits(self, max_depth: int, max_bytes: int):
+        """Configure la profondeur et le budget mémoire de l'historique."""
+        self._undo_stack.set_limits(max_depth, max_bytes)
+
+    def _push_command(self, command, applied: bool = True):
+        """Ajoute une commande à l'historique (l'exécute si nécessaire)."""
+        self._undo_stack.push(command, applied)
+        self._track_command(command)
+        self._mark_dirty()
+        self._schedule_scene_changed()
+
+    def _push_state_change(
+        self, changes, label: str | None = None, merge_key=None
+    ):
+        """Enregistre ``(item, état avant)`` pour des éléments déjà modifiés."""
+        changes = [
+            (it, before, self._item_state(it)) for it, before in changes
+        ]
+        changes = [c for c in changes if c[1] != c[2]]
+        if changes:
+            self._push_command(
+                ItemStateCommand(self, changes, label, merge_key)
+            )
+
+    def _remove_items(self, items):
+        items = [it for it in items if it is not self._frame_item]
+        if items:
+            self._push_command(RemoveItemsCommand(self, items), applied=False)
+
+    def _begin_item_edit(self, items):
+        """Mémorise l'état de référence d'éléments sur le point d'être édités."""
+        for it in items:
+            if it is not self._frame_item and it not in self._edit_baseline:
+                self._edit_baseline[it] = self._item_state(it)
+
+    def _track_command(self, command):
+        """Signale les éléments touchés par une commande appliquée."""
+        tracker = self.scene.tracker
+        for it in command.items():
+            tracker.mark(it, "restyled")
+            if it in self._edit_baseline:
+                self._edit_baseline[it] = self._item_state(it)
+
+    def commit_item_edits(self, items=None, merge_key=None):
+        """Ajoute à l'historique les modifications des éléments suivis.
+
+        ``items`` restreint la vérification à un sous-ensemble d'éléments.
+        """
+        moves = []
+        changes = []
+        baseline = self._edit_baseline
+        if items is None:
+            tracked = list(baseline.items())
+        else:
+            tracked = [(it, baseline[it]) for it in items if it in baseline]
+        for it, before in tracked:
+            if sip.isdeleted(it) or it.scene() is not self.scene:
+                del self._edit_baseline[it]
+                continue
+            after = self._item_state(it)
+            if after == before:
+                continue
+            self._edit_baseline[it] = after
+            if _only_moved(before, after):
+                moves.append((it, QPointF(before["x"], before["y"]), it.pos()))
+            else:
+                changes.append((it, before, after))
+        commands = []
+        if moves:
+            commands.append(MoveItemsCommand(self, moves, merge_key))
+        if changes:
+            commands.append(ItemStateCommand(self, changes, merge_key=merge_key))
+        if not commands:
+            return
+        command = commands[0] if len(commands) == 1 else MacroCommand(self, commands)
+        self._push_command(command)
+
+    def _item_state(self, item):
+        """Capture l'état restaurable d'un élément pour l'historique."""
+        state = self._serialize_item(item) or {
+            "x": item.x(),
+            "y": item.y(),
+            "rotation": item.rotation(),
+            "z": item.zValue(),
+        }
+        t = item.transform()
+        origin = item.transformOriginPoint()
+        state.update(
+            opacity=item.opacity(),
+            scale=item.scale(),
+            transform=(
+                t.m11(), t.m12(), t.m13(),
+                t.m21(), t.m22(), t.m23(),
+                t.m31(), t.m32(), t.m33(),
+            ),
+            origin=(origin.x(), origin.y()),
+            var_name=getattr(item, "var_name", ""),
+            name=getattr(item, "layer_name", ""),
         )
-        self.setup_layers(snap.get("layers", []))
-        self.load_shapes(snap.get("shapes", []))
-        self._loading_snapshot = False
+        return state
+
+    def _apply_item_state(self, item, state):
+        """Restaure sur place un état produit par :meth:`_item_state`."""
+        t = state.get("type")
+        if t in ("rect", "ellipse", "triangle", "image"):
+            r = item.rect()
+            if (r.width(), r.height()) != (state["w"], state["h"]):
+                item.setRect(state["x"], state["y"], state["w"], state["h"])
+        elif t == "line":
+            item.setLine(state["x1"], state["y1"], state["x2"], state["y2"])
+        elif t == "path":
+            item.set_coords(
+                coords_from_points(state.get("points", [])),
+                state.get("smooth", False),
+            )
+        elif t == "text":
+            if item.toPlainText() != state["text"]:
+                item.setPlainText(state["text"])
+            font = item.font()
+            font.setPointSize(int(state["font_size"]))
+            item.setFont(font)
+            item.setDefaultTextColor(QColor(state["color"]))
+        if t != "text" and "color" in state and hasattr(item, "setPen"):
+            pen = item.pen()
+            pen.setColor(QColor(state["color"]))
+            pen.setWidth(int(state.get("pen_width", pen.width())))
+            item.setPen(pen)
+        if "fill" in state and hasattr(item, "setBrush"):
+            brush = item.brush()
+            brush.setColor(QColor(state["fill"]))
+            item.setBrush(brush)
+        item.setPos(state["x"], state["y"])
+        item.setRotation(state["rotation"])
+        item.setZValue(state["z"])
+        item.setOpacity(state["opacity"])
+        item.setScale(state["scale"])
+        item.setTransform(QTransform(*state["transform"]))
+        item.setTransformOriginPoint(*state["origin"])
+        if hasattr(item, "var_name"):
+            item.var_name = state["var_name"]
+        name = state.get("name")
+        if name and name != getattr(item, "layer_name", None):
+            item.layer_name = name
+            notify_change(item, "renamed")
+
+    def _attach_item(self, item, parent=None):
+        """Réinsère ``item`` dans la scène sous ``parent``."""
+        if item.scene() is not self.scene:
+            self.scene.addItem(item)
+        if parent is not None and item.parentItem() is not parent:
+            self._reparent_item(item, parent)
+
+    def _detach_item(self, item):
+        """Retire ``item`` de la scène en le gardant en vie pour un redo."""
+        if item.scene() is self.scene:
+            self.scene.removeItem(item)
+
+    def _reparent_item(self, item, parent):
+        if parent is None:
+            item.setParentItem(None)
+        elif hasattr(parent, "addToGroup"):
+            parent.addToGroup(item)
+        else:
+            item.setParentItem(parent)
+        self._set_item_layer(item, parent)
+
+    def _set_item_layer(self, item, parent):
+        """Met à jour l'attribut ``layer`` d'après le parent de l'élément."""
+        if parent is None:
+            return
+        name = getattr(parent, "layer_name", None)
+        if name in self.layers and self.layers[name] is parent:
+            item.layer = name
+        elif hasattr(parent, "layer"):
+            item.layer = parent.layer
 
     def undo(self):
-        if self._history_index > 0:
-            self._history_index -= 1
-            self._load_snapshot(self._history[self._history_index])
+        command = self._undo_stack.undo()
+        if command:
+            self._edit_baseline.clear()
+            self._track_command(command)
+            self._mark_dirty()
 
     def redo(self):
-        if self._history_index + 1 < len(self._history):
-            self._history_index += 1
-            self._load_snapshot(self._history[self._history_index])
+        command = self._undo_stack.redo()
+        if command:
+            self._edit_baseline.clear()
+            self._track_command(command)
+            self._mark_dirty()
 
     # --- Export supplémentaires --------------------------------------
     def export_pdf(self, path: str):
@@ -1418,20 +2235,29 @@ class CanvasWidget(QGraphicsView):
             items.sort(key=lambda it: it.zValue())
         group = TransparentItemGroup()
         self.scene.addItem(group)
+        records = []
         for it in items:
+            parent, pos = it.parentItem(), QPointF(it.pos())
             group.addToGroup(it)
+            records.append((it, parent, pos, QPointF(it.pos())))
         # Keep the group's z to match the highest child so layers don't bounce
         group.setZValue(max(it.zValue() for it in items))
         group.setFlags(
-            QGraphicsItem.ItemIsSelectable | QGraphicsItem.ItemIsMovable
+            QGraphicsItem.ItemIsSelectable
+            | QGraphicsItem.ItemIsMovable
+            | QGraphicsItem.ItemSendsGeometryChanges
         )
         self._assign_layer_name(group, "group")
         if self.current_layer:
             self.current_layer.addToGroup(group)
             group.layer = self.current_layer.layer_name
+        for it, _parent, _pos, _inner in records:
+            self._set_item_layer(it, group.parentItem())
         self.scene.clearSelection()
         group.setSelected(True)
-        self._schedule_scene_changed()
+        self._push_command(
+            GroupCommand(self, group, group.parentItem(), records)
+        )
         return group
 
     def ungroup_item(self, group):
@@ -1440,14 +2266,24 @@ class CanvasWidget(QGraphicsView):
             return
         children = group.childItems()
         if isinstance(group, TransparentItemGroup):
+            # Les enfants retournent dans le calque du groupe sans bouger.
+            parent = group.parentItem()
+            records = []
             for ch in children:
+                inner = QPointF(ch.pos())
+                scene_pos = ch.scenePos()
                 group.removeFromGroup(ch)
+                self._reparent_item(ch, parent)
+                ch.setPos(parent.mapFromScene(scene_pos) if parent else scene_pos)
+                records.append((ch, parent, QPointF(ch.pos()), inner))
                 ch.setSelected(True)
+            command = UngroupCommand(self, group, parent, records)
             self.scene.removeItem(group)
-        else:
-            self.scene.destroyItemGroup(group)
-            for ch in children:
-                ch.setSelected(True)
+            self._push_command(command)
+            return
+        self.scene.destroyItemGroup(group)
+        for ch in children:
+            ch.setSelected(True)
         self._schedule_scene_changed()
 
     def create_collection(self, name: str = "collection"):
@@ -1455,7 +2291,9 @@ class CanvasWidget(QGraphicsView):
         group = TransparentItemGroup()
         self.scene.addItem(group)
         group.setFlags(
-            QGraphicsItem.ItemIsSelectable | QGraphicsItem.ItemIsMovable
+            QGraphicsItem.ItemIsSelectable
+            | QGraphicsItem.ItemIsMovable
+            | QGraphicsItem.ItemSendsGeometryChanges
         )
         self._assign_layer_name(group, name)
         if self.current_layer:
@@ -1472,7 +2310,10 @@ class CanvasWidget(QGraphicsView):
         group = TransparentItemGroup()
         self.scene.addItem(group)
         # Layers should not be selectable so items are easy to manipulate
-        self._assign_layer_name(group, name)
+        # Keep the requested name so saved projects reopen with the same
+        # layer names shapes refer to.
+        group.layer_name = self._unique_name(name)
+        notify_change(group, "renamed")
         group.setVisible(visible)
         group.visible = visible
         group.locked = False
@@ -1518,6 +2359,8 @@ class CanvasWidget(QGraphicsView):
     def set_layer_visible(self, name: str, visible: bool):
         layer = self.layers.get(name)
         if layer:
+            if visible:
+                self._materialize_layer(name)
             layer.setVisible(visible)
             layer.visible = visible
             self._schedule_scene_changed()
@@ -1536,26 +2379,47 @@ class CanvasWidget(QGraphicsView):
     def remove_layer(self, name: str):
         if name not in self.layers or len(self.layers) <= 1:
             return
+        self._materialize_layer(name)
+        index = list(self.layers.keys()).index(name)
+        self._push_command(
+            RemoveLayerCommand(self, name, self.layers[name], index),
+            applied=False,
+        )
+
+    def _detach_layer(self, name: str):
         layer = self.layers.pop(name)
         self.scene.removeItem(layer)
         if self.current_layer is layer:
             self.current_layer = next(iter(self.layers.values()))
         self.set_current_layer(self.current_layer.layer_name)
-        self._schedule_scene_changed()
+
+    def _attach_layer(self, name: str, layer, index: int):
+        self.scene.addItem(layer)
+        names = list(self.layers.keys())
+        names.insert(index, name)
+        self.layers[name] = layer
+        self._reorder(names)
+        self._apply_lock_setting()
 
     def rename_layer(self, old: str, new: str):
         if old not in self.layers or not new:
             return
-        if new in self.layers:
+        if new in self.layers or new in self._names:
             base = new
             i = 1
-            while f"{base} {i}" in self.layers:
+            while f"{base} {i}" in self.layers or f"{base} {i}" in self._names:
                 i += 1
             new = f"{base} {i}"
         keys = list(self.layers.keys())
         idx = keys.index(old)
         layer = self.layers.pop(old)
         layer.layer_name = new
+        if old in self._deferred_layers:
+            loader = self._deferred_layers.pop(old)
+            self._deferred_layers[new] = lambda: [
+                {**shp, "layer": new} for shp in loader()
+            ]
+        self.scene.tracker.mark(layer, "renamed")
         for child in layer.childItems():
             child.layer = new
         keys[idx] = new
@@ -1567,6 +2431,7 @@ class CanvasWidget(QGraphicsView):
     def duplicate_layer(self, name: str):
         if name not in self.layers:
             return
+        self._materialize_layer(name)
         src = self.layers[name]
         base = f"{name} copy"
         i = 1
@@ -1604,13 +2469,15 @@ class CanvasWidget(QGraphicsView):
         new_idx = max(0, min(len(keys) - 1, idx + offset))
         if new_idx == idx:
             return
+        old = list(keys)
         keys.insert(new_idx, keys.pop(idx))
-        self._reorder(keys)
+        self._push_command(LayerOrderCommand(self, old, keys), applied=False)
 
     def _reorder(self, names):
         self.layers = OrderedDict((n, self.layers[n]) for n in names)
         for z, n in enumerate(names):
             self.layers[n].setZValue(z)
+            self.scene.tracker.mark(self.layers[n], "reordered")
 
 
     def setup_layers(self, layers_data):
@@ -1618,6 +2485,7 @@ class CanvasWidget(QGraphicsView):
         for layer in self.layers.values():
             self.scene.removeItem(layer)
         self.layers.clear()
+        self._deferred_layers.clear()
         self.current_layer = None
         if not layers_data:
             self.create_layer("Layer 1")
@@ -1634,18 +2502,39 @@ class CanvasWidget(QGraphicsView):
 
 
     # --- Item lookup -------------------------------------------------
+    def find_item(self, name: str):
+        """Return the item (or layer) stored under ``name``, if any."""
+        return self._names.find(name)
+
+    def layer_of(self, item):
+        """Return the layer group containing ``item``."""
+        return self._names.layer_of(item)
+
+    def rename_item(self, item, name: str) -> str:
+        """Rename ``item`` keeping names unique; return the name applied."""
+        current = getattr(item, "layer_name", None)
+        if self._is_layer(item):
+            self.rename_layer(current, name)
+            return item.layer_name
+        if not name or name == current:
+            return current
+        name = self._unique_name(name)
+        before = self._item_state(item)
+        item.layer_name = name
+        notify_change(item, "renamed")
+        self._push_state_change([(item, before)], "Renommer")
+        return name
+
     def select_item_by_name(self, name: str):
         """Select the item having the given stored name."""
-        for it in self.scene.items():
-            if getattr(it, "layer_name", None) == name:
-                logger.debug("Selecting item %s", name)
-                self.scene.clearSelection()
-                it.setSelected(True)
-                self.ensureVisible(it.sceneBoundingRect())
-                break
-
-        else:
+        it = self._names.find(name)
+        if it is None or it.scene() is not self.scene:
             logger.debug("Item %s not found", name)
+            return
+        logger.debug("Selecting item %s", name)
+        self.scene.clearSelection()
+        it.setSelected(True)
+        self.ensureVisible(it.sceneBoundingRect())
 
 
     def get_debug_report(self) -> str:
@@ -1690,11 +2579,23 @@ class CanvasWidget(QGraphicsView):
         lines.append("")
 
         lines.append("== History ==")
-        lines.append(f"index: {self._history_index} / {len(self._history)}")
-        for i, snap in enumerate(self._history):
-            count = len(snap.get("shapes", []))
-            name = snap.get("name", "")
-            lines.append(f"  {i}: {name} shapes={count}")
+        stack = self._undo_stack
+        stats = stack.stats()
+        lines.append(f"index: {stack.index} / {len(stack)}")
+        lines.append(
+            f"entries: {stats['entries']}/{stats['max_depth']} "
+            f"bytes: {stats['bytes']}/{stats['max_bytes']} "
+            f"evictions: {stats['evictions']} "
+            f"compactions: {stats['compactions']}"
+        )
+        for i, cmd in enumerate(stack.commands()):
+            lines.append(f"  {i}: {cmd.label} items={len(cmd.items())}")
+        lines.append("")
+
+        lines.append("== Traces ==")
+        enabled = [cat.name for cat in trace.categories() if cat.on]
+        lines.append(f"enabled: {', '.join(enabled) if enabled else '(none)'}")
+        lines.extend(trace.records(200))
         lines.append("")
 
         lines.append(f"Tool: {self.current_tool}")
@@ -1716,3 +2617,22 @@ class CanvasWidget(QGraphicsView):
             lines.append(f"{name}: " + (", ".join(children) if children else "(empty)"))
 
         return "\n".join(lines)
+
+
+def _dim_bands(doc: QRectF) -> list[QRectF]:
+    """Bandes couvrant tout le plan hors de ``doc`` (haut, bas, gauche, droite)."""
+    far = _DIM_EXTENT
+    return [
+        QRectF(-far, -far, 2 * far, doc.top() + far),
+        QRectF(-far, doc.bottom(), 2 * far, far - doc.bottom()),
+        QRectF(-far, doc.top(), doc.left() + far, doc.height()),
+        QRectF(doc.right(), doc.top(), far - doc.right(), doc.height()),
+    ]
+
+
+def _only_moved(before: dict, after: dict) -> bool:
+    """Vrai si deux états d'élément ne diffèrent que par leur position."""
+    ignore = ("x", "y")
+    return {k: v for k, v in before.items() if k not in ignore} == {
+        k: v for k, v in after.items() if k not in ignore
+    }
@@ -0,0 +1,184 @@
+# pictocode/geometry.py
+"""
+Conversions en bloc entre tableaux de coordonnées et types géométriques Qt.
+
+Les tracés gardent leurs sommets dans un ``array('d')`` contigu
+``[x0, y0, x1, y1, …]`` dont la disposition mémoire est celle d'un
+vecteur de ``QPointF`` : les conversions vers et depuis ``QPolygonF`` se
+font par simple copie mémoire au lieu d'un appel Python par sommet.
+"""
+
+from array import array
+from itertools import chain
+
+from PyQt5.QtCore import QPointF
+from PyQt5.QtGui import QPainterPath, QPolygonF
+
+# un QPointF = deux doubles
+_POINT_BYTES = 2 * array("d").itemsize
+
+
+def coords_from_points(points) -> array:
+    """Aplati ``points`` (couples, ``QPointF`` ou ``QPolygonF``)."""
+    if isinstance(points, array):
+        return points if points.typecode == "d" else array("d", points)
+    if isinstance(points, QPolygonF):
+        return coords_from_polygon(points)
+    points = list(points)
+    if points and isinstance(points[0], QPointF):
+        return array("d", chain.from_iterable((p.x(), p.y()) for p in points))
+    return array("d", chain.from_iterable(points))
+
+
+def points_from_coords(coords) -> list:
+    """Retourne les sommets sous forme de couples ``(x, y)``."""
+    return list(zip(coords[0::2], coords[1::2]))
+
+
+def polygon_from_coords(coords) -> QPolygonF:
+    count = len(coords) // 2
+    polygon = QPolygonF(count)
+    if count:
+        ptr = polygon.data()
+        ptr.setsize(count * _POINT_BYTES)
+        memoryview(ptr)[:] = memoryview(coords).cast("B")
+    return polygon
+
+
+def coords_from_polygon(polygon: QPolygonF) -> array:
+    coords = array("d")
+    if polygon.size():
+        ptr = polygon.data()
+        ptr.setsize(polygon.size() * _POINT_BYTES)
+        coords.frombytes(ptr.asstring())
+    return coords
+
+
+def is_closed(coords) -> bool:
+    """Vrai si le premier et le dernier sommet (sur au moins 3) coïncident."""
+    return (
+        len(coords) >= 6
+        and coords[0] == coords[-2]
+        and coords[1] == coords[-1]
+    )
+
+
+def path_from_coords(coords) -> QPainterPath:
+    path = QPainterPath()
+    if len(coords) >= 4:
+        path.addPolygon(polygon_from_coords(coords))
+        if is_closed(coords):
+            path.closeSubpath()
+    elif len(coords) == 2:
+        path.moveTo(coords[0], coords[1])
+    return path
+
+
+def coords_from_path(path: QPainterPath) -> array:
+    """Sommets d'un chemin ; les courbes éventuelles sont aplaties."""
+    polygons = path.toSubpathPolygons()
+    if not polygons:
+        # chemin réduit à un point de départ
+        return array(
+            "d",
+            chain.from_iterable(
+                (path.elementAt(i).x, path.elementAt(i).y)
+                for i in range(path.elementCount())
+            ),
+        )
+    coords = coords_from_polygon(polygons[0])
+    for polygon in polygons[1:]:
+        coords.extend(coords_from_polygon(polygon))
+    return coords
+
+
+def simplify_coords(coords, tolerance: float) -> array:
+    """Simplifie un tracé par Ramer–Douglas–Peucker.
+
+    Les sommets conservés sont à moins de ``tolerance`` du tracé d'origine ;
+    le premier et le dernier sommet sont toujours gardés.
+    """
+    count = len(coords) // 2
+    if count < 3 or tolerance <= 0:
+        return array("d", coords)
+    xs = coords[0::2]
+    ys = coords[1::2]
+    keep = bytearray(count)
+    keep[0] = keep[-1] = 1
+    tol2 = tolerance * tolerance
+    # pile explicite : pas de récursion sur les longs tracés
+    stack = [(0, count - 1)]
+    while stack:
+        first, last = stack.pop()
+        ax, ay = xs[first], ys[first]
+        dx, dy = xs[last] - ax, ys[last] - ay
+        norm2 = dx * dx + dy * dy
+        best, index = tol2, -1
+        for i in range(first + 1, last):
+            px, py = xs[i] - ax, ys[i] - ay
+            if norm2:
+                cross = px * dy - py * dx
+                dist2 = cross * cross / norm2
+            else:
+                dist2 = px * px + py * py
+            if dist2 > best:
+                best, index = dist2, i
+        if index >= 0:
+            keep[index] = 1
+            stack.append((first, index))
+            stack.append((index, last))
+    return array(
+        "d",
+        chain.from_iterable(
+            (xs[i], ys[i]) for i in range(count) if keep[i]
+        ),
+    )
+
+
+def bezier_segments(coords) -> list:
+    """Courbes cubiques (Catmull-Rom) passant par les sommets de ``coords``.
+
+    Retourne une liste ``(c1x, c1y, c2x, c2y, x, y)`` par segment, le
+    point de départ étant le premier sommet.
+    """
+    pts = points_from_coords(coords)
+    closed = is_closed(coords)
+    if closed:
+        pts = pts[:-1]
+    count = len(pts)
+    if count < 2:
+        return []
+    segments = []
+    last = count if closed else count - 1
+    for i in range(last):
+        p1 = pts[i]
+        p2 = pts[(i + 1) % count]
+        if closed:
+            p0 = pts[i - 1]
+            p3 = pts[(i + 2) % count]
+        else:
+            p0 = pts[i - 1] if i > 0 else p1
+            p3 = pts[i + 2] if i + 2 < count else p2
+        segments.append((
+            p1[0] + (p2[0] - p0[0]) / 6,
+            p1[1] + (p2[1] - p0[1]) / 6,
+            p2[0] - (p3[0] - p1[0]) / 6,
+            p2[1] - (p3[1] - p1[1]) / 6,
+            p2[0],
+            p2[1],
+        ))
+    return segments
+
+
+def smooth_path_from_coords(coords) -> QPainterPath:
+    """Chemin lissé en courbes de Bézier passant par chaque sommet."""
+    segments = bezier_segments(coords)
+    if not segments:
+        return path_from_coords(coords)
+    path = QPainterPath()
+    path.moveTo(coords[0], coords[1])
+    for segment in segments:
+        path.cubicTo(*segment)
+    if is_closed(coords):
+        path.closeSubpath()
+    return path
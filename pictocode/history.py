@@ -0,0 +1,533 @@
+# pictocode/history.py
+"""
+Historique d'annulation basé sur des commandes.
+
+Chaque commande ne retient que les éléments qu'elle modifie et sait se
+rejouer ou s'annuler directement sur la scène vivante : le coût d'un
+undo dépend de la taille de l'édition et non de celle du document.
+"""
+import logging
+import pickle
+import sys
+import zlib
+from array import array
+from PyQt5.QtCore import QPointF
+
+from .geometry import coords_from_points, points_from_coords
+
+logger = logging.getLogger(__name__)
+
+# Coût forfaitaire d'une référence d'élément dans une commande
+_RECORD_BYTES = 64
+
+
+def _state_size(state) -> int:
+    """Estimation (en octets) de l'empreinte mémoire d'un état d'élément."""
+    if state is None:
+        return 0
+    size = sys.getsizeof(state)
+    for value in state.values():
+        size += sys.getsizeof(value)
+        if isinstance(value, (list, tuple)) and value:
+            # liste de points : un tuple + deux flottants par sommet
+            first = value[0]
+            per_item = sys.getsizeof(first)
+            if isinstance(first, tuple):
+                per_item += sum(sys.getsizeof(v) for v in first)
+            size += per_item * len(value)
+    return size
+
+
+def _pack_state(state: dict) -> dict:
+    """Remplace les listes de points par des tableaux contigus de flottants."""
+    points = state.get("points")
+    if points is None or isinstance(points, array):
+        return state
+    return {**state, "points": coords_from_points(points)}
+
+
+def _unpack_state(state: dict) -> dict:
+    points = state.get("points")
+    if not isinstance(points, array):
+        return state
+    return {**state, "points": points_from_coords(points)}
+
+
+class Command:
+    """Opération annulable appliquée au canvas."""
+
+    label = "edit"
+    #: Deux commandes consécutives ayant la même clé non nulle fusionnent.
+    merge_key = None
+
+    def __init__(self, canvas):
+        self.canvas = canvas
+
+    def redo(self):
+        raise NotImplementedError
+
+    def undo(self):
+        raise NotImplementedError
+
+    def items(self) -> list:
+        """Éléments touchés par la commande."""
+        return []
+
+    def merge(self, other: "Command") -> bool:
+        """Absorbe ``other`` si possible et retourne ``True`` en cas de succès."""
+        return False
+
+    def size_bytes(self) -> int:
+        """Estimation de la mémoire retenue par la commande."""
+        return _RECORD_BYTES * max(1, len(self.items()))
+
+    def compact(self) -> bool:
+        """Réduit l'empreinte mémoire d'une entrée ancienne.
+
+        Retourne ``True`` si la commande a effectivement été compactée.
+        """
+        return False
+
+
+class AddItemsCommand(Command):
+    """Ajout d'éléments dans la scène (création, collage, duplication)."""
+
+    label = "add"
+
+    def __init__(self, canvas, items):
+        super().__init__(canvas)
+        self._records = [
+            (it, it.parentItem(), QPointF(it.pos())) for it in items
+        ]
+
+    def items(self):
+        return [it for it, _parent, _pos in self._records]
+
+    def redo(self):
+        for it, parent, pos in self._records:
+            self.canvas._attach_item(it, parent)
+            it.setPos(pos)
+
+    def undo(self):
+        for it, _parent, _pos in reversed(self._records):
+            self.canvas._detach_item(it)
+
+
+class RemoveItemsCommand(AddItemsCommand):
+    """Suppression d'éléments (gomme, couper, supprimer)."""
+
+    label = "remove"
+
+    def redo(self):
+        AddItemsCommand.undo(self)
+
+    def undo(self):
+        AddItemsCommand.redo(self)
+
+
+class MoveItemsCommand(Command):
+    """Déplacement d'éléments : seules les positions sont conservées."""
+
+    label = "move"
+
+    def __init__(self, canvas, moves, merge_key=None):
+        super().__init__(canvas)
+        # (item, ancienne position, nouvelle position)
+        self._moves = [(it, QPointF(old), QPointF(new)) for it, old, new in moves]
+        self.merge_key = merge_key
+
+    def items(self):
+        return [it for it, _old, _new in self._moves]
+
+    def redo(self):
+        for it, _old, new in self._moves:
+            it.setPos(new)
+
+    def undo(self):
+        for it, old, _new in self._moves:
+            it.setPos(old)
+
+    def merge(self, other):
+        if not isinstance(other, MoveItemsCommand):
+            return False
+        if [m[0] for m in other._moves] != [m[0] for m in self._moves]:
+            return False
+        self._moves = [
+            (it, old, new)
+            for (it, old, _), (_, _, new) in zip(self._moves, other._moves)
+        ]
+        return True
+
+
+class ItemStateCommand(Command):
+    """Changement d'état (style, taille, rotation…) de quelques éléments."""
+
+    label = "restyle"
+
+    def __init__(self, canvas, changes, label: str | None = None, merge_key=None):
+        super().__init__(canvas)
+        # (item, état avant, état après) tels que produits par _item_state
+        self._changes = list(changes)
+        if label:
+            self.label = label
+        self.merge_key = merge_key
+        # Une fois compactée, la commande ne garde que les éléments et un
+        # blob compressé des états (les états "après" ne stockant que les
+        # clés modifiées et celles supprimées, le reste étant partagé
+        # structurellement avec l'état "avant").
+        self._items = None
+        self._blob = None
+
+    def _expanded(self):
+        if self._blob is None:
+            return self._changes
+        pairs = pickle.loads(zlib.decompress(self._blob))
+        changes = []
+        for it, (before, delta, removed) in zip(self._items, pairs):
+            before = _unpack_state(before)
+            after = {**before, **_unpack_state(delta)}
+            for key in removed:
+                del after[key]
+            changes.append((it, before, after))
+        return changes
+
+    def items(self):
+        if self._blob is not None:
+            return list(self._items)
+        return [it for it, _before, _after in self._changes]
+
+    def redo(self):
+        for it, _before, after in self._expanded():
+            self.canvas._apply_item_state(it, after)
+
+    def undo(self):
+        for it, before, _after in reversed(self._expanded()):
+            self.canvas._apply_item_state(it, before)
+
+    def merge(self, other):
+        if (
+            not isinstance(other, ItemStateCommand)
+            or self._blob is not None
+            or other.items() != self.items()
+        ):
+            return False
+        self._changes = [
+            (it, before, after)
+            for (it, before, _), (_, _, after) in zip(self._changes, other._expanded())
+        ]
+        return True
+
+    def size_bytes(self):
+        if self._blob is not None:
+            return len(self._blob) + _RECORD_BYTES * len(self._items)
+        return sum(
+            _RECORD_BYTES + _state_size(before) + _state_size(after)
+            for _it, before, after in self._changes
+        )
+
+    def compact(self):
+        if self._blob is not None:
+            return False
+        pairs = []
+        for _it, before, after in self._changes:
+            delta = {
+                k: v for k, v in after.items() if k not in before or before[k] != v
+            }
+            removed = tuple(k for k in before if k not in after)
+            pairs.append((_pack_state(before), _pack_state(delta), removed))
+        self._items = [it for it, _before, _after in self._changes]
+        self._blob = zlib.compress(pickle.dumps(pairs, pickle.HIGHEST_PROTOCOL))
+        self._changes = None
+        return True
+
+
+class ReorderCommand(Command):
+    """Modification de l'ordre d'empilement (zValue) d'éléments."""
+
+    label = "reorder"
+
+    def __init__(self, canvas, changes):
+        super().__init__(canvas)
+        # (item, ancien z, nouveau z)
+        self._changes = list(changes)
+
+    def items(self):
+        return [it for it, _old, _new in self._changes]
+
+    def redo(self):
+        for it, _old, new in self._changes:
+            it.setZValue(new)
+
+    def undo(self):
+        for it, old, _new in self._changes:
+            it.setZValue(old)
+
+
+class TransformItemsCommand(Command):
+    """Transformation géométrique (miroir, rotation…) d'une sélection."""
+
+    label = "transform"
+
+    def __init__(self, canvas, changes, label: str | None = None):
+        super().__init__(canvas)
+        # (item, ancienne QTransform, nouvelle QTransform)
+        self._changes = list(changes)
+        if label:
+            self.label = label
+
+    def items(self):
+        return [it for it, _old, _new in self._changes]
+
+    def redo(self):
+        for it, _old, new in self._changes:
+            it.setTransform(new)
+
+    def undo(self):
+        for it, old, _new in self._changes:
+            it.setTransform(old)
+
+
+class LayerOrderCommand(Command):
+    """Réordonnancement des calques."""
+
+    label = "reorder layers"
+
+    def __init__(self, canvas, old_names, new_names):
+        super().__init__(canvas)
+        self._old = list(old_names)
+        self._new = list(new_names)
+
+    def redo(self):
+        self.canvas._reorder(self._new)
+
+    def undo(self):
+        self.canvas._reorder(self._old)
+
+
+class RemoveLayerCommand(Command):
+    """Suppression d'un calque et de son contenu."""
+
+    label = "remove layer"
+
+    def __init__(self, canvas, name, layer, index):
+        super().__init__(canvas)
+        self._name = name
+        self._layer = layer
+        self._index = index
+
+    def items(self):
+        return [self._layer]
+
+    def redo(self):
+        self.canvas._detach_layer(self._name)
+
+    def undo(self):
+        self.canvas._attach_layer(self._name, self._layer, self._index)
+
+
+class GroupCommand(Command):
+    """Regroupement d'éléments dans un ``TransparentItemGroup``."""
+
+    label = "group"
+
+    def __init__(self, canvas, group, parent, records):
+        super().__init__(canvas)
+        self._group = group
+        self._group_parent = parent
+        # (item, parent d'origine, position d'origine, position dans le groupe)
+        self._records = list(records)
+
+    def items(self):
+        return [self._group] + [r[0] for r in self._records]
+
+    def _group_items(self):
+        self.canvas._attach_item(self._group, self._group_parent)
+        for it, _parent, _pos, inner in self._records:
+            self._group.addToGroup(it)
+            it.setPos(inner)
+            self.canvas._set_item_layer(it, self._group_parent)
+
+    def _ungroup_items(self):
+        for it, parent, pos, _inner in self._records:
+            self.canvas._reparent_item(it, parent)
+            it.setPos(pos)
+        self.canvas._detach_item(self._group)
+
+    def redo(self):
+        self._group_items()
+
+    def undo(self):
+        self._ungroup_items()
+
+
+class UngroupCommand(GroupCommand):
+    """Dissolution d'un groupe ; inverse exact de :class:`GroupCommand`."""
+
+    label = "ungroup"
+
+    def redo(self):
+        self._ungroup_items()
+
+    def undo(self):
+        self._group_items()
+
+
+class MacroCommand(Command):
+    """Suite de commandes formant une seule entrée d'historique."""
+
+    def __init__(self, canvas, commands, label: str | None = None):
+        super().__init__(canvas)
+        self._commands = list(commands)
+        self.label = label or "+".join(c.label for c in self._commands)
+
+    def items(self):
+        return [it for cmd in self._commands for it in cmd.items()]
+
+    def size_bytes(self):
+        return sum(cmd.size_bytes() for cmd in self._commands)
+
+    def compact(self):
+        compacted = [cmd.compact() for cmd in self._commands]
+        return any(compacted)
+
+    def redo(self):
+        for cmd in self._commands:
+            cmd.redo()
+
+    def undo(self):
+        for cmd in reversed(self._commands):
+            cmd.undo()
+
+
+class UndoStack:
+    """Pile de commandes bornée en profondeur et en mémoire.
+
+    Les ``hot_entries`` commandes les plus récentes restent telles quelles ;
+    les plus anciennes sont compactées puis évincées (les plus vieilles
+    d'abord) dès que ``max_depth`` ou ``max_bytes`` est dépassé.
+    """
+
+    def __init__(
+        self,
+        max_depth: int = 200,
+        max_bytes: int = 64 * 1024 * 1024,
+        hot_entries: int = 16,
+    ):
+        self._commands: list[Command] = []
+        self._sizes: list[int] = []
+        self._index = 0
+        self.max_depth = max_depth
+        self.max_bytes = max_bytes
+        self.hot_entries = hot_entries
+        self._bytes = 0
+        self.evictions = 0
+        self.compactions = 0
+
+    def __len__(self):
+        return len(self._commands)
+
+    @property
+    def index(self) -> int:
+        """Nombre de commandes actuellement appliquées."""
+        return self._index
+
+    def commands(self) -> list[Command]:
+        return list(self._commands)
+
+    def set_limits(self, max_depth: int | None = None, max_bytes: int | None = None):
+        if max_depth is not None:
+            self.max_depth = max(1, int(max_depth))
+        if max_bytes is not None:
+            self.max_bytes = max(0, int(max_bytes))
+        self._enforce_limits()
+
+    def stats(self) -> dict:
+        """Compteurs exposés dans le rapport de debug."""
+        return {
+            "entries": len(self._commands),
+            "bytes": self._bytes,
+            "evictions": self.evictions,
+            "compactions": self.compactions,
+            "max_depth": self.max_depth,
+            "max_bytes": self.max_bytes,
+        }
+
+    def push(self, command: Command, applied: bool = True):
+        """Ajoute ``command``. Si ``applied`` est faux, elle est exécutée."""
+        if not applied:
+            command.redo()
+        del self._commands[self._index:]
+        del self._sizes[self._index:]
+        self._bytes = sum(self._sizes)
+        last = self._commands[-1] if self._commands else None
+        if (
+            last is not None
+            and command.merge_key is not None
+            and command.merge_key == last.merge_key
+            and last.merge(command)
+        ):
+            self._resize(len(self._commands) - 1)
+            return
+        self._commands.append(command)
+        self._sizes.append(0)
+        self._resize(len(self._commands) - 1)
+        self._index += 1
+        logger.debug("History push %s (%d)", command.label, self._index)
+        self._enforce_limits()
+
+    def _resize(self, pos: int):
+        size = self._commands[pos].size_bytes()
+        self._bytes += size - self._sizes[pos]
+        self._sizes[pos] = size
+
+    def _enforce_limits(self):
+        # compactage des entrées qui ne sont plus "chaudes", puis des plus
+        # récentes si le budget mémoire est dépassé malgré tout
+        cold = max(0, len(self._commands) - self.hot_entries)
+        for pos in range(len(self._commands)):
+            if pos >= cold and self._bytes <= self.max_bytes:
+                break
+            if self._commands[pos].compact():
+                self.compactions += 1
+                self._resize(pos)
+        while len(self._commands) > 1 and (
+            len(self._commands) > self.max_depth or self._bytes > self.max_bytes
+        ):
+            if self._index > 0:
+                # plus ancienne commande appliquée
+                pos = 0
+                self._index -= 1
+            else:
+                # tout a été annulé : on abandonne le redo le plus lointain
+                pos = len(self._commands) - 1
+            self._commands.pop(pos)
+            self._bytes -= self._sizes.pop(pos)
+            self.evictions += 1
+
+    def can_undo(self) -> bool:
+        return self._index > 0
+
+    def can_redo(self) -> bool:
+        return self._index < len(self._commands)
+
+    def undo(self) -> Command | None:
+        if not self.can_undo():
+            return None
+        self._index -= 1
+        command = self._commands[self._index]
+        command.undo()
+        return command
+
+    def redo(self) -> Command | None:
+        if not self.can_redo():
+            return None
+        command = self._commands[self._index]
+        command.redo()
+        self._index += 1
+        return command
+
+    def clear(self):
+        self._commands.clear()
+        self._sizes.clear()
+        self._index = 0
+        self._bytes = 0
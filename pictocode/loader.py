@@ -0,0 +1,233 @@
+# pictocode/loader.py
+"""
+Chargement progressif des projets.
+
+Le fichier est décodé sur un thread de travail (JSON, blocs binaires,
+préparation des tableaux de points, dimensions des images) ; seule la construction des
+``QGraphicsItem`` a lieu sur le thread GUI, par tranches de quelques
+millisecondes pour que la fenêtre reste réactive et que le document
+s'affiche au fur et à mesure.
+"""
+
+import logging
+import time
+from collections import deque
+
+from PyQt5.QtCore import QObject, QThread, QTimer, pyqtSignal
+from PyQt5.QtGui import QPolygonF
+
+from .assets import store
+from .geometry import coords_from_points, polygon_from_coords
+from .project_io import read_project
+
+logger = logging.getLogger(__name__)
+
+# formes transmises par lot du thread de décodage au thread GUI
+CHUNK_SIZE = 500
+# durée maximale d'une tranche de construction sur le thread GUI
+SLICE_MS = 12
+
+
+def prepare_shape(shape: dict) -> dict:
+    """Prépare hors du thread GUI les données coûteuses d'une forme."""
+    # tableau aplati (.ptb) ou couples (.json)
+    points = shape.get("points")
+    if points is not None and not isinstance(points, QPolygonF):
+        shape["points"] = polygon_from_coords(coords_from_points(points))
+    if shape.get("type") == "image":
+        if shape.get("asset") not in store and shape.get("path"):
+            try:
+                shape["asset"] = store.add_file(shape["path"])
+            except OSError:
+                pass
+        if shape.get("asset"):
+            # l'image elle-même n'est décodée qu'au premier affichage
+            store.image_size(shape["asset"])
+    return shape
+
+
+class _DecodeThread(QThread):
+    """Lit le projet puis envoie ses formes préparées par lots."""
+
+    opened = pyqtSignal(object, object, object, int)
+    chunk = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+    def __init__(self, path: str, parent=None):
+        super().__init__(parent)
+        self.path = path
+        self._canceled = False
+
+    def cancel(self):
+        self._canceled = True
+
+    def run(self):
+        try:
+            params, shapes, layers, deferred = read_project(self.path)
+        except Exception as e:
+            logger.exception(f"Unable to read {self.path}")
+            self.failed.emit(str(e))
+            return
+        self.opened.emit(params, layers, deferred, len(shapes))
+        for start in range(0, len(shapes), CHUNK_SIZE):
+            if self._canceled:
+                return
+            batch = shapes[start:start + CHUNK_SIZE]
+            self.chunk.emit([prepare_shape(shp) for shp in batch])
+
+
+class ShapeBuilder(QObject):
+    """Construit les formes sur le canvas par tranches de ``SLICE_MS``."""
+
+    progress = pyqtSignal(int, int)
+    finished = pyqtSignal()
+
+    def __init__(self, canvas, total: int = 0, parent=None):
+        super().__init__(parent)
+        self.canvas = canvas
+        self.total = total
+        self.done = 0
+        self._pending = deque()
+        self._input_closed = False
+        # révision du canvas après le dernier lot (voir ``_check_edits``)
+        self.revision = None
+        self.modified = False
+        self._timer = QTimer(self)
+        self._timer.setInterval(0)
+        self._timer.timeout.connect(self._build_slice)
+
+    def feed(self, shapes):
+        self._pending.extend(shapes)
+        self._timer.start()
+
+    def close_input(self):
+        """Plus aucune forme n'arrivera : termine après le dernier lot."""
+        self._input_closed = True
+        self._timer.start()
+
+    def cancel(self):
+        self._timer.stop()
+        self._pending.clear()
+
+    def _check_edits(self):
+        """Détecte les modifications faites par l'utilisateur entre deux lots.
+
+        Le canvas reste interactif pendant le chargement : ses changements
+        en attente sont alors traités comme des modifications du document
+        avant que le lot suivant ne vide le suivi sans marquer le projet.
+        """
+        canvas = self.canvas
+        if self.revision is not None and canvas.revision != self.revision:
+            self.modified = True
+            canvas.flush_scene_changes()
+
+    def _build_slice(self):
+        canvas = self.canvas
+        deadline = time.perf_counter() + SLICE_MS / 1000
+        pending = self._pending
+        self._check_edits()
+        canvas.scene.blockSignals(True)
+        try:
+            while pending and time.perf_counter() < deadline:
+                canvas._create_item(pending.popleft())
+                self.done += 1
+        finally:
+            canvas.scene.blockSignals(False)
+        canvas.flush_scene_changes(mark_dirty=False)
+        self.revision = canvas.revision
+        self.progress.emit(self.done, self.total)
+        if not pending:
+            self._timer.stop()
+            if self._input_closed:
+                self.finished.emit()
+
+
+class ProjectLoader(QObject):
+    """Ouvre un projet de façon progressive et annulable.
+
+    ``opened(params, layers)`` est émis dès que l'en-tête est connu pour
+    préparer le document ; les formes suivent par lots.
+    """
+
+    opened = pyqtSignal(object, object)
+    progress = pyqtSignal(int, int)
+    finished = pyqtSignal()
+    canceled = pyqtSignal()
+    failed = pyqtSignal(str)
+
+    def __init__(self, canvas, path: str, parent=None):
+        super().__init__(parent)
+        self.canvas = canvas
+        self.path = path
+        self._deferred = {}
+        self._active = False
+        self._builder = ShapeBuilder(canvas, parent=self)
+        self._builder.progress.connect(self.progress)
+        self._builder.finished.connect(self._on_built)
+        self._thread = _DecodeThread(path, self)
+        self._thread.opened.connect(self._on_opened)
+        self._thread.chunk.connect(self._on_chunk)
+        self._thread.failed.connect(self._on_failed)
+        self._thread.finished.connect(self._on_decoded)
+
+    def is_running(self) -> bool:
+        return self._active
+
+    @property
+    def modified(self) -> bool:
+        """Vrai si le document a été modifié pendant le chargement."""
+        return self._builder.modified
+
+    def start(self):
+        logger.debug(f"Loading {self.path}")
+        self._active = True
+        self._started = time.perf_counter()
+        self._thread.start()
+
+    def cancel(self):
+        if not self._active:
+            return
+        self._active = False
+        self._thread.cancel()
+        self._builder.cancel()
+        logger.debug(f"Loading {self.path} canceled")
+        self.canceled.emit()
+
+    def dispose(self):
+        """Libère le chargeur une fois son thread de décodage terminé."""
+        if self._thread.isRunning():
+            self._thread.finished.connect(self.deleteLater)
+        else:
+            self.deleteLater()
+
+    def _on_opened(self, params, layers, deferred, total):
+        if not self._active:
+            return
+        self._deferred = deferred
+        self._builder.total = total
+        self.opened.emit(params, layers)
+        self._builder.revision = self.canvas.revision
+
+    def _on_chunk(self, shapes):
+        if self._active:
+            self._builder.feed(shapes)
+
+    def _on_decoded(self):
+        if self._active:
+            self._builder.close_input()
+
+    def _on_failed(self, message):
+        self._active = False
+        self.failed.emit(message)
+
+    def _on_built(self):
+        if not self._active:
+            return
+        self._active = False
+        self._builder._check_edits()
+        self.canvas.defer_layers(self._deferred)
+        logger.debug(
+            f"Loaded {self._builder.done} shapes from {self.path} in "
+            f"{time.perf_counter() - self._started:.2f}s"
+        )
+        self.finished.emit()
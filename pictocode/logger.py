@@ -1,26 +1,115 @@
 import logging
-from PyQt5.QtCore import QObject, pyqtSignal
+import logging.handlers
+import os
+import queue
+import threading
+from collections import deque
 
-class LogEmitter(QObject):
-    log_record = pyqtSignal(str)
+LOG_DIR = os.path.join(os.path.expanduser("~"), "pictocode_logs")
+SESSION_LOG = os.path.join(LOG_DIR, "session.log")
 
-log_emitter = LogEmitter()
+# Lignes conservées pour le dock des logs
+MAX_LINES = 5000
+
+
+class LogSink(logging.Handler):
+    """Tampon circulaire des derniers enregistrements pour le dock des logs.
+
+    ``emit`` se contente d'ajouter une entrée ``(n°, niveau, logger, texte)``
+    au tampon ; le dock récupère les nouvelles entrées par lots avec
+    :meth:`since` au lieu d'être notifié à chaque enregistrement.
+    """
+
+    def __init__(self, capacity: int = MAX_LINES):
+        super().__init__()
+        self._entries: deque = deque(maxlen=capacity)
+        self._seq = 0
+        self._lock_entries = threading.Lock()
+
+    @property
+    def capacity(self) -> int:
+        return self._entries.maxlen
 
-class QtHandler(logging.Handler):
     def emit(self, record):
-        msg = self.format(record)
-        log_emitter.log_record.emit(msg)
+        try:
+            text = self.format(record)
+        except Exception:
+            self.handleError(record)
+            return
+        with self._lock_entries:
+            self._seq += 1
+            self._entries.append((self._seq, record.levelno, record.name, text))
+
+    def since(self, seq: int) -> tuple[list, int]:
+        """Entrées de numéro supérieur à ``seq`` et dernier numéro attribué."""
+        with self._lock_entries:
+            last = self._seq
+            if seq >= last:
+                return [], last
+            missing = last - seq
+            entries = list(self._entries)
+        return entries[-missing:], last
+
+    def entries(self) -> list:
+        with self._lock_entries:
+            return list(self._entries)
+
+    def clear(self):
+        with self._lock_entries:
+            self._entries.clear()
+
 
-def setup_logging():
+log_sink = LogSink()
+
+_listener: logging.handlers.QueueListener | None = None
+
+
+def _file_handler(fmt) -> logging.Handler | None:
+    try:
+        os.makedirs(LOG_DIR, exist_ok=True)
+        handler = logging.handlers.RotatingFileHandler(
+            SESSION_LOG, maxBytes=1024 * 1024, backupCount=3, encoding="utf-8"
+        )
+    except OSError:
+        return None
+    handler.setFormatter(fmt)
+    return handler
+
+
+def setup_logging(level: str | int | None = None):
+    """Installe les handlers racine.
+
+    Le niveau vient de ``level`` ou de ``PICTOCODE_LOG_LEVEL`` (``INFO`` par
+    défaut) ; les traces détaillées des chemins critiques passent par
+    :mod:`pictocode.trace`. L'écriture du fichier de session se fait sur un
+    thread dédié.
+    """
+    global _listener
     logger = logging.getLogger()
     if logger.handlers:
         return
-    logger.setLevel(logging.DEBUG)
+    if level is None:
+        level = os.environ.get("PICTOCODE_LOG_LEVEL", "INFO").upper()
+    logger.setLevel(level)
     fmt = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
     stream = logging.StreamHandler()
     stream.setFormatter(fmt)
     logger.addHandler(stream)
 
-    qt_handler = QtHandler()
-    qt_handler.setFormatter(fmt)
-    logger.addHandler(qt_handler)
+    log_sink.setFormatter(fmt)
+    logger.addHandler(log_sink)
+
+    file_handler = _file_handler(fmt)
+    if file_handler is not None:
+        records = queue.SimpleQueue()
+        logger.addHandler(logging.handlers.QueueHandler(records))
+        _listener = logging.handlers.QueueListener(records, file_handler)
+        _listener.start()
+
+
+def shutdown_logging():
+    """Vide la file du fichier de session et arrête son thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,71 @@
+# pictocode/naming.py
+"""
+Index des noms d'éléments du canvas.
+
+Maintient les correspondances nom → élément et élément → calque pour que
+la sélection depuis l'outliner, les recherches par script et la
+vérification des doublons restent en temps constant.
+"""
+
+
+class NameIndex:
+    """Correspondances nom → élément et élément → calque.
+
+    ``is_layer`` indique si un élément de premier niveau est un calque.
+    """
+
+    def __init__(self, is_layer):
+        self._is_layer = is_layer
+        self._by_name = {}
+        self._names = {}
+        self._layers = {}
+
+    def __contains__(self, name) -> bool:
+        return name in self._by_name
+
+    def __len__(self):
+        return len(self._by_name)
+
+    def find(self, name):
+        return self._by_name.get(name)
+
+    def layer_of(self, item):
+        return self._layers.get(item)
+
+    def clear(self):
+        self._by_name.clear()
+        self._names.clear()
+        self._layers.clear()
+
+    def add(self, item):
+        """(Ré)indexe ``item`` et ses descendants sous leur calque actuel."""
+        layer = None
+        parent = item.parentItem()
+        while parent is not None:
+            if parent.parentItem() is None and self._is_layer(parent):
+                layer = parent
+            parent = parent.parentItem()
+        self._add(item, layer)
+
+    def _add(self, item, layer):
+        name = getattr(item, "layer_name", None)
+        old = self._names.get(item)
+        if old is not None and old != name and self._by_name.get(old) is item:
+            del self._by_name[old]
+        if name:
+            self._by_name[name] = item
+            self._names[item] = name
+        self._layers[item] = layer
+        if layer is None and item.parentItem() is None and self._is_layer(item):
+            layer = item
+        for child in item.childItems():
+            self._add(child, layer)
+
+    def remove(self, item):
+        """Retire ``item`` et ses descendants de l'index."""
+        name = self._names.pop(item, None)
+        if name is not None and self._by_name.get(name) is item:
+            del self._by_name[name]
+        self._layers.pop(item, None)
+        for child in item.childItems():
+            self.remove(child)
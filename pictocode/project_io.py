@@ -0,0 +1,231 @@
+# pictocode/project_io.py
+"""
+Format de projet binaire ``.ptb``.
+
+Disposition du fichier (petit-boutiste) :
+
+* en-tête fixe : ``MAGIC`` (4 octets), version (u16), drapeaux (u16),
+  longueur de l'en-tête JSON (u32) ;
+* en-tête JSON compact : métadonnées du document, calques et index des
+  blocs ``{"layer", "offset", "size", "count"}`` ;
+* un bloc zlib par calque : longueur du JSON des formes (u32), JSON des
+  formes puis tableau ``float32`` des points ``x, y`` ;
+* miniature PNG facultative.
+
+Les points des tracés sont remplacés dans le JSON par ``"pts": [début,
+nombre]`` dans le tableau du bloc. Chaque bloc pouvant être décodé seul,
+les calques masqués ne sont décodés qu'à la demande.
+
+``read_project`` lit aussi les formats ``.json`` et ``.ptc``.
+"""
+
+import json
+import logging
+import struct
+import sys
+import zlib
+from array import array
+from itertools import chain
+
+logger = logging.getLogger(__name__)
+
+BINARY_EXT = ".ptb"
+MAGIC = b"PTCB"
+VERSION = 1
+
+_PREFIX = struct.Struct("<4sHHI")
+_U32 = struct.Struct("<I")
+
+META_KEYS = ("name", "width", "height", "unit", "orientation", "color_mode", "dpi")
+
+
+def is_binary(path: str) -> bool:
+    return path.lower().endswith(BINARY_EXT)
+
+
+def _dumps(obj) -> bytes:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode(
+        "utf-8"
+    )
+
+
+def _encode_block(shapes) -> bytes:
+    runs = []
+    total = 0
+    out = []
+    for shp in shapes:
+        points = shp.get("points")
+        if points is not None:
+            shp = dict(shp)
+            del shp["points"]
+            # couples ``(x, y)`` ou tableau déjà aplati (calque non chargé)
+            if isinstance(points, array):
+                count = len(points) // 2
+            else:
+                count = len(points)
+                points = chain.from_iterable(points)
+            shp["pts"] = [total, count]
+            runs.append(points)
+            total += count
+        out.append(shp)
+    coords = array("f", chain.from_iterable(runs))
+    if sys.byteorder == "big":
+        coords.byteswap()
+    payload = _dumps(out)
+    return zlib.compress(_U32.pack(len(payload)) + payload + coords.tobytes())
+
+
+def _decode_block(raw: bytes):
+    data = zlib.decompress(raw)
+    (size,) = _U32.unpack_from(data)
+    shapes = json.loads(data[_U32.size:_U32.size + size].decode("utf-8"))
+    coords = array("f")
+    coords.frombytes(data[_U32.size + size:])
+    if sys.byteorder == "big":
+        coords.byteswap()
+    for shp in shapes:
+        ref = shp.pop("pts", None)
+        if ref is not None:
+            # coordonnées aplaties, prêtes pour ``polygon_from_coords``
+            start, count = ref
+            shp["points"] = array("d", coords[2 * start:2 * (start + count)])
+    return shapes
+
+
+def write_binary(path: str, data: dict, thumbnail: bytes | None = None):
+    """Enregistre ``data`` (issu de ``export_project``) au format ``.ptb``."""
+    by_layer = {}
+    for shp in data.get("shapes", []):
+        by_layer.setdefault(shp.get("layer", ""), []).append(shp)
+
+    blocks = []
+    index = []
+    offset = 0
+    for layer, shapes in by_layer.items():
+        raw = _encode_block(shapes)
+        index.append(
+            {"layer": layer, "offset": offset, "size": len(raw), "count": len(shapes)}
+        )
+        blocks.append(raw)
+        offset += len(raw)
+    header = {
+        "meta": {k: data.get(k) for k in META_KEYS},
+        "layers": data.get("layers", []),
+        "blocks": index,
+    }
+    if thumbnail:
+        header["thumbnail"] = [offset, len(thumbnail)]
+        blocks.append(thumbnail)
+    head = _dumps(header)
+    with open(path, "wb") as f:
+        f.write(_PREFIX.pack(MAGIC, VERSION, 0, len(head)))
+        f.write(head)
+        for raw in blocks:
+            f.write(raw)
+
+
+class BinaryProject:
+    """Lecture paresseuse d'un fichier ``.ptb`` : seul l'en-tête est lu."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            magic, version, _flags, size = _PREFIX.unpack(f.read(_PREFIX.size))
+            if magic != MAGIC:
+                raise ValueError(f"{path} n'est pas un projet Pictocode binaire")
+            if version > VERSION:
+                raise ValueError(f"Version de projet non prise en charge : {version}")
+            header = json.loads(f.read(size).decode("utf-8"))
+        self._base = _PREFIX.size + size
+        self.meta = header.get("meta", {})
+        self.layers = header.get("layers", [])
+        self._blocks = {b["layer"]: b for b in header.get("blocks", [])}
+        self._thumbnail = header.get("thumbnail")
+
+    def _read(self, offset: int, size: int) -> bytes:
+        with open(self.path, "rb") as f:
+            f.seek(self._base + offset)
+            return f.read(size)
+
+    def shape_count(self, layer: str) -> int:
+        block = self._blocks.get(layer)
+        return block["count"] if block else 0
+
+    def shapes(self, layer: str):
+        """Décode les formes du calque ``layer``."""
+        block = self._blocks.get(layer)
+        if block is None:
+            return []
+        logger.debug(f"Decoding {block['count']} shapes of layer {layer!r}")
+        return _decode_block(self._read(block["offset"], block["size"]))
+
+    def split(self):
+        """Sépare les formes à charger tout de suite des calques masqués.
+
+        Retourne ``(shapes, deferred)`` où ``deferred`` associe le nom de
+        chaque calque masqué à une fonction décodant ses formes. Les blocs
+        compressés sont lus dès maintenant : le décodage différé ne dépend
+        plus du fichier, qu'un enregistrement peut remplacer entre-temps.
+        """
+        hidden = {
+            layer.get("name")
+            for layer in self.layers
+            if not layer.get("visible", True)
+        }
+        shapes = []
+        deferred = {}
+        for name in self._blocks:
+            if name in hidden:
+                block = self._blocks[name]
+                raw = self._read(block["offset"], block["size"])
+                deferred[name] = lambda raw=raw: _decode_block(raw)
+            else:
+                shapes.extend(self.shapes(name))
+        return shapes, deferred
+
+    def thumbnail(self) -> bytes | None:
+        if not self._thumbnail:
+            return None
+        return self._read(*self._thumbnail)
+
+    def to_dict(self) -> dict:
+        """Décode entièrement le projet au format de ``export_project``."""
+        shapes = []
+        for name in self._blocks:
+            shapes.extend(self.shapes(name))
+        return {**self.meta, "shapes": shapes, "layers": self.layers}
+
+
+def read_binary_project(path: str):
+    """Retourne ``(params, shapes, layers, deferred)`` pour ``open_project``."""
+    project = BinaryProject(path)
+    shapes, deferred = project.split()
+    params = {k: project.meta.get(k) for k in META_KEYS}
+    return params, shapes, project.layers, deferred
+
+
+def read_project(path: str):
+    """Lit un projet ``.json``, ``.ptc`` ou ``.ptb``.
+
+    Retourne ``(params, shapes, layers, deferred)`` pour ``open_project``.
+    """
+    if is_binary(path):
+        return read_binary_project(path)
+    if path.lower().endswith(".ptc"):
+        import zipfile
+
+        from .assets import store
+
+        with zipfile.ZipFile(path, "r") as zf:
+            with zf.open("project.json") as f:
+                data = json.load(f)
+            names = set(zf.namelist())
+        # les images restent dans l'archive et ne sont lues qu'à l'affichage
+        for shp in data.get("shapes", []):
+            if shp.get("type") == "image" and shp.get("path") in names:
+                shp["asset"] = store.add_archive_member(path, shp["path"])
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    params = {k: data.get(k) for k in META_KEYS}
+    return params, data.get("shapes", []), data.get("layers", []), {}
@@ -0,0 +1,433 @@
+# pictocode/raster.py
+"""
+Export raster par tuiles.
+
+La scène est d'abord enregistrée sur le thread GUI, tuile par tuile, dans
+des ``QPicture`` : l'index de la scène ne fournit à chaque tuile que les
+éléments qui la recouvrent et l'instantané obtenu ne dépend plus de la
+scène vivante, que l'utilisateur peut continuer à modifier. Les tuiles
+sont ensuite rastérisées en parallèle par un ``QThreadPool`` et transmises
+à l'encodeur rangée par rangée.
+
+Le PNG est encodé en flux (lignes compressées au fil des rangées) : la
+mémoire utilisée reste bornée par quelques rangées de tuiles, quelle que
+soit la taille de l'image. Les autres formats passent par ``QImage.save``
+et assemblent donc l'image complète avant l'écriture.
+"""
+
+import io
+import logging
+import os
+import struct
+import threading
+import time
+import zlib
+
+from PyQt5.QtCore import (
+    QObject,
+    QRectF,
+    QRunnable,
+    QThread,
+    QThreadPool,
+    Qt,
+    pyqtSignal,
+)
+from PyQt5.QtGui import QColor, QImage, QPainter, QPicture
+
+logger = logging.getLogger(__name__)
+
+# côté d'une tuile en pixels de sortie
+TILE_SIZE = 512
+# plus grand côté des miniatures de projet
+THUMBNAIL_SIZE = 256
+
+_RENDER_HINTS = (
+    QPainter.Antialiasing
+    | QPainter.TextAntialiasing
+    | QPainter.SmoothPixmapTransform
+)
+
+
+class ExportCanceled(Exception):
+    """L'export a été interrompu avant la fin."""
+
+
+class TileSnapshot:
+    """Instantané immuable d'une zone de scène découpée en tuiles."""
+
+    def __init__(self, width, height, tile_size, pictures, background, dpi):
+        self.width = width
+        self.height = height
+        self.tile_size = tile_size
+        self.cols = -(-width // tile_size)
+        self.rows = -(-height // tile_size)
+        self.background = QColor(background)
+        self.dpi = dpi
+        self._pictures = pictures
+
+    def tile_rect(self, row: int, col: int) -> tuple[int, int, int, int]:
+        """``(x, y, largeur, hauteur)`` de la tuile en pixels de sortie."""
+        size = self.tile_size
+        x, y = col * size, row * size
+        return x, y, min(size, self.width - x), min(size, self.height - y)
+
+    def render_tile(self, row: int, col: int) -> QImage:
+        """Rastérise une tuile ; appelable depuis n'importe quel thread."""
+        _x, _y, w, h = self.tile_rect(row, col)
+        image = QImage(w, h, QImage.Format_ARGB32_Premultiplied)
+        image.fill(self.background)
+        painter = QPainter(image)
+        painter.setRenderHints(_RENDER_HINTS)
+        painter.drawPicture(0, 0, self._pictures[row * self.cols + col])
+        painter.end()
+        return image.convertToFormat(QImage.Format_RGBA8888)
+
+
+def snapshot_scene(
+    scene,
+    source: QRectF,
+    scale: float = 1.0,
+    dpi: float = 72,
+    background=Qt.white,
+    tile_size: int = TILE_SIZE,
+) -> TileSnapshot:
+    """Enregistre ``source`` (repère scène) à l'échelle ``scale``.
+
+    À appeler sur le thread GUI ; seul l'enregistrement des commandes de
+    dessin a lieu ici, la rastérisation est laissée aux threads de travail.
+    """
+    width = max(1, round(source.width() * scale))
+    height = max(1, round(source.height() * scale))
+    snapshot = TileSnapshot(width, height, tile_size, [], background, dpi)
+    for row in range(snapshot.rows):
+        for col in range(snapshot.cols):
+            x, y, w, h = snapshot.tile_rect(row, col)
+            picture = QPicture()
+            painter = QPainter(picture)
+            scene.render(
+                painter,
+                QRectF(0, 0, w, h),
+                QRectF(
+                    source.x() + x / scale,
+                    source.y() + y / scale,
+                    w / scale,
+                    h / scale,
+                ),
+                Qt.IgnoreAspectRatio,
+            )
+            painter.end()
+            snapshot._pictures.append(picture)
+    return snapshot
+
+
+def _png_chunk(tag: bytes, data: bytes) -> bytes:
+    return (
+        struct.pack(">I", len(data))
+        + tag
+        + data
+        + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+    )
+
+
+class _PngWriter:
+    """Encodeur PNG RGBA en flux, rangée de tuiles par rangée de tuiles."""
+
+    def __init__(self, file, width: int, height: int, dpi: float):
+        self._file = file
+        self._zlib = zlib.compressobj(6)
+        ppm = round(dpi / 0.0254)
+        self._file.write(b"\x89PNG\r\n\x1a\n")
+        self._file.write(
+            _png_chunk(
+                b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)
+            )
+        )
+        self._file.write(_png_chunk(b"pHYs", struct.pack(">IIB", ppm, ppm, 1)))
+
+    def _idat(self, data: bytes):
+        if data:
+            self._file.write(_png_chunk(b"IDAT", data))
+
+    def write_band(self, tiles: list):
+        h = tiles[0].height()
+        spans = []
+        for tile in tiles:
+            bits = tile.constBits()
+            bits.setsize(tile.sizeInBytes())
+            spans.append(
+                (memoryview(bits.asstring()), tile.bytesPerLine(), tile.width() * 4)
+            )
+        rows = []
+        for y in range(h):
+            rows.append(b"\x00")  # filtre « None »
+            for data, stride, length in spans:
+                start = y * stride
+                rows.append(data[start:start + length])
+        self._idat(self._zlib.compress(b"".join(rows)))
+
+    def finish(self):
+        self._idat(self._zlib.flush())
+        self._file.write(_png_chunk(b"IEND", b""))
+
+
+class _PngFileWriter(_PngWriter):
+    """PNG écrit à côté de sa destination puis renommé une fois complet."""
+
+    def __init__(self, path: str, width: int, height: int, dpi: float):
+        self._path = path
+        self._tmp = f"{path}.part"
+        super().__init__(open(self._tmp, "wb"), width, height, dpi)
+
+    def close(self):
+        self.finish()
+        self._file.close()
+        os.replace(self._tmp, self._path)
+
+    def abort(self):
+        self._file.close()
+        try:
+            os.remove(self._tmp)
+        except OSError:
+            pass
+
+
+class _ImageWriter:
+    """Assemble l'image complète pour les formats sans encodage en flux."""
+
+    def __init__(self, path: str, fmt: str, width: int, height: int, dpi: float):
+        self._path = path
+        self._fmt = fmt
+        self._image = QImage(width, height, QImage.Format_ARGB32)
+        ppm = round(dpi / 0.0254)
+        self._image.setDotsPerMeterX(ppm)
+        self._image.setDotsPerMeterY(ppm)
+        self._y = 0
+
+    def write_band(self, tiles: list):
+        painter = QPainter(self._image)
+        x = 0
+        for tile in tiles:
+            painter.drawImage(x, self._y, tile)
+            x += tile.width()
+        painter.end()
+        self._y += tiles[0].height()
+
+    def close(self):
+        tmp = f"{self._path}.part"
+        if not self._image.save(tmp, self._fmt):
+            raise OSError(f"Impossible d'écrire {self._path}")
+        os.replace(tmp, self._path)
+
+    def abort(self):
+        self._image = None
+
+
+class _TileTask(QRunnable):
+    def __init__(self, func, row: int, col: int):
+        super().__init__()
+        self._func = func
+        self._row = row
+        self._col = col
+
+    def run(self):
+        self._func(self._row, self._col)
+
+
+def write_tiled(
+    snapshot: TileSnapshot,
+    path: str,
+    fmt: str = "PNG",
+    progress=None,
+    canceled=None,
+    pool: QThreadPool | None = None,
+):
+    """Rastérise ``snapshot`` en parallèle et l'écrit dans ``path``.
+
+    Bloquant ; ``progress(fait, total)`` est appelé après chaque rangée de
+    tuiles et ``canceled()`` est consulté pour interrompre l'export (lève
+    :class:`ExportCanceled`). Le fichier n'est remplacé qu'une fois
+    entièrement écrit.
+    """
+    pool = pool or QThreadPool.globalInstance()
+    rows, cols = snapshot.rows, snapshot.cols
+    # rangées rendues en avance : de quoi occuper tous les threads
+    ahead = max(2, -(-pool.maxThreadCount() // cols) + 1)
+    results = {}
+    cond = threading.Condition()
+    pending = 0
+
+    def render(row, col):
+        nonlocal pending
+        try:
+            result = snapshot.render_tile(row, col)
+        except Exception as exc:  # transmis au thread d'écriture
+            result = exc
+        with cond:
+            results[(row, col)] = result
+            pending -= 1
+            cond.notify_all()
+
+    if fmt.upper() == "PNG":
+        writer = _PngFileWriter(
+            path, snapshot.width, snapshot.height, snapshot.dpi
+        )
+    else:
+        writer = _ImageWriter(
+            path, fmt, snapshot.width, snapshot.height, snapshot.dpi
+        )
+    started = time.perf_counter()
+    submitted = 0
+    try:
+        for row in range(rows):
+            while submitted < min(rows, row + ahead):
+                with cond:
+                    pending += cols
+                for col in range(cols):
+                    pool.start(_TileTask(render, submitted, col))
+                submitted += 1
+            with cond:
+                while not all((row, c) in results for c in range(cols)):
+                    if canceled is not None and canceled():
+                        raise ExportCanceled()
+                    cond.wait(0.1)
+                band = [results.pop((row, c)) for c in range(cols)]
+            for tile in band:
+                if isinstance(tile, Exception):
+                    raise tile
+            if canceled is not None and canceled():
+                raise ExportCanceled()
+            writer.write_band(band)
+            if progress is not None:
+                progress(row + 1, rows)
+        writer.close()
+    except BaseException:
+        writer.abort()
+        raise
+    finally:
+        # les tuiles encore en vol référencent l'instantané
+        with cond:
+            while pending:
+                cond.wait()
+    logger.debug(
+        f"Exported {snapshot.width}x{snapshot.height} ({rows * cols} tiles) "
+        f"to {path} in {time.perf_counter() - started:.2f}s"
+    )
+
+
+def encode_png(snapshot: TileSnapshot) -> bytes:
+    """Rastérise ``snapshot`` sur le thread appelant et l'encode en PNG."""
+    stream = io.BytesIO()
+    writer = _PngWriter(stream, snapshot.width, snapshot.height, snapshot.dpi)
+    for row in range(snapshot.rows):
+        writer.write_band(
+            [snapshot.render_tile(row, col) for col in range(snapshot.cols)]
+        )
+    writer.finish()
+    return stream.getvalue()
+
+
+class ThumbnailJob(QRunnable):
+    """Miniature PNG d'un instantané, rendue sur le pool de threads.
+
+    ``revision`` identifie l'état de la scène photographiée pour que
+    l'appelant puisse réutiliser la miniature tant qu'elle n'a pas changé.
+    """
+
+    def __init__(self, snapshot: TileSnapshot, revision=None):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.revision = revision
+        self._snapshot = snapshot
+        self._done = threading.Event()
+        self._data = None
+
+    def run(self):
+        try:
+            self._data = encode_png(self._snapshot)
+        except Exception:
+            logger.exception("Unable to render thumbnail")
+        finally:
+            self._snapshot = None
+            self._done.set()
+
+    def start(self, pool: QThreadPool | None = None):
+        (pool or QThreadPool.globalInstance()).start(self)
+        return self
+
+    def is_done(self) -> bool:
+        return self._done.is_set()
+
+    def result(self, timeout: float | None = None) -> bytes | None:
+        """PNG de la miniature (attend la fin du rendu si nécessaire)."""
+        self._done.wait(timeout)
+        return self._data
+
+
+class _ExportThread(QThread):
+    progress = pyqtSignal(int, int)
+    failed = pyqtSignal(str)
+
+    def __init__(self, snapshot, path, fmt, parent=None):
+        super().__init__(parent)
+        self.snapshot = snapshot
+        self.path = path
+        self.fmt = fmt
+        self.done = False
+        self._canceled = False
+
+    def cancel(self):
+        self._canceled = True
+
+    def run(self):
+        try:
+            write_tiled(
+                self.snapshot,
+                self.path,
+                self.fmt,
+                progress=self.progress.emit,
+                canceled=lambda: self._canceled,
+            )
+            self.done = True
+        except ExportCanceled:
+            pass
+        except Exception as e:
+            logger.exception(f"Unable to export {self.path}")
+            self.failed.emit(str(e))
+
+
+class ImageExporter(QObject):
+    """Export raster en arrière-plan, avec progression et annulation."""
+
+    progress = pyqtSignal(int, int)
+    finished = pyqtSignal()
+    canceled = pyqtSignal()
+    failed = pyqtSignal(str)
+
+    def __init__(self, snapshot: TileSnapshot, path: str, fmt="PNG", parent=None):
+        super().__init__(parent)
+        self.path = path
+        self._thread = _ExportThread(snapshot, path, fmt, self)
+        self._thread.progress.connect(self.progress)
+        self._thread.failed.connect(self.failed)
+        self._thread.finished.connect(self._on_finished)
+        self._canceled = False
+
+    def is_running(self) -> bool:
+        return self._thread.isRunning()
+
+    def start(self):
+        logger.debug(f"Exporting image to {self.path}")
+        self._thread.start()
+
+    def cancel(self):
+        if self._thread.isRunning() and not self._canceled:
+            self._canceled = True
+            self._thread.cancel()
+
+    def _on_finished(self):
+        if self._thread.done:
+            self.finished.emit()
+        elif self._canceled:
+            logger.debug(f"Export of {self.path} canceled")
+            self.canceled.emit()
+        self.deleteLater()
@@ -0,0 +1,193 @@
+# pictocode/saver.py
+"""
+Enregistrement des projets en arrière-plan.
+
+Le thread GUI ne fait que photographier le document (``export_project``
+et l'instantané de la miniature) ; la sérialisation, la compression et
+l'écriture ont lieu sur un thread de travail. Le fichier est d'abord
+écrit à côté de sa destination puis substitué par un renommage atomique :
+une interruption en cours d'écriture laisse le projet précédent intact.
+
+Dans les archives ``.ptc``, les images sont rangées sous le condensat de
+leur contenu (``images/<sha256>.<ext>``) et stockées sans recompression ;
+celles déjà présentes dans l'archive précédente y sont recopiées telles
+quelles au lieu d'être relues depuis leur fichier source. Les blobs sont
+fournis par le magasin partagé (:mod:`pictocode.assets`).
+"""
+
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+import zipfile
+from contextlib import contextmanager
+
+from PyQt5.QtCore import QObject, QThread, pyqtSignal
+
+from .assets import store
+from .project_io import is_binary, write_binary
+
+logger = logging.getLogger(__name__)
+
+_COPY_CHUNK = 1024 * 1024
+
+
+@contextmanager
+def atomic_path(path: str):
+    """Fournit un chemin temporaire qui remplace ``path`` en cas de succès."""
+    folder = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(
+        dir=folder, prefix=f".{os.path.basename(path)}.", suffix=".tmp"
+    )
+    os.close(fd)
+    try:
+        yield tmp
+        if os.path.exists(path):
+            shutil.copymode(path, tmp)
+        fd = os.open(tmp, os.O_RDWR)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def _shape_asset(shp: dict):
+    """Blob de l'image ``shp``, enregistré au besoin depuis son chemin."""
+    asset = store.get(shp.get("asset") or "")
+    if asset is None:
+        src = shp.get("path")
+        if not src or not os.path.exists(src):
+            return None
+        asset = store.get(store.add_file(src))
+    return asset
+
+
+def _write_archive(path: str, data: dict, thumbnail: bytes | None, previous):
+    """Écrit l'archive ``.ptc`` ; ``previous`` est l'archive remplacée."""
+    old = None
+    if previous and zipfile.is_zipfile(previous):
+        old = zipfile.ZipFile(previous, "r")
+    try:
+        reusable = set(old.namelist()) if old else set()
+        with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+            written = set()
+            shapes = []
+            for shp in data.get("shapes", []):
+                asset = None
+                if shp.get("type") == "image":
+                    asset = _shape_asset(shp)
+                if asset is None:
+                    shapes.append(shp)
+                    continue
+                name = asset.entry_name
+                if name not in written:
+                    info = zipfile.ZipInfo(name, time.localtime()[:6])
+                    info.compress_type = zipfile.ZIP_STORED
+                    fsrc = old.open(name) if name in reusable else asset.open()
+                    with fsrc, zf.open(info, "w") as fdst:
+                        shutil.copyfileobj(fsrc, fdst, _COPY_CHUNK)
+                    written.add(name)
+                shapes.append({**shp, "path": name, "asset": asset.digest})
+            zf.writestr(
+                "project.json",
+                json.dumps(
+                    {**data, "shapes": shapes},
+                    ensure_ascii=False,
+                    separators=(",", ":"),
+                ),
+            )
+            if thumbnail:
+                zf.writestr("thumbnail.png", thumbnail, zipfile.ZIP_STORED)
+    finally:
+        if old is not None:
+            old.close()
+
+
+def write_project(path: str, data: dict, thumbnail: bytes | None = None):
+    """Enregistre ``data`` (issu de ``export_project``) de façon atomique."""
+    if path.lower().endswith(".ptc"):
+        previous = path if os.path.exists(path) else None
+        with atomic_path(path) as tmp:
+            _write_archive(tmp, data, thumbnail, previous)
+    elif is_binary(path):
+        with atomic_path(path) as tmp:
+            write_binary(tmp, data, thumbnail)
+    else:
+        with atomic_path(path) as tmp:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=2, ensure_ascii=False)
+        if thumbnail:
+            with atomic_path(os.path.splitext(path)[0] + ".png") as tmp:
+                with open(tmp, "wb") as f:
+                    f.write(thumbnail)
+
+
+class _SaveThread(QThread):
+    def __init__(self, path, data, thumbnail, parent=None):
+        super().__init__(parent)
+        self.path = path
+        self.data = data
+        self.thumbnail = thumbnail
+        self.error = None
+
+    def run(self):
+        try:
+            thumbnail = self.thumbnail.result() if self.thumbnail else None
+            write_project(self.path, self.data, thumbnail)
+        except Exception as e:
+            logger.exception(f"Unable to save {self.path}")
+            self.error = str(e)
+
+
+class ProjectSaver(QObject):
+    """Écrit un instantané du projet sur un thread de travail.
+
+    ``thumbnail`` est une :class:`~pictocode.raster.ThumbnailJob` (ou
+    ``None``) dont le résultat est attendu hors du thread GUI.
+    """
+
+    finished = pyqtSignal()
+    failed = pyqtSignal(str)
+
+    def __init__(self, path: str, data: dict, thumbnail=None, parent=None):
+        super().__init__(parent)
+        self.path = path
+        self._thread = _SaveThread(path, data, thumbnail, self)
+        self._thread.finished.connect(self._on_finished)
+        self._reported = False
+
+    def is_running(self) -> bool:
+        return self._thread.isRunning()
+
+    def start(self):
+        logger.debug(f"Saving {self.path}")
+        self._started = time.perf_counter()
+        self._thread.start()
+
+    def wait(self):
+        """Bloque jusqu'à la fin de l'écriture et en notifie le résultat."""
+        self._thread.wait()
+        self._on_finished()
+
+    def _on_finished(self):
+        if self._reported:
+            return
+        self._reported = True
+        error = self._thread.error
+        if error is None:
+            logger.debug(
+                f"Saved {self.path} in {time.perf_counter() - self._started:.2f}s"
+            )
+            self.finished.emit()
+        else:
+            self.failed.emit(error)
+        self.deleteLater()
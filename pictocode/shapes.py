@@ -25,8 +25,29 @@ from PyQt5.QtGui import (
 import math
 from PyQt5.QtCore import Qt, QPointF, QRectF
 import logging
+from .assets import store
+from .tracking import notify_change
+from . import trace
+from .geometry import (
+    coords_from_path,
+    coords_from_points,
+    path_from_coords,
+    points_from_coords,
+    polygon_from_coords,
+    simplify_coords,
+    smooth_path_from_coords,
+)
 
 logger = logging.getLogger(__name__)
+_trace_items = trace.category("items")
+
+# Changements d'item signalés au suivi de la scène comme géométriques
+_GEOMETRY_CHANGES = (
+    QGraphicsItem.ItemPositionHasChanged,
+    QGraphicsItem.ItemRotationHasChanged,
+    QGraphicsItem.ItemScaleHasChanged,
+    QGraphicsItem.ItemTransformHasChanged,
+)
 
 
 _cursor_cache: dict[int, QCursor] = {}
@@ -71,20 +92,25 @@ class SnapToGridMixin:
                 grid = view.grid_size / scale
                 value.setX(round(value.x() / grid) * grid)
                 value.setY(round(value.y() / grid) * grid)
-            logger.debug(
-                f"{getattr(self, 'layer_name', type(self).__name__)} moving to "
-                f"{value.x():.1f},{value.y():.1f}"
-            )
-        elif change == QGraphicsItem.ItemPositionHasChanged:
-            logger.debug(
-                f"{getattr(self, 'layer_name', type(self).__name__)} position "
-                f"changed to {value.x():.1f},{value.y():.1f}"
-            )
-        elif change == QGraphicsItem.ItemSelectedHasChanged:
-            logger.debug(
-                f"{getattr(self, 'layer_name', type(self).__name__)} selected="
-                f"{bool(value)}"
+            if _trace_items.on:
+                _trace_items.trace(
+                    "%s moving to %.1f,%.1f",
+                    getattr(self, "layer_name", type(self).__name__),
+                    value.x(),
+                    value.y(),
+                )
+        elif change == QGraphicsItem.ItemSelectedHasChanged and _trace_items.on:
+            _trace_items.trace(
+                "%s selected=%s",
+                getattr(self, "layer_name", type(self).__name__),
+                bool(value),
             )
+        if change in _GEOMETRY_CHANGES:
+            notify_change(self, "moved")
+        elif change == QGraphicsItem.ItemZValueHasChanged:
+            notify_change(self, "reordered")
+        elif change == QGraphicsItem.ItemParentHasChanged:
+            notify_change(self, "reparented")
         return super().itemChange(change, value)
 
 
@@ -114,6 +140,8 @@ class ResizableMixin:
         self._active_handle = None
         self._start_angle = 0.0
         self._anchor_scene = QPointF()
+        # (clé, forme seule, forme avec poignées) ; voir ``shape``
+        self._shape_cache = None
 
     # ------------------------------------------------------------------
     def _corner_handles(self) -> list[QRectF]:
@@ -148,22 +176,90 @@ class ResizableMixin:
             rot_s,
         )
 
+    def _handle_at(self, pos: QPointF) -> int | None:
+        """Return the index of the handle under ``pos`` (see ``_active_handle``)."""
+        r = self.rect()
+        x, y = pos.x(), pos.y()
+        half = self.handle_size / 2
+        corners = (
+            (r.left(), r.top()),
+            (r.right(), r.top()),
+            (r.right(), r.bottom()),
+            (r.left(), r.bottom()),
+        )
+        for idx, (cx, cy) in enumerate(corners):
+            dx, dy = x - cx, y - cy
+            if self.handle_shape == "circle":
+                if dx * dx + dy * dy <= half * half:
+                    return idx
+            elif abs(dx) <= half and abs(dy) <= half:
+                return idx
+        for idx, rect in enumerate(self._side_rects(), start=4):
+            if rect.contains(pos):
+                return idx
+        rot_half = self.rotation_handle_size / 2
+        dx = x - r.center().x()
+        dy = y - (r.top() - self.rotation_offset)
+        if self.rotation_handle_shape == "circle":
+            if dx * dx + dy * dy <= rot_half * rot_half:
+                return 8
+        elif abs(dx) <= rot_half and abs(dy) <= rot_half:
+            return 8
+        return None
+
+    def _invalidate_shape(self):
+        self._shape_cache = None
+
+    def _cached_shapes(self):
+        """Return ``(base, with_handles)`` shapes, rebuilt only when stale.
+
+        The cache is keyed on the base bounding rect (geometry and pen) and
+        on the selection state; setters that change the outline without
+        changing the bounds call ``_invalidate_shape``.
+        """
+        br = super().boundingRect()
+        key = (self.isSelected(), br.x(), br.y(), br.width(), br.height())
+        cache = self._shape_cache
+        if cache is None or cache[0] != key:
+            cache = self._shape_cache = (key, super().shape(), None)
+        return cache[1], cache[2]
+
     def itemChange(self, change, value):
-        if change == QGraphicsItem.ItemSelectedHasChanged:
+        if change == QGraphicsItem.ItemSelectedChange:
+            if bool(value) != self.isSelected():
+                # the handles overlay changes the bounds
+                self.prepareGeometryChange()
+        elif change == QGraphicsItem.ItemSelectedHasChanged:
+            self._invalidate_shape()
             self.update()
         return super().itemChange(change, value)
 
     # -- Geometry ----------------------------------------------------
     def boundingRect(self):
-        """Extend the base bounding rect so handles are always repainted."""
+        """Base bounding rect, extended by the handles while selected."""
         br = super().boundingRect()
+        if not self.isSelected():
+            return br
         pad = self.handle_size
         rot_pad = self.rotation_offset + self.rotation_handle_size
         return br.adjusted(-pad, -rot_pad, pad, pad)
 
     def shape(self):
-        """Extend the shape with resize and rotation handles for hit tests."""
-        path = super().shape()
+        """Shape used for hit tests, with the handles while selected."""
+        base, full = self._cached_shapes()
+        if not self.isSelected():
+            return base
+        if full is None:
+            full = base.united(self._handles_path())
+            self._shape_cache = (self._shape_cache[0], base, full)
+        return full
+
+    def contains(self, point):
+        if self.isSelected() and self._handle_at(point) is not None:
+            return True
+        return self._cached_shapes()[0].contains(point)
+
+    def _handles_path(self) -> QPainterPath:
         extra = QPainterPath()
         for h in self._corner_handles():
             if self.handle_shape == "circle":
@@ -178,8 +274,7 @@ class ResizableMixin:
             extra.addEllipse(rot_handle)
         else:
             extra.addRect(rot_handle)
-
-        return path.united(extra)
+        return extra
 
     def _get_anchor_point(self, handle: int, w: float, h: float) -> QPointF:
         """Return the local anchor point for a given handle index."""
@@ -223,59 +318,50 @@ class ResizableMixin:
     def paint(self, painter, option, widget=None):
         super().paint(painter, option, widget)
         if self.isSelected():
-            # custom selection outline following the shape
-            painter.setPen(QPen(Qt.blue, 1, Qt.DashLine))
-            painter.setBrush(Qt.NoBrush)
-            painter.drawPath(self._shape_path())
-
-            painter.setBrush(QBrush(Qt.white))
-            painter.setPen(QPen(self.handle_color))
-            for handle in self._corner_handles():
-                if self.handle_shape == 'circle':
-                    painter.drawEllipse(handle)
-                else:
-                    painter.drawRect(handle)
-
-            rot_handle = self._rotation_rect()
-            painter.setPen(QPen(self.rotation_handle_color))
-            painter.setBrush(QBrush(Qt.white))
-            if self.rotation_handle_shape == 'circle':
-                painter.drawEllipse(rot_handle)
+            self._paint_selection(painter)
+
+    def _paint_selection(self, painter):
+        """Paint the selection outline and handles over the item."""
+        painter.save()
+        # custom selection outline following the shape
+        painter.setPen(QPen(Qt.blue, 1, Qt.DashLine))
+        painter.setBrush(Qt.NoBrush)
+        painter.drawPath(self._shape_path())
+
+        painter.setBrush(QBrush(Qt.white))
+        painter.setPen(QPen(self.handle_color))
+        for handle in self._corner_handles():
+            if self.handle_shape == 'circle':
+                painter.drawEllipse(handle)
             else:
-                painter.drawRect(rot_handle)
+                painter.drawRect(handle)
+
+        rot_handle = self._rotation_rect()
+        painter.setPen(QPen(self.rotation_handle_color))
+        painter.setBrush(QBrush(Qt.white))
+        if self.rotation_handle_shape == 'circle':
+            painter.drawEllipse(rot_handle)
+        else:
+            painter.drawRect(rot_handle)
+        painter.restore()
 
     def mousePressEvent(self, event):
         if event.button() == Qt.LeftButton and self.isSelected():
             r = self.rect()
-            corner_handles = self._corner_handles()
-            side_rects = self._side_rects()
-            rot_handle = self._rotation_rect()
-            for idx, handle in enumerate(corner_handles):
-                if handle.contains(event.pos()):
-                    self._resizing = True
-                    self._active_handle = idx
-                    self._start_scene_pos = event.scenePos()
-                    self._start_rect = QRectF(r)
-                    self._start_item_pos = QPointF(self.pos())
-                    self._start_center = self.mapToScene(r.center())
-                    # anchor is opposite corner or side
-                    break
-            else:
-                for sidx, rect in enumerate(side_rects, start=4):
-                    if rect.contains(event.pos()):
-                        self._resizing = True
-                        self._active_handle = sidx
-                        self._start_scene_pos = event.scenePos()
-                        self._start_rect = QRectF(r)
-                        self._start_item_pos = QPointF(self.pos())
-                        self._start_center = self.mapToScene(r.center())
-                        break
-            if self._resizing:
+            handle = self._handle_at(event.pos())
+            if handle is not None and handle < 8:
+                self._resizing = True
+                self._active_handle = handle
+                self._start_scene_pos = event.scenePos()
+                self._start_rect = QRectF(r)
+                self._start_item_pos = QPointF(self.pos())
+                self._start_center = self.mapToScene(r.center())
+                # anchor is opposite corner or side
                 anchor_local = self._get_anchor_point(self._active_handle, r.width(), r.height())
                 self._anchor_scene = self.mapToScene(anchor_local)
                 event.accept()
                 return
-            if rot_handle.contains(event.pos()):
+            if handle == 8:
                 self._rotating = True
                 self._active_handle = 8
                 self._start_scene_pos = event.scenePos()
@@ -344,6 +430,7 @@ class ResizableMixin:
             y = self._anchor_scene.y() - dy - origin_y
 
             self.setRect(x, y, w, h)
+            notify_change(self, "moved")
             event.accept()
             return
         if self._rotating:
@@ -372,20 +459,16 @@ class ResizableMixin:
     # -- Hover -------------------------------------------------------
     def hoverMoveEvent(self, event):
         if self.isSelected():
-            pos = event.pos()
-            for idx, rect in enumerate(self._corner_handles()):
-                if rect.contains(pos):
-                    base = 135 if idx in (0, 2) else 45
-                    angle = base + self.rotation()
-                    self.setCursor(_resize_cursor(angle))
-                    return
-            for idx, rect in enumerate(self._side_rects(), start=4):
-                if rect.contains(pos):
-                    base = {4: 90, 5: 0, 6: -90, 7: 180}[idx]
-                    angle = base + self.rotation()
-                    self.setCursor(_resize_cursor(angle))
-                    return
-            if self._rotation_rect().contains(pos):
+            idx = self._handle_at(event.pos())
+            if idx is not None and idx < 4:
+                base = 135 if idx in (0, 2) else 45
+                self.setCursor(_resize_cursor(base + self.rotation()))
+                return
+            if idx is not None and idx < 8:
+                base = {4: 90, 5: 0, 6: -90, 7: 180}[idx]
+                self.setCursor(_resize_cursor(base + self.rotation()))
+                return
+            if idx == 8:
                 self.setCursor(Qt.CrossCursor)
                 return
             self.setCursor(Qt.SizeAllCursor)
@@ -516,6 +599,7 @@ class LineResizableMixin:
         self._active = None
         self._start_scene_pos = QPointF()
         self._start_line = None
+        self._shape_cache = None
 
     def _handle_rects(self) -> list[QRectF]:
         line = self.line()
@@ -525,12 +609,51 @@ class LineResizableMixin:
             QRectF(line.p2().x() - s / 2, line.p2().y() - s / 2, s, s),
         ]
 
+    def itemChange(self, change, value):
+        if change == QGraphicsItem.ItemSelectedChange:
+            if bool(value) != self.isSelected():
+                self.prepareGeometryChange()
+        return super().itemChange(change, value)
+
+    def boundingRect(self):
+        """Line bounds, extended by the end handles while selected."""
+        br = QGraphicsLineItem.boundingRect(self)
+        if not self.isSelected():
+            return br
+        half = self.handle_size / 2
+        return br.adjusted(-half, -half, half, half)
+
+    def _handle_at(self, pos: QPointF) -> int | None:
+        line = self.line()
+        half = self.handle_size / 2
+        for idx, end in enumerate((line.p1(), line.p2())):
+            if abs(pos.x() - end.x()) <= half and abs(pos.y() - end.y()) <= half:
+                return idx
+        return None
+
     def shape(self):
-        path = QGraphicsLineItem.shape(self)
-        extra = QPainterPath()
-        for h in self._handle_rects():
-            extra.addRect(h)
-        return path.united(extra)
+        """Line shape, with the end handles while selected (cached)."""
+        line = self.line()
+        key = (
+            self.isSelected(),
+            line.x1(), line.y1(), line.x2(), line.y2(),
+            self.pen().widthF(),
+        )
+        cache = self._shape_cache
+        if cache is None or cache[0] != key:
+            path = QGraphicsLineItem.shape(self)
+            if self.isSelected():
+                extra = QPainterPath()
+                for h in self._handle_rects():
+                    extra.addRect(h)
+                path = path.united(extra)
+            cache = self._shape_cache = (key, path)
+        return cache[1]
+
+    def contains(self, point):
+        if self.isSelected() and self._handle_at(point) is not None:
+            return True
+        return self.shape().contains(point)
 
     def paint(self, painter, option, widget=None):
         # Draw the line without the default Qt selection rectangle.
@@ -544,14 +667,14 @@ class LineResizableMixin:
 
     def mousePressEvent(self, event):
         if event.button() == Qt.LeftButton and self.isSelected():
-            for idx, h in enumerate(self._handle_rects()):
-                if h.contains(event.pos()):
-                    self._resizing = True
-                    self._active = idx
-                    self._start_scene_pos = event.scenePos()
-                    self._start_line = self.line()
-                    event.accept()
-                    return
+            idx = self._handle_at(event.pos())
+            if idx is not None:
+                self._resizing = True
+                self._active = idx
+                self._start_scene_pos = event.scenePos()
+                self._start_line = self.line()
+                event.accept()
+                return
         super().mousePressEvent(event)
 
     def mouseMoveEvent(self, event):
@@ -564,6 +687,7 @@ class LineResizableMixin:
             else:
                 p2 = line.p2() + delta
                 self.setLine(line.p1().x(), line.p1().y(), p2.x(), p2.y())
+            notify_change(self, "moved")
             event.accept()
             return
         super().mouseMoveEvent(event)
@@ -578,11 +702,6 @@ class LineResizableMixin:
 
     def hoverMoveEvent(self, event):
         if self.isSelected():
-            pos = event.pos()
-            for idx, rect in enumerate(self._handle_rects()):
-                if rect.contains(pos):
-                    self.setCursor(Qt.SizeAllCursor)
-                    return
             self.setCursor(Qt.SizeAllCursor)
         else:
             self.unsetCursor()
@@ -617,7 +736,9 @@ class Line(LineResizableMixin, SnapToGridMixin, QGraphicsLineItem):
 class FreehandPath(ResizableMixin, SnapToGridMixin, QGraphicsPathItem):
     """
     Tracé libre.
-    Utilisez `from_points` pour construire à partir d’une liste de QPointF.
+    Les sommets sont conservés dans un tableau contigu ``[x0, y0, x1, …]``
+    (voir :mod:`pictocode.geometry`) ; utilisez `from_points` ou
+    `from_coords` pour construire un tracé.
     """
 
     def __init__(
@@ -628,6 +749,8 @@ class FreehandPath(ResizableMixin, SnapToGridMixin, QGraphicsPathItem):
     ):
         ResizableMixin.__init__(self)
         QGraphicsPathItem.__init__(self)
+        self._coords = coords_from_points(())
+        self._smooth = False
         pen = QPen(pen_color)
         pen.setWidth(pen_width)
         self.setPen(pen)
@@ -644,6 +767,50 @@ class FreehandPath(ResizableMixin, SnapToGridMixin, QGraphicsPathItem):
         br = self.boundingRect()
         self.setTransformOriginPoint(br.width() / 2, br.height() / 2)
 
+    def setPath(self, path):
+        # un chemin arbitraire est conservé tel quel : plus de lissage
+        self._coords = coords_from_path(path)
+        self._smooth = False
+        super().setPath(path)
+        self._invalidate_shape()
+
+    def coords(self):
+        """Tableau ``array('d')`` des sommets (ne pas modifier sur place)."""
+        return self._coords
+
+    def set_coords(self, coords, smooth: bool | None = None):
+        coords = coords_from_points(coords)
+        if smooth is not None:
+            self._smooth = bool(smooth)
+        if self._smooth:
+            super().setPath(smooth_path_from_coords(coords))
+        else:
+            super().setPath(path_from_coords(coords))
+        self._coords = coords
+        self._invalidate_shape()
+
+    def is_smooth(self) -> bool:
+        return self._smooth
+
+    def set_smooth(self, smooth: bool):
+        """Trace les segments en courbes de Bézier passant par les sommets."""
+        if bool(smooth) != self._smooth:
+            self.set_coords(self._coords, smooth)
+
+    def simplify(self, tolerance: float) -> bool:
+        """Réduit les sommets à ``tolerance`` près ; vrai si le tracé change."""
+        coords = simplify_coords(self._coords, tolerance)
+        if len(coords) == len(self._coords):
+            return False
+        self.set_coords(coords)
+        return True
+
+    def points(self) -> list[tuple[float, float]]:
+        return points_from_coords(self._coords)
+
+    def polygon(self) -> QPolygonF:
+        return polygon_from_coords(self._coords)
+
     def rect(self):
         return self.path().boundingRect()
 
@@ -655,24 +822,102 @@ class FreehandPath(ResizableMixin, SnapToGridMixin, QGraphicsPathItem):
         sy = h / br.height()
         transform = QTransform()
         transform.scale(sx, sy)
-        new_path = transform.map(self.path())
-        self.setPath(new_path)
+        self.set_coords(transform.map(self.polygon()))
         self.setPos(x, y)
         self.setTransformOriginPoint(w / 2, h / 2)
 
+    @classmethod
+    def from_coords(
+        cls,
+        coords,
+        pen_color: QColor = QColor("black"),
+        pen_width: int = 2,
+    ):
+        item = cls(None, pen_color, pen_width)
+        item.set_coords(coords)
+        br = item.boundingRect()
+        item.setTransformOriginPoint(br.width() / 2, br.height() / 2)
+        return item
+
     @classmethod
     def from_points(
         cls,
-        points: list[QPointF],
+        points,
         pen_color: QColor = QColor("black"),
         pen_width: int = 2,
     ):
-        painter_path = QPainterPath()
-        if points:
-            painter_path.moveTo(points[0])
-            for pt in points[1:]:
-                painter_path.lineTo(pt)
-        return cls(painter_path, pen_color, pen_width)
+        """``points`` : ``QPointF``, couples ``(x, y)`` ou ``QPolygonF``."""
+        return cls.from_coords(coords_from_points(points), pen_color, pen_width)
+
+
+class StrokePreview(QGraphicsItem):
+    """
+    Aperçu d'un tracé libre en cours de dessin.
+    Chaque point ajouté ne redessine que le nouveau segment ; le tracé est
+    découpé en tronçons pour que le rendu ne parcoure que ceux exposés.
+    Le `FreehandPath` définitif est créé au relâchement via `coords`.
+    """
+
+    # sommets par tronçon et marge d'agrandissement du rectangle englobant
+    CHUNK_SIZE = 256
+    GROWTH = 128
+
+    def __init__(
+        self,
+        start: QPointF,
+        pen_color: QColor = QColor("black"),
+        pen_width: int = 2,
+    ):
+        super().__init__()
+        self._pen = QPen(pen_color)
+        self._pen.setWidth(pen_width)
+        self._pen.setCapStyle(Qt.RoundCap)
+        self._pen.setJoinStyle(Qt.RoundJoin)
+        self._margin = pen_width / 2 + 1
+        self._coords = coords_from_points([start])
+        self._chunks = []
+        self._path = QPainterPath(start)
+        self._path_rect = self._segment_rect(start, start)
+        self._bounds = self._path_rect
+        self.setFlag(QGraphicsItem.ItemUsesExtendedStyleOption, True)
+
+    def _segment_rect(self, a: QPointF, b: QPointF) -> QRectF:
+        m = self._margin
+        return QRectF(a, b).normalized().adjusted(-m, -m, m, m)
+
+    def coords(self):
+        return self._coords
+
+    def append(self, pos: QPointF):
+        x0, y0 = self._coords[-2], self._coords[-1]
+        if (pos.x(), pos.y()) == (x0, y0):
+            return
+        last = QPointF(x0, y0)
+        self._coords.extend((pos.x(), pos.y()))
+        self._path.lineTo(pos)
+        segment = self._segment_rect(last, pos)
+        self._path_rect = self._path_rect.united(segment)
+        if self._path.elementCount() >= self.CHUNK_SIZE:
+            self._chunks.append((self._path, self._path_rect))
+            self._path = QPainterPath(pos)
+            self._path_rect = self._segment_rect(pos, pos)
+        if not self._bounds.contains(segment):
+            # agrandi par paliers pour limiter les mises à jour de l'index
+            g = self.GROWTH
+            self.prepareGeometryChange()
+            self._bounds = self._bounds.united(segment.adjusted(-g, -g, g, g))
+        self.update(segment)
+
+    def boundingRect(self):
+        return self._bounds
+
+    def paint(self, painter, option, widget=None):
+        exposed = option.exposedRect
+        painter.setPen(self._pen)
+        for path, rect in self._chunks:
+            if rect.intersects(exposed):
+                painter.drawPath(path)
+        painter.drawPath(self._path)
 
 
 class TextItem(ResizableMixin, SnapToGridMixin, QGraphicsTextItem):
@@ -715,22 +960,6 @@ class TextItem(ResizableMixin, SnapToGridMixin, QGraphicsTextItem):
                 grid = view.grid_size / scale
                 value.setX(round(value.x() / grid) * grid)
                 value.setY(round(value.y() / grid) * grid)
-            logger.debug(
-                f"{getattr(self, 'layer_name', type(self).__name__)} moving to "
-                f"{value.x():.1f},{value.y():.1f}"
-            )
-        elif change == QGraphicsItem.ItemPositionHasChanged:
-            logger.debug(
-                f"{getattr(self, 'layer_name', type(self).__name__)} position "
-                f"changed to {value.x():.1f},{value.y():.1f}"
-            )
-
-        elif change == QGraphicsItem.ItemSelectedHasChanged:
-            logger.debug(
-                f"{getattr(self, 'layer_name', type(self).__name__)} selected="
-                f"{bool(value)}"
-            )
-
         return super().itemChange(change, value)
 
     def rect(self):
@@ -745,15 +974,63 @@ class TextItem(ResizableMixin, SnapToGridMixin, QGraphicsTextItem):
         self.setTransformOriginPoint(w / 2, h / 2)
 
 
-class ImageItem(ResizableMixin, SnapToGridMixin, QGraphicsPixmapItem):
-    """Image insérée dans le canvas."""
+class _ImageBase(QGraphicsPixmapItem):
+    """Élément dont la géométrie est ``rect()`` plutôt que celle du pixmap.
+
+    L'image est dessinée à partir du cache partagé au lieu d'un pixmap
+    propre à l'élément ; voir :class:`ImageItem`.
+    """
+
+    def boundingRect(self):
+        return self.rect()
 
-    def __init__(self, x: float, y: float, path: str):
+    def shape(self):
+        path = QPainterPath()
+        path.addRect(self.rect())
+        return path
+
+    def paint(self, painter, option, widget=None):
+        self._paint_image(painter, option, widget)
+
+
+class ImageItem(ResizableMixin, SnapToGridMixin, _ImageBase):
+    """Image insérée dans le canvas.
+
+    L'image provient du magasin partagé (:mod:`pictocode.assets`) : elle
+    n'est décodée qu'à son premier affichage, une seule fois quel que soit
+    le nombre d'éléments qui l'affichent. Redimensionner l'élément ne
+    touche pas aux pixels : le dessin choisit le niveau de la pyramide
+    adapté à l'échelle, sans lissage pendant le glissement d'une poignée,
+    puis la version lissée à la taille exacte, calculée en tâche de fond.
+    """
+
+    placeholder_color = QColor(0, 0, 0, 24)
+
+    def __init__(
+        self,
+        x: float,
+        y: float,
+        path: str,
+        asset: str | None = None,
+        w: float | None = None,
+        h: float | None = None,
+    ):
         self.path = path
-        pix = QPixmap(path)
+        if asset not in store and path:
+            try:
+                asset = store.add_file(path)
+            except OSError:
+                logger.warning(f"Image {path} is unavailable")
+        self.asset = asset
+        self._native = store.image_size(asset) if asset else None
         ResizableMixin.__init__(self)
-        QGraphicsPixmapItem.__init__(self, pix)
-        self._orig_pixmap = pix
+        _ImageBase.__init__(self)
+        if asset:
+            store.attach(asset, self)
+        if w is None or h is None:
+            size = self._native
+            w, h = (size.width(), size.height()) if self._has_native() else (0, 0)
+        self._size = self._fit(w, h)
         self.setPos(x, y)
         self.setFlags(
             QGraphicsPixmapItem.ItemIsMovable
@@ -761,20 +1038,65 @@ class ImageItem(ResizableMixin, SnapToGridMixin, QGraphicsPixmapItem):
             | QGraphicsPixmapItem.ItemSendsGeometryChanges
         )
         self.setAcceptHoverEvents(True)
-        self.setTransformOriginPoint(pix.width() / 2, pix.height() / 2)
+        self.setTransformOriginPoint(self._size[0] / 2, self._size[1] / 2)
         self.var_name = ""
 
+    def _has_native(self) -> bool:
+        size = self._native
+        return size is not None and not size.isEmpty()
+
+    def _fit(self, w: float, h: float) -> tuple[float, float]:
+        """Plus grande taille de même proportion que l'image dans ``w`` x ``h``."""
+        if not self._has_native():
+            return (abs(w), abs(h))
+        size = self._native
+        scale = min(abs(w) / size.width(), abs(h) / size.height())
+        return (size.width() * scale, size.height() * scale)
+
     def rect(self):
-        return QRectF(0, 0, self.pixmap().width(), self.pixmap().height())
+        return QRectF(0, 0, *self._size)
 
     def setRect(self, x, y, w, h):
         self.setPos(x, y)
         if w > 0 and h > 0:
-            scaled = self._orig_pixmap.scaled(
-                int(round(w)),
-                int(round(h)),
-                Qt.KeepAspectRatio,
-                Qt.SmoothTransformation,
-            )
-            self.setPixmap(scaled)
+            size = self._fit(w, h)
+            if size != self._size:
+                self.prepareGeometryChange()
+                self._size = size
         self.setTransformOriginPoint(w / 2, h / 2)
+
+    def _paint_image(self, painter, option, widget=None):
+        rect = self.rect()
+        if not self.asset or rect.isEmpty():
+            return
+        lod = option.levelOfDetailFromTransform(painter.worldTransform())
+        width = max(1, int(round(rect.width() * lod)))
+        height = max(1, int(round(rect.height() * lod)))
+        # sans widget : rendu hors écran, décodé sur place sauf pour les
+        # miniatures (store.cached_only)
+        offscreen = widget is None
+        image = None
+        if not self._resizing and not offscreen:
+            image = store.scaled(self.asset, width, height)
+        if image is not None:
+            painter.drawImage(rect, image)
+            return
+        native = self._native
+        scale = width / native.width() if self._has_native() else 1.0
+        image = store.image(self.asset, scale, wait=offscreen)
+        if image is None:
+            # décodage en cours : l'élément sera redessiné à son arrivée
+            painter.fillRect(rect, self.placeholder_color)
+            return
+        painter.save()
+        # filtrage rapide tant qu'une poignée est tirée
+        painter.setRenderHint(QPainter.SmoothPixmapTransform, not self._resizing)
+        painter.drawImage(rect, image)
+        painter.restore()
+
+    def mouseReleaseEvent(self, event):
+        resized = self._resizing
+        super().mouseReleaseEvent(event)
+        if resized:
+            # redessin lissé, dont la mise à l'échelle part en tâche de fond
+            self.update()
@@ -0,0 +1,86 @@
+# pictocode/trace.py
+"""
+Traces de diagnostic par catégorie pour les chemins critiques.
+
+Contrairement à ``logging``, une trace désactivée ne coûte qu'un test
+d'attribut : l'appelant vérifie ``cat.on`` avant d'appeler ``cat.trace``
+et le message n'est formaté qu'à la lecture du tampon. Les événements
+sont conservés dans un tampon circulaire borné au lieu d'être envoyés au
+dock des logs.
+
+Les catégories actives se choisissent avec la variable d'environnement
+``PICTOCODE_TRACE`` (``"mouse,items"`` ou ``"all"``) ou via
+:func:`set_enabled`.
+"""
+
+import os
+import time
+from collections import deque
+
+# Nombre d'événements conservés, toutes catégories confondues
+BUFFER_SIZE = 2000
+
+_buffer: deque = deque(maxlen=BUFFER_SIZE)
+_categories: dict[str, "Category"] = {}
+
+
+class Category:
+    """Interrupteur d'une famille de traces (``items``, ``mouse``…)."""
+
+    __slots__ = ("name", "on")
+
+    def __init__(self, name: str, on: bool = False):
+        self.name = name
+        self.on = on
+
+    def __repr__(self):
+        return f"Category({self.name!r}, on={self.on})"
+
+    def trace(self, msg: str, *args):
+        """Enregistre un événement ; ``msg % args`` est évalué à la lecture."""
+        _buffer.append((time.time(), self.name, msg, args))
+
+
+def _from_env() -> set[str]:
+    value = os.environ.get("PICTOCODE_TRACE", "")
+    return {name.strip() for name in value.split(",") if name.strip()}
+
+
+_env = _from_env()
+
+
+def category(name: str) -> Category:
+    """Retourne (en la créant au besoin) la catégorie ``name``."""
+    cat = _categories.get(name)
+    if cat is None:
+        cat = Category(name, "all" in _env or name in _env)
+        _categories[name] = cat
+    return cat
+
+
+def categories() -> list[Category]:
+    return list(_categories.values())
+
+
+def set_enabled(name: str, on: bool):
+    category(name).on = bool(on)
+
+
+def clear():
+    _buffer.clear()
+
+
+def records(limit: int | None = None) -> list[str]:
+    """Événements formatés, du plus ancien au plus récent."""
+    events = list(_buffer)
+    if limit is not None:
+        events = events[-limit:]
+    lines = []
+    for stamp, name, msg, args in events:
+        try:
+            text = msg % args if args else msg
+        except (TypeError, ValueError):
+            text = f"{msg} {args!r}"
+        clock = time.strftime("%H:%M:%S", time.localtime(stamp))
+        lines.append(f"{clock}.{int(stamp * 1000) % 1000:03d} [{name}] {text}")
+    return lines
@@ -0,0 +1,95 @@
+# pictocode/tracking.py
+"""
+Suivi des éléments modifiés entre deux rafraîchissements du canvas.
+
+Les éléments signalent eux-mêmes leurs changements (ajout, suppression,
+déplacement, style…) ; le canvas récupère périodiquement le différentiel
+et ne traite que ce qui a réellement changé.
+"""
+
+# Changements qui modifient l'arborescence affichée dans l'outliner
+STRUCTURAL = ("added", "removed", "reparented", "renamed", "reordered")
+KINDS = STRUCTURAL + ("moved", "restyled")
+
+
+class SceneDiff:
+    """Éléments touchés depuis le dernier ``flush``, classés par nature."""
+
+    def __init__(self):
+        for kind in KINDS:
+            setattr(self, kind, set())
+
+    def __repr__(self):
+        counts = ", ".join(f"{k}={len(getattr(self, k))}" for k in KINDS)
+        return f"SceneDiff({counts})"
+
+    def is_empty(self) -> bool:
+        return not any(getattr(self, kind) for kind in KINDS)
+
+    def is_structural(self) -> bool:
+        return any(getattr(self, kind) for kind in STRUCTURAL)
+
+    def touched(self) -> set:
+        """Éléments encore présents susceptibles d'avoir changé."""
+        items = set()
+        for kind in KINDS:
+            if kind != "removed":
+                items |= getattr(self, kind)
+        return items
+
+
+class ChangeTracker:
+    """Accumule les changements de la scène jusqu'au prochain ``flush``.
+
+    ``on_change(item, kind)`` est appelé immédiatement à chaque changement.
+    """
+
+    def __init__(self, on_change=None):
+        self._diff = SceneDiff()
+        # retirés puis réinsérés depuis le dernier ``flush``
+        self._revived = set()
+        self._on_change = on_change
+
+    def mark(self, item, kind: str):
+        diff = self._diff
+        if kind == "added":
+            if item in diff.removed:
+                diff.removed.discard(item)
+                self._revived.add(item)
+            diff.added.add(item)
+        elif (
+            kind == "removed"
+            and item in diff.added
+            and item not in self._revived
+        ):
+            # ajouté puis retiré avant le rafraîchissement (aperçus) :
+            # les vues n'en ont jamais eu connaissance
+            for name in KINDS:
+                getattr(diff, name).discard(item)
+        else:
+            if kind == "removed":
+                diff.added.discard(item)
+            getattr(diff, kind).add(item)
+        if self._on_change is not None:
+            self._on_change(item, kind)
+
+    def pending(self) -> bool:
+        return not self._diff.is_empty()
+
+    def flush(self) -> SceneDiff:
+        """Retourne le différentiel accumulé et repart de zéro."""
+        diff, self._diff = self._diff, SceneDiff()
+        self._revived.clear()
+        return diff
+
+    def reset(self):
+        self._diff = SceneDiff()
+        self._revived.clear()
+
+
+def notify_change(item, kind: str):
+    """Signale un changement de ``item`` au suivi de sa scène, s'il existe."""
+    scene = item.scene()
+    tracker = getattr(scene, "tracker", None) if scene is not None else None
+    if tracker is not None:
+        tracker.mark(item, kind)
@@ -2,7 +2,6 @@
 
 import os
 import json
-import tempfile
 from PyQt5.QtWidgets import (
     QWidget,
     QVBoxLayout,
@@ -18,6 +17,7 @@ from PyQt5.QtGui import QIcon, QPixmap
 from PyQt5.QtCore import Qt, QSize
 
 from .project_tile import ProjectTile
+from ..project_io import BinaryProject, is_binary
 
 
 class ProjectList(QListWidget):
@@ -222,6 +222,9 @@ class HomePage(QWidget):
         return valid
 
     def _load_metadata(self, path: str) -> dict:
+        if is_binary(path):
+            project = BinaryProject(path)
+            return {**project.meta, "layers": project.layers}
         if path.lower().endswith(".ptc"):
             import zipfile
 
@@ -234,7 +237,13 @@ class HomePage(QWidget):
                 return json.load(f)
 
     def _thumbnail_for(self, path: str, style) -> QIcon:
-        if path.lower().endswith(".ptc"):
+        if is_binary(path):
+            data = BinaryProject(path).thumbnail()
+            if data:
+                pix = QPixmap()
+                pix.loadFromData(data)
+                return QIcon(pix)
+        elif path.lower().endswith(".ptc"):
             import zipfile
 
             with zipfile.ZipFile(path, "r") as zf:
@@ -258,47 +267,8 @@ class HomePage(QWidget):
                 self, "Erreur", "Impossible de trouver le projet.")
             return
 
-        # Charge les paramètres depuis le fichier
-        try:
-            if path.lower().endswith(".ptc"):
-                import zipfile
-
-                with zipfile.ZipFile(path, "r") as zf:
-                    with zf.open("project.json") as f:
-                        data = json.load(f)
-                    tmp = tempfile.mkdtemp(prefix="pictocode_")
-                    for name in zf.namelist():
-                        if name.startswith("images/"):
-                            zf.extract(name, tmp)
-                    for shp in data.get("shapes", []):
-                        if shp.get("type") == "image":
-                            shp["path"] = os.path.join(tmp, shp["path"])
-            else:
-                with open(path, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-        except Exception as e:
-            QMessageBox.critical(
-                self, "Erreur", f"Échec de lecture de {path} :\n{e}")
-            return
-
-        # Sépare métadonnées et formes
-        params = {
-            k: data.get(k)
-            for k in (
-                "name",
-                "width",
-                "height",
-                "unit",
-                "orientation",
-                "color_mode",
-                "dpi",
-            )
-        }
-        shapes = data.get("shapes", [])
-        layers = data.get("layers", [])
-
-        # Appelle MainWindow pour ouvrir le projet
-        self.parent.open_project(path, params, shapes, layers)
+        # Décodage et construction progressive des formes
+        self.parent.open_project_file(path)
 
     def _on_template_double_click(self, item: QListWidgetItem):
         """Pré-remplit le dialogue de nouveau projet avec un modèle."""
@@ -308,7 +278,9 @@ class HomePage(QWidget):
         if path:
             # open existing project as template
             try:
-                if path.lower().endswith(".ptc"):
+                if is_binary(path):
+                    params = BinaryProject(path).meta
+                elif path.lower().endswith(".ptc"):
                     import zipfile
 
                     with zipfile.ZipFile(path, "r") as zf:
@@ -92,37 +92,38 @@ class Inspector(QWidget):
         # Item courant
         self._item = None
 
-        # Connexions de saisie
+        # Connexions de saisie : chaque setter reçoit (item, valeur) et
+        # s'applique à toute la sélection, sauf le texte et la variable
         for fld, setter in (
-            (self.x_field, lambda val: self._item.setX(int(val))),
-            (self.y_field, lambda val: self._item.setY(int(val))),
+            (self.x_field, self._set_x),
+            (self.y_field, self._set_y),
             (
                 self.w_field,
-                lambda val: self._item.setRect(
-                    0, 0, int(self.w_field.text()), self._item.rect().height()
-                ),
+                lambda it, val: it.setRect(
+                    0, 0, int(val), it.rect().height()
+                ) if hasattr(it, "setRect") else None,
             ),
             (
                 self.h_field,
-                lambda val: self._item.setRect(
-                    0, 0, self._item.rect().width(), int(val)
-                ),
+                lambda it, val: it.setRect(
+                    0, 0, it.rect().width(), int(val)
+                ) if hasattr(it, "setRect") else None,
             ),
             (
                 self.rotation_field,
-                lambda val: self._item.setRotation(int(val)),
+                lambda it, val: it.setRotation(int(val)),
             ),
-            (self.z_field, lambda val: self._item.setZValue(int(val))),
+            (self.z_field, lambda it, val: it.setZValue(int(val))),
             (self.border_field, self._set_pen_width),
             (
                 self.opacity_field,
-                lambda val: self._item.setOpacity(int(val) / 100),
+                lambda it, val: it.setOpacity(int(val) / 100),
             ),
             (self.var_field, self._set_var_name),
             (self.align_field, self._set_alignment),
-            (self.text_field, lambda val: self._item.setPlainText(
-                val) if hasattr(self._item, 'setPlainText') else None),
-            (self.font_field, lambda val: self._set_font_size(int(val))),
+            (self.text_field, lambda it, val: it.setPlainText(
+                val) if hasattr(it, 'setPlainText') else None),
+            (self.font_field, lambda it, val: self._set_font_size(it, int(val))),
         ):
             if hasattr(fld, "valueChanged"):
                 fld.valueChanged.connect(
@@ -221,6 +222,8 @@ class Inspector(QWidget):
             self.font_field.hide()
 
     def _update_field(self, fld, setter):
+        if self._item is None:
+            return
         try:
             if hasattr(fld, "value"):
                 value = fld.value()
@@ -228,50 +231,81 @@ class Inspector(QWidget):
                 value = fld.currentText()
             else:
                 value = fld.text()
-            setter(value)
-            self._notify_change()
+            if fld in (self.x_field, self.y_field):
+                # déplacement relatif : la sélection garde sa disposition
+                value -= self._item.x() if fld is self.x_field else self._item.y()
+            single = fld in (self.text_field, self.var_field)
+            self._apply(lambda it: setter(it, value), single)
         except Exception as exc:
             logging.getLogger(__name__).exception(
                 "Failed to update %s", fld, exc_info=exc
             )
 
+    def _canvas(self):
+        if self._item is None or self._item.scene() is None:
+            return None
+        views = self._item.scene().views()
+        if views and hasattr(views[0], "edit_items"):
+            return views[0]
+        return None
+
+    def _apply(self, func, single: bool = False):
+        """Applique ``func`` à l'élément inspecté et au reste de la sélection.
+
+        Le canvas enregistre l'ensemble comme une seule modification.
+        """
+        canvas = self._canvas()
+        if canvas is None:
+            func(self._item)
+            return
+        items = [self._item] if single else canvas._edit_targets(self._item)
+        canvas.edit_items(items, func, merge_key="inspector")
+
+    @staticmethod
+    def _set_x(item, dx):
+        item.setX(item.x() + dx)
+
+    @staticmethod
+    def _set_y(item, dy):
+        item.setY(item.y() + dy)
+
     def _pick_color(self, event=None):
         if not self._item:
             return
         col = QColorDialog.getColor(parent=self)
         if col.isValid():
-            if hasattr(self._item, "pen"):
-                pen = self._item.pen()
-                pen.setColor(col)
-                self._item.setPen(pen)
-            elif hasattr(self._item, "setDefaultTextColor"):
-                self._item.setDefaultTextColor(col)
+            def apply(it):
+                if hasattr(it, "pen"):
+                    pen = it.pen()
+                    pen.setColor(col)
+                    it.setPen(pen)
+                elif hasattr(it, "setDefaultTextColor"):
+                    it.setDefaultTextColor(col)
+
+            self._apply(apply)
             self._update_color_button(col.name())
-            self._notify_change()
 
-    def _set_font_size(self, size: int):
-        if hasattr(self._item, 'font'):
-            f = self._item.font()
+    @staticmethod
+    def _set_font_size(item, size: int):
+        if hasattr(item, 'font'):
+            f = item.font()
             f.setPointSize(size)
-            self._item.setFont(f)
-            self._notify_change()
+            item.setFont(f)
 
-    def _set_pen_width(self, width: int):
-        if hasattr(self._item, 'pen'):
-            pen = self._item.pen()
+    @staticmethod
+    def _set_pen_width(item, width: int):
+        if hasattr(item, 'pen'):
+            pen = item.pen()
             pen.setWidth(int(width))
-            self._item.setPen(pen)
-            self._notify_change()
+            item.setPen(pen)
 
-    def _set_var_name(self, name: str):
-        if self._item is not None:
-            setattr(self._item, 'var_name', name)
-            self._notify_change()
+    @staticmethod
+    def _set_var_name(item, name: str):
+        setattr(item, 'var_name', name)
 
-    def _set_alignment(self, _val):
-        if hasattr(self._item, 'alignment'):
-            self._item.alignment = self.align_field.currentText()
-            self._notify_change()
+    def _set_alignment(self, item, _val):
+        if hasattr(item, 'alignment'):
+            item.alignment = self.align_field.currentText()
 
     def _update_color_button(self, color: str):
         self.color_btn.setStyleSheet(f"background:{color};")
@@ -281,12 +315,15 @@ class Inspector(QWidget):
             return
         col = QColorDialog.getColor(parent=self)
         if col.isValid():
-            brush = self._item.brush()
-            brush.setColor(col)
-            brush.setStyle(Qt.SolidPattern)
-            self._item.setBrush(brush)
+            def apply(it):
+                if hasattr(it, "setBrush"):
+                    brush = it.brush()
+                    brush.setColor(col)
+                    brush.setStyle(Qt.SolidPattern)
+                    it.setBrush(brush)
+
+            self._apply(apply)
             self._update_fill_button(col.name())
-            self._notify_change()
 
     def _pick_gradient(self, event=None):
         if not self._item or not hasattr(self._item, 'brush'):
@@ -304,13 +341,17 @@ class Inspector(QWidget):
         dlg = GradientEditorDialog(start_col, end_col, p1, p2, self)
         if dlg.exec_() == QDialog.Accepted:
             start_col, end_col, p1, p2 = dlg.get_gradient()
-            r = self._item.boundingRect()
-            grad = QLinearGradient(0, 0, r.width(), 0)
-            grad.setColorAt(p1, start_col)
-            grad.setColorAt(p2, end_col)
-            self._item.setBrush(QBrush(grad))
+
+            def apply(it):
+                if not hasattr(it, "setBrush"):
+                    return
+                grad = QLinearGradient(0, 0, it.boundingRect().width(), 0)
+                grad.setColorAt(p1, start_col)
+                grad.setColorAt(p2, end_col)
+                it.setBrush(QBrush(grad))
+
+            self._apply(apply)
             self._update_gradient_button(start_col, end_col)
-            self._notify_change()
 
     def _update_fill_button(self, color: str):
         self.fill_btn.setStyleSheet(f"background:{color};")
@@ -358,13 +399,4 @@ class Inspector(QWidget):
         )
         if not ok:
             return
-        self._item.setTransformOriginPoint(x, y)
-        self._notify_change()
-
-    def _notify_change(self):
-        if self._item and self._item.scene():
-            views = self._item.scene().views()
-            if views:
-                view = views[0]
-                if hasattr(view, "_mark_dirty"):
-                    view._mark_dirty()
+        self._apply(lambda it: it.setTransformOriginPoint(x, y), single=True)
@@ -1,5 +1,366 @@
-from PyQt5.QtWidgets import QWidget, QTreeWidget, QTreeWidgetItem, QVBoxLayout
-from PyQt5.QtCore import Qt
+from bisect import bisect_right, insort
+
+from PyQt5 import sip
+from PyQt5.QtWidgets import QWidget, QTreeView, QVBoxLayout, QAbstractItemView
+from PyQt5.QtCore import (
+    Qt,
+    QAbstractItemModel,
+    QModelIndex,
+    QPersistentModelIndex,
+)
+
+
+# enfants matérialisés par appel à ``fetchMore``
+FETCH_BATCH = 256
+
+
+def _z(node) -> float:
+    return node.item.zValue()
+
+
+class _Node:
+    """Entrée de l'outliner associée à un élément graphique.
+
+    ``children`` suit l'ordre d'empilement de Qt (du dessous vers le
+    dessus) : la ligne affichée est donc comptée depuis la fin, ce qui
+    laisse inchangées les positions des frères quand un élément est ajouté
+    au premier plan. ``pending`` garde, dans le même ordre, les éléments
+    pas encore matérialisés (les plus bas, affichés en dernier).
+    """
+
+    __slots__ = ("item", "name", "parent", "children", "pending", "pos", "resort")
+
+    def __init__(self, item, name, parent):
+        self.item = item
+        self.name = name
+        self.parent = parent
+        # None tant que les enfants n'ont pas été listés
+        self.children = None
+        self.pending = []
+        # position dans ``parent.children`` ; vérifiée avant usage
+        self.pos = 0
+        # un élément de ``pending`` a changé de zValue
+        self.resort = False
+
+    def row(self) -> int:
+        parent = self.parent
+        if parent is None:
+            return 0
+        siblings = parent.children
+        pos = self.pos
+        if pos >= len(siblings) or siblings[pos] is not self:
+            for i, child in enumerate(siblings):
+                child.pos = i
+        return len(siblings) - 1 - self.pos
+
+
+class OutlinerModel(QAbstractItemModel):
+    """Modèle paresseux de la hiérarchie calques → éléments.
+
+    Les lignes d'un nœud sont créées par lots de ``FETCH_BATCH`` à son
+    dépliage puis au défilement (``fetchMore``). ``apply_changes`` traduit
+    chaque élément ajouté, retiré ou réordonné d'un différentiel de scène
+    en une insertion, suppression ou déplacement de ligne, placée par
+    recherche dichotomique sur la ``zValue`` : le coût dépend du
+    changement, pas de la taille du calque.
+    """
+
+    def __init__(self, canvas, parent=None):
+        super().__init__(parent)
+        self.canvas = canvas
+        self._root = _Node(None, "", None)
+        self._nodes = {}
+        self._by_name = {}
+
+    # --- index --------------------------------------------------------
+    def node_for_name(self, name):
+        return self._by_name.get(name)
+
+    def index_for_node(self, node) -> QModelIndex:
+        if node is None or node is self._root:
+            return QModelIndex()
+        return self.createIndex(node.row(), 0, node)
+
+    def _node(self, index):
+        return index.internalPointer() if index.isValid() else self._root
+
+    def _layer_items(self):
+        """Calques dans l'ordre de stockage (inverse de l'affichage)."""
+        layers = self.canvas.layers
+        return [layers[n] for n in reversed(self.canvas.layer_names())]
+
+    def _make_node(self, item, parent):
+        name = getattr(item, "layer_name", type(item).__name__)
+        node = _Node(item, name, parent)
+        self._nodes[item] = node
+        self._by_name[name] = node
+        return node
+
+    def _drop_node(self, node):
+        self._nodes.pop(node.item, None)
+        if self._by_name.get(node.name) is node:
+            del self._by_name[node.name]
+        for child in node.children or ():
+            self._drop_node(child)
+
+    # --- Qt model API -------------------------------------------------
+    def index(self, row, column, parent=QModelIndex()):
+        node = self._node(parent)
+        children = node.children
+        if children is None or not 0 <= row < len(children):
+            return QModelIndex()
+        return self.createIndex(row, column, children[len(children) - 1 - row])
+
+    def parent(self, index):
+        if not index.isValid():
+            return QModelIndex()
+        return self.index_for_node(index.internalPointer().parent)
+
+    def rowCount(self, parent=QModelIndex()):
+        node = self._node(parent)
+        return len(node.children) if node.children is not None else 0
+
+    def columnCount(self, parent=QModelIndex()):
+        return 1
+
+    def hasChildren(self, parent=QModelIndex()):
+        node = self._node(parent)
+        if node.children is not None:
+            return bool(node.children or node.pending)
+        return node is self._root or bool(node.item.childItems())
+
+    def canFetchMore(self, parent):
+        node = self._node(parent)
+        return node.children is None or bool(node.pending)
+
+    def fetchMore(self, parent):
+        node = self._node(parent)
+        if node is self._root:
+            if node.children is None:
+                node.children = []
+                self._insert(node, 0, self._layer_items())
+            return
+        if node.children is None:
+            node.children = []
+            node.pending = node.item.childItems()
+        pending = node.pending
+        if node.resort:
+            pending[:] = [it for it in pending if not sip.isdeleted(it)]
+            pending.sort(key=lambda it: it.zValue())
+            node.resort = False
+        batch = []
+        seen = set()
+        while pending and len(batch) < FETCH_BATCH:
+            item = pending.pop()
+            # entrées périmées : éléments retirés, déplacés ou en double
+            if (
+                not sip.isdeleted(item)
+                and item.parentItem() is node.item
+                and item not in self._nodes
+                and item not in seen
+            ):
+                seen.add(item)
+                batch.append(item)
+        if batch:
+            batch.reverse()
+            self._insert(node, 0, batch)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role in (Qt.DisplayRole, Qt.UserRole):
+            return index.internalPointer().name
+        return None
+
+    # --- row operations -----------------------------------------------
+    def _insert(self, parent, pos, items):
+        """Insère ``items`` (ordre de stockage) à la position ``pos``."""
+        if not items:
+            return
+        first = len(parent.children) - pos
+        self.beginInsertRows(
+            self.index_for_node(parent), first, first + len(items) - 1
+        )
+        nodes = [self._make_node(it, parent) for it in items]
+        for i, node in enumerate(nodes, start=pos):
+            node.pos = i
+        parent.children[pos:pos] = nodes
+        self.endInsertRows()
+
+    def _remove(self, node):
+        parent = node.parent
+        row = node.row()
+        self.beginRemoveRows(self.index_for_node(parent), row, row)
+        del parent.children[node.pos]
+        self._drop_node(node)
+        self.endRemoveRows()
+
+    def _add(self, parent, item):
+        """Insère ``item`` à sa place dans l'ordre d'empilement."""
+        z = item.zValue()
+        siblings = parent.children
+        pos = bisect_right(siblings, z, key=_z)
+        if pos == 0 and parent.pending and (not siblings or z < _z(siblings[0])):
+            # sous tous les éléments affichés : sera matérialisé plus tard
+            insort(parent.pending, item, key=lambda it: it.zValue())
+            return
+        self._insert(parent, pos, [item])
+
+    def _demote(self, node):
+        """Renvoie dans ``pending`` un nœud passé sous les lignes affichées."""
+        parent = node.parent
+        item = node.item
+        self._remove(node)
+        insort(parent.pending, item, key=lambda it: it.zValue())
+
+    def _restack(self, node):
+        """Déplace la ligne de ``node`` après un changement de zValue."""
+        parent = node.parent
+        siblings = parent.children
+        old_row = node.row()
+        p = node.pos
+        del siblings[p]
+        q = bisect_right(siblings, _z(node), key=_z)
+        siblings.insert(p, node)
+        if q == 0 and parent.pending and (
+            len(siblings) == 1 or _z(node) < _z(siblings[1 if p == 0 else 0])
+        ):
+            # les éléments non matérialisés doivent rester en dessous
+            self._demote(node)
+            return
+        if q == p:
+            return
+        new_row = len(siblings) - 1 - q
+        index = self.index_for_node(parent)
+        self.beginMoveRows(
+            index,
+            old_row,
+            old_row,
+            index,
+            new_row + 1 if new_row > old_row else new_row,
+        )
+        del siblings[p]
+        siblings.insert(q, node)
+        for i in range(min(p, q), max(p, q) + 1):
+            siblings[i].pos = i
+        self.endMoveRows()
+
+    def _rearrange(self, parent, children):
+        """Remplace l'ordre des lignes de ``parent`` par ``children``."""
+        if children == parent.children:
+            return
+        parents = [QPersistentModelIndex(self.index_for_node(parent))]
+        self.layoutAboutToBeChanged.emit(parents)
+        old = {id(child): child.row() for child in parent.children}
+        parent.children = children
+        last = len(children) - 1
+        for pos, child in enumerate(children):
+            child.pos = pos
+            self.changePersistentIndex(
+                self.createIndex(old[id(child)], 0, child),
+                self.createIndex(last - pos, 0, child),
+            )
+        self.layoutChanged.emit(parents)
+
+    # --- updates ------------------------------------------------------
+    def reset(self):
+        self.beginResetModel()
+        self._root = _Node(None, "", None)
+        self._nodes.clear()
+        self._by_name.clear()
+        self.endResetModel()
+
+    def apply_changes(self, diff):
+        """Applique un ``SceneDiff`` aux seules branches matérialisées."""
+        for item in diff.renamed:
+            node = self._nodes.get(item)
+            if node is None or sip.isdeleted(item):
+                continue
+            if self._by_name.get(node.name) is node:
+                del self._by_name[node.name]
+            node.name = getattr(item, "layer_name", node.name)
+            self._by_name[node.name] = node
+            index = self.index_for_node(node)
+            self.dataChanged.emit(index, index)
+
+        root = self._root
+        sync_root = False
+        for item in diff.removed:
+            node = self._nodes.get(item)
+            if node is None:
+                continue
+            if node.parent is root:
+                sync_root = True
+            else:
+                self._remove(node)
+
+        restacked = {}
+        added = []
+        for item in diff.added | diff.reparented | diff.reordered:
+            if item in diff.removed or sip.isdeleted(item):
+                continue
+            parent = self._parent_node(item)
+            node = self._nodes.get(item)
+            if parent is root or (node is not None and node.parent is root):
+                sync_root = True
+                continue
+            if node is not None and node.parent is not parent:
+                self._remove(node)
+                node = None
+            if parent is None or parent.children is None:
+                continue
+            if node is None:
+                added.append((parent, item))
+                if item in diff.reordered and parent.pending:
+                    parent.resort = True
+            elif item in diff.reordered:
+                restacked.setdefault(parent, []).append(node)
+
+        for parent, nodes in restacked.items():
+            if len(nodes) == 1:
+                self._restack(nodes[0])
+                continue
+            # plusieurs zValue changées : un seul tri stable du niveau
+            if parent.pending:
+                moved = set(map(id, nodes))
+                floor = min(
+                    (_z(c) for c in parent.children if id(c) not in moved),
+                    default=None,
+                )
+                for node in nodes:
+                    if floor is None or _z(node) < floor:
+                        self._demote(node)
+            self._rearrange(parent, sorted(parent.children, key=_z))
+        # une fois les niveaux retriés, la dichotomie est valide
+        for parent, item in added:
+            if parent.children is not None and item not in self._nodes:
+                self._add(parent, item)
+        if sync_root:
+            self._sync_root()
+
+    def _parent_node(self, item):
+        name = getattr(item, "layer_name", None)
+        if item.parentItem() is None:
+            if self.canvas.layers.get(name) is item:
+                return self._root
+            return None
+        return self._nodes.get(item.parentItem())
+
+    def _sync_root(self):
+        """Resynchronise la liste des calques (peu nombreux)."""
+        root = self._root
+        if root.children is None:
+            return
+        wanted = self._layer_items()
+        wanted_set = set(wanted)
+        for child in [c for c in root.children if c.item not in wanted_set]:
+            self._remove(child)
+        present = {child.item for child in root.children}
+        for pos, item in enumerate(wanted):
+            if item not in present:
+                self._insert(root, min(pos, len(root.children)), [item])
+        by_item = {child.item: child for child in root.children}
+        self._rearrange(root, [by_item[it] for it in wanted])
 
 
 class LayoutWidget(QWidget):
@@ -8,47 +369,67 @@ class LayoutWidget(QWidget):
     def __init__(self, main_window, parent=None):
         super().__init__(parent)
         self.main = main_window
-        self.tree = QTreeWidget()
-        self.tree.header().hide()
-        self.tree.itemSelectionChanged.connect(self._on_item_selected)
+        self.model = None
+        self.tree = QTreeView()
+        self.tree.setHeaderHidden(True)
+        self.tree.setUniformRowHeights(True)
+        self.tree.setSelectionMode(QAbstractItemView.SingleSelection)
         layout = QVBoxLayout(self)
         layout.setContentsMargins(0, 0, 0, 0)
         layout.addWidget(self.tree)
+        self.tree.verticalScrollBar().valueChanged.connect(self._fetch_visible)
 
     # ------------------------------------------------------------------
+    def _ensure_model(self):
+        if self.model is None:
+            self.model = OutlinerModel(self.main.canvas, self)
+            self.model.rowsInserted.connect(self._on_rows_inserted)
+            self.tree.setModel(self.model)
+            self.tree.selectionModel().selectionChanged.connect(
+                self._on_item_selected
+            )
+        return self.model
+
     def populate(self):
         """Refresh object hierarchy from canvas."""
-        self.tree.blockSignals(True)
-        self.tree.clear()
-        canvas = self.main.canvas
-        for name in canvas.layer_names():
-            layer = canvas.layers[name]
-            node = QTreeWidgetItem([name])
-            node.setData(0, Qt.UserRole, name)
-            self.tree.addTopLevelItem(node)
-            self._add_children(layer, node)
-        self.tree.expandAll()
-        self.tree.blockSignals(False)
-
-    def _add_children(self, graphics_item, tree_item):
-        for child in reversed(graphics_item.childItems()):
-            name = getattr(child, "layer_name", type(child).__name__)
-            node = QTreeWidgetItem([name])
-            node.setData(0, Qt.UserRole, name)
-            tree_item.addChild(node)
-            if hasattr(child, "childItems") and child.childItems():
-                self._add_children(child, node)
+        model = self._ensure_model()
+        model.reset()
+        model.fetchMore(QModelIndex())
+
+    def apply_changes(self, diff):
+        """Update only the branches touched by ``diff``."""
+        self._ensure_model().apply_changes(diff)
+
+    def _on_rows_inserted(self, parent, first, last):
+        # Layers are shown unfolded; their first batch of rows loads on
+        # expansion and nested groups load when expanded.
+        if parent.isValid():
+            return
+        for row in range(first, last + 1):
+            self.tree.expand(self.model.index(row, 0))
+
+    def _fetch_visible(self, *_):
+        """Load the next batch of the branch shown at the bottom."""
+        if self.model is None:
+            return
+        viewport = self.tree.viewport()
+        index = self.tree.indexAt(viewport.rect().bottomLeft())
+        if not index.isValid():
+            return
+        parent = index.parent()
+        if self.model.canFetchMore(parent):
+            self.model.fetchMore(parent)
 
     # ------------------------------------------------------------------
-    def _on_item_selected(self):
-        current = self.tree.currentItem()
-        if not current:
+    def _on_item_selected(self, *_):
+        current = self.tree.currentIndex()
+        if not current.isValid():
             return
-        name = current.data(0, Qt.UserRole)
+        name = current.data(Qt.UserRole)
         # Top-level items correspond to layers. Selecting them should only
         # change the active layer, not select the underlying group which
         # would block interaction with its children on the canvas.
-        if current.parent() is None:
+        if not current.parent().isValid():
 
             # Avoid locking the canvas by leaving the layer group selected
             self.main.canvas.deselect_all()
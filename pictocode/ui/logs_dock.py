@@ -1,15 +1,96 @@
-from PyQt5.QtWidgets import QWidget, QVBoxLayout, QPlainTextEdit
-from ..logger import log_emitter
+import logging
+
+from PyQt5.QtWidgets import (
+    QWidget,
+    QVBoxLayout,
+    QHBoxLayout,
+    QPlainTextEdit,
+    QComboBox,
+    QLineEdit,
+    QPushButton,
+)
+from PyQt5.QtCore import QTimer
+from PyQt5.QtGui import QTextCursor
+from ..logger import log_sink
+
+LEVELS = [
+    ("Tous", logging.NOTSET),
+    ("Debug", logging.DEBUG),
+    ("Info", logging.INFO),
+    ("Avertissements", logging.WARNING),
+    ("Erreurs", logging.ERROR),
+]
+
 
 class LogsWidget(QWidget):
-    """Simple widget that displays application logs."""
+    """Simple widget that displays application logs.
+
+    New records are pulled from :data:`~pictocode.logger.log_sink` in batches
+    on a timer; the document keeps at most the sink's capacity in lines.
+    """
+
+    FLUSH_INTERVAL = 250  # ms
 
     def __init__(self, parent=None):
         super().__init__(parent)
+        self.level_combo = QComboBox(self)
+        for label, level in LEVELS:
+            self.level_combo.addItem(label, level)
+        self.name_filter = QLineEdit(self)
+        self.name_filter.setPlaceholderText("Logger…")
+        self.name_filter.setClearButtonEnabled(True)
+        clear_btn = QPushButton("Effacer", self)
+        filters = QHBoxLayout()
+        filters.setContentsMargins(0, 0, 0, 0)
+        filters.addWidget(self.level_combo)
+        filters.addWidget(self.name_filter, 1)
+        filters.addWidget(clear_btn)
+
         self.text_edit = QPlainTextEdit(self)
         self.text_edit.setReadOnly(True)
         self.text_edit.setMinimumSize(0, 0)
+        self.text_edit.setMaximumBlockCount(log_sink.capacity)
         layout = QVBoxLayout(self)
         layout.setContentsMargins(0, 0, 0, 0)
+        layout.addLayout(filters)
         layout.addWidget(self.text_edit)
-        log_emitter.log_record.connect(self.text_edit.appendPlainText)
+
+        self._seq = 0
+        self.level_combo.currentIndexChanged.connect(self._refilter)
+        self.name_filter.textChanged.connect(self._refilter)
+        clear_btn.clicked.connect(self.clear)
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self.flush)
+        self._timer.start(self.FLUSH_INTERVAL)
+
+    def _accepts(self, level: int, name: str) -> bool:
+        if level < self.level_combo.currentData():
+            return False
+        prefix = self.name_filter.text().strip()
+        return not prefix or name.startswith(prefix)
+
+    def flush(self):
+        """Append the records received since the last flush in one batch."""
+        entries, self._seq = log_sink.since(self._seq)
+        lines = [
+            text for _, level, name, text in entries
+            if self._accepts(level, name)
+        ]
+        if lines:
+            self.text_edit.appendPlainText("\n".join(lines))
+
+    def _refilter(self):
+        """Rebuild the view from the retained records only."""
+        entries = log_sink.entries()
+        self._seq = entries[-1][0] if entries else self._seq
+        self.text_edit.setPlainText(
+            "\n".join(
+                text for _, level, name, text in entries
+                if self._accepts(level, name)
+            )
+        )
+        self.text_edit.moveCursor(QTextCursor.End)
+
+    def clear(self):
+        log_sink.clear()
+        self.text_edit.clear()
@@ -1,6 +1,5 @@
 # pictocode/ui/main_window.py
 import os
-import json
 import logging
 from PyQt5.QtWidgets import (
     QMainWindow,
@@ -19,6 +18,8 @@ from PyQt5.QtWidgets import (
     QWIDGETSIZE_MAX,
     QStyle,
     QTabWidget,
+    QInputDialog,
+    QProgressDialog,
 )
 from PyQt5.QtCore import (
     Qt,
@@ -34,8 +35,12 @@ from PyQt5.QtCore import (
 from .corner_tabs import CornerTabs
 from PyQt5.QtGui import QPalette, QColor, QKeySequence, QCursor
 from PyQt5.QtWidgets import QApplication
+from ..assets import store
 from ..utils import generate_pycode, get_contrast_color
 from ..canvas import CanvasWidget
+from ..saver import ProjectSaver
+from ..loader import ProjectLoader
+from ..raster import ImageExporter, ThumbnailJob
 from .toolbar import Toolbar
 from .title_bar import TitleBar
 from .inspector import Inspector
@@ -152,6 +157,15 @@ class MainWindow(QMainWindow):
             "autosave_enabled", False, type=bool)
         self.autosave_interval = int(
             self.settings.value("autosave_interval", 5))
+        self.history_depth = int(self.settings.value("history_depth", 200))
+        self.history_budget = int(self.settings.value("history_budget", 64))
+        self.image_cache_budget = int(
+            self.settings.value("image_cache_budget", 256))
+        store.set_budget(self.image_cache_budget * 1024 * 1024)
+        self.stroke_tolerance = float(
+            self.settings.value("stroke_tolerance", 1.0))
+        self.stroke_smoothing = self.settings.value(
+            "stroke_smoothing", False, type=bool)
         self.auto_show_inspector = self.settings.value(
             "auto_show_inspector", True, type=bool)
         # By default dock widgets are attached to the main window
@@ -168,6 +182,11 @@ class MainWindow(QMainWindow):
 
         # Page projet avec interface à onglets
         self.canvas = CanvasWidget(self)
+        self.canvas.set_history_limits(
+            self.history_depth, self.history_budget * 1024 * 1024
+        )
+        self.canvas.set_stroke_options(
+            self.stroke_tolerance, self.stroke_smoothing)
 
         # Toolbar & inspecteur (cachés par défaut)
         self.toolbar = Toolbar(self)
@@ -206,6 +225,18 @@ class MainWindow(QMainWindow):
         self.current_project_path = None
         self.unsaved_changes = False
         self._current_anim = None
+        # chargement progressif en cours (Échap pour l'annuler)
+        self._loader = None
+        self.cancel_load_act = QAction("Annuler le chargement", self)
+        self.cancel_load_act.setShortcut(QKeySequence(Qt.Key_Escape))
+        self.cancel_load_act.setEnabled(False)
+        self.cancel_load_act.triggered.connect(self.cancel_loading)
+        self.addAction(self.cancel_load_act)
+        # dernière miniature rendue (voir _thumbnail_job)
+        self._thumb_job = None
+        # enregistrement en cours sur un thread de travail
+        self._saver = None
+        self._save_again = False
 
         # Paramètres de thème et raccourcis
         self.current_theme = self.settings.value("theme", "Light")
@@ -416,6 +447,21 @@ class MainWindow(QMainWindow):
         editm.addAction(flip_v_act)
         self.actions["flip_vertical"] = flip_v_act
 
+        front_act = QAction("Premier plan", self)
+        front_act.triggered.connect(self.bring_to_front)
+        editm.addAction(front_act)
+        self.actions["bring_to_front"] = front_act
+
+        back_act = QAction("Arrière-plan", self)
+        back_act.triggered.connect(self.send_to_back)
+        editm.addAction(back_act)
+        self.actions["send_to_back"] = back_act
+
+        simplify_act = QAction("Simplifier les tracés", self)
+        simplify_act.triggered.connect(self.simplify_selection)
+        editm.addAction(simplify_act)
+        self.actions["simplify_paths"] = simplify_act
+
         del_act = QAction("Supprimer", self)
         del_act.triggered.connect(self.delete_selection)
         editm.addAction(del_act)
@@ -545,7 +591,7 @@ class MainWindow(QMainWindow):
             QMessageBox.Save | QMessageBox.Discard | QMessageBox.Cancel,
         )
         if resp == QMessageBox.Save:
-            self.save_project()
+            self.save_project(wait=True)
             return not self.unsaved_changes
         return resp == QMessageBox.Discard
 
@@ -602,50 +648,82 @@ class MainWindow(QMainWindow):
             self,
             "Ouvrir un projet",
             PROJECTS_DIR,
-            "Pictocode (*.json *.ptc)",
+            "Pictocode (*.json *.ptc *.ptb)",
         )
         if path:
-            try:
-                if path.lower().endswith(".ptc"):
-                    import zipfile
-                    import tempfile
-
-                    with zipfile.ZipFile(path, "r") as zf:
-                        with zf.open("project.json") as f:
-                            data = json.load(f)
-                        tmp = tempfile.mkdtemp(prefix="pictocode_")
-                        for name in zf.namelist():
-                            if name.startswith("images/"):
-                                zf.extract(name, tmp)
-                        for shp in data.get("shapes", []):
-                            if shp.get("type") == "image":
-                                shp["path"] = os.path.join(tmp, shp["path"])
-                else:
-                    with open(path, "r", encoding="utf-8") as f:
-                        data = json.load(f)
-                params = {
-                    k: data[k]
-                    for k in (
-                        "name",
-                        "width",
-                        "height",
-                        "unit",
-                        "orientation",
-                        "color_mode",
-                        "dpi",
-                    )
-                }
-                shapes = data.get("shapes", [])
-                layers = data.get("layers", [])
-                self.open_project(path, params, shapes, layers)
-            except Exception as e:
-                QMessageBox.critical(
-                    self, "Erreur", f"Impossible d'ouvrir : {e}")
+            self.open_project_file(path, check_saved=False)
+
+    def open_project_file(self, path, check_saved=True):
+        """Ouvre ``path`` progressivement.
+
+        Le fichier est décodé sur un thread de travail et les formes sont
+        construites par lots : le document s'affiche au fur et à mesure et
+        Échap annule le chargement.
+        """
+        if check_saved and not self.maybe_save():
+            return
+        if self._loader is not None:
+            self._loader.cancel()
+        loader = ProjectLoader(self.canvas, path, self)
+        loader.opened.connect(
+            lambda params, layers: self._setup_project(path, params, layers)
+        )
+        loader.progress.connect(self._on_load_progress)
+        loader.finished.connect(lambda: self._on_load_finished(loader))
+        loader.canceled.connect(lambda: self._on_load_canceled(loader))
+        loader.failed.connect(lambda msg: self._on_load_failed(loader, msg))
+        self._loader = loader
+        self.cancel_load_act.setEnabled(True)
+        loader.start()
+
+    def cancel_loading(self):
+        if self._loader is not None:
+            self._loader.cancel()
+
+    def _end_loading(self, loader):
+        if self._loader is loader:
+            self._loader = None
+            self.cancel_load_act.setEnabled(False)
+        loader.dispose()
+
+    def _on_load_progress(self, done, total):
+        percent = int(done * 100 / total) if total else 100
+        self.save_status.setText(f"Chargement… {percent} %")
+        self.save_status.show()
 
-    def open_project(self, path, params, shapes=None, layers=None):
-        """Charge un projet existant."""
+    def _on_load_finished(self, loader):
+        self._end_loading(loader)
+        # les modifications faites pendant le chargement restent à enregistrer
+        if not loader.modified:
+            self.set_dirty(False)
+        self.show_status("Projet chargé")
+
+    def _on_load_canceled(self, loader):
+        self._end_loading(loader)
+        # Le document est incomplet : ne pas écraser le fichier d'origine.
+        self.current_project_path = None
+        self.show_status("Chargement annulé")
+
+    def _on_load_failed(self, loader, message):
+        self._end_loading(loader)
+        QMessageBox.critical(self, "Erreur", f"Impossible d'ouvrir : {message}")
+
+    def open_project(self, path, params, shapes=None, layers=None, deferred=None):
+        """Charge un projet existant.
+
+        ``deferred`` associe des calques masqués à une fonction décodant
+        leurs formes à la demande (format binaire).
+        """
         if not self.maybe_save():
             return
+        self._setup_project(path, params, layers)
+        # charge formes
+        self.canvas.load_shapes(shapes or [])
+        self.canvas.defer_layers(deferred or {})
+        self.set_dirty(False)
+
+    def _setup_project(self, path, params, layers):
+        """Crée le document et ses calques puis bascule sur le canvas."""
         self.current_project_path = path
         # crée document
         self.canvas.new_document(**params)
@@ -655,8 +733,6 @@ class MainWindow(QMainWindow):
         self.layers.populate()
         self.layout.populate()
 
-        # charge formes
-        self.canvas.load_shapes(shapes or [])
         # bascule UI
         self.toolbar.setVisible(True)
         self.tabs.setCurrentWidget(self.canvas)
@@ -668,74 +744,103 @@ class MainWindow(QMainWindow):
         self.add_recent_project(path)
         self.home.populate_lists()
 
-    def save_project(self):
+    def save_project(self, wait: bool = False):
+        """Enregistre le projet courant en arrière-plan.
+
+        Seul l'instantané du document est pris sur le thread GUI ; avec
+        ``wait`` l'appel attend la fin de l'écriture. Rien n'est écrit tant
+        qu'un chargement est en cours : le document est incomplet.
+        """
+        if self._is_loading():
+            return
         if not self.current_project_path:
-            return self.save_as_project()
+            return self.save_as_project(wait=wait)
+        if self._saver is not None:
+            if not wait:
+                # repartira d'un instantané à jour une fois celui-ci écrit
+                self._save_again = True
+                return
+            # l'écriture qui suit prend déjà l'instantané le plus récent
+            self._save_again = False
+            self._saver.wait()
+        # la miniature se rend pendant la sérialisation du document
+        thumb_job = self._thumbnail_job()
         data = self.canvas.export_project()
+        # relevée après l'export, qui peut matérialiser des calques différés
+        revision = self.canvas.revision
+        saver = ProjectSaver(self.current_project_path, data, thumb_job, self)
+        saver.finished.connect(lambda: self._on_save_finished(saver, revision))
+        saver.failed.connect(lambda msg: self._on_save_failed(saver, msg))
+        self._saver = saver
         self.show_status("Enregistrement…")
-        try:
-            if self.current_project_path.lower().endswith(".ptc"):
-                import zipfile
-                import tempfile
-
-                tmp_thumb = tempfile.mkstemp(suffix=".png")[1]
-                self.canvas.export_image(tmp_thumb, "PNG")
-
-                images = []
-                for shp in data.get("shapes", []):
-                    if (
-                        shp.get("type") == "image"
-                        and os.path.exists(shp["path"])
-                    ):
-                        images.append(
-                            (shp["path"], os.path.basename(shp["path"])))
-                        shp["path"] = f"images/{os.path.basename(shp['path'])}"
-
-                with zipfile.ZipFile(self.current_project_path, "w") as zf:
-                    zf.writestr(
-                        "project.json",
-                        json.dumps(data, indent=2, ensure_ascii=False),
-                    )
-                    zf.write(tmp_thumb, "thumbnail.png")
-                    os.remove(tmp_thumb)
-                    for src, name in images:
-                        zf.write(src, f"images/{name}")
-            else:
-                with open(
-                    self.current_project_path, "w", encoding="utf-8"
-                ) as f:
-                    json.dump(data, f, indent=2, ensure_ascii=False)
-                # also save preview
-                thumb = os.path.splitext(self.current_project_path)[0] + ".png"
-                self.canvas.export_image(thumb, "PNG")
+        saver.start()
+        if wait:
+            saver.wait()
+
+    def _is_loading(self) -> bool:
+        if self._loader is None:
+            return False
+        self.show_status("Chargement en cours : enregistrement impossible")
+        return True
+
+    def _end_saving(self, saver):
+        if self._saver is saver:
+            self._saver = None
+
+    def _on_save_finished(self, saver, revision):
+        self._end_saving(saver)
+        if self.canvas.revision == revision:
             self.set_dirty(False)
-            self.show_status("Projet enregistré")
-            self.add_recent_project(self.current_project_path)
-            self.home.populate_lists()
-        except Exception as e:
-            QMessageBox.critical(
-                self, "Erreur", f"Impossible d'enregistrer : {e}")
+        self.show_status("Projet enregistré")
+        self.add_recent_project(saver.path)
+        self.home.populate_lists()
+        if self._save_again:
+            self._save_again = False
+            self.save_project()
+
+    def _on_save_failed(self, saver, message):
+        self._end_saving(saver)
+        self._save_again = False
+        QMessageBox.critical(
+            self, "Erreur", f"Impossible d'enregistrer : {message}")
+
+    def _thumbnail_job(self) -> ThumbnailJob:
+        """Miniature PNG du document, rendue sur un thread de travail.
+
+        Seul l'instantané de la scène est pris sur le thread GUI ; la
+        miniature est réutilisée tant que le document n'a pas changé.
+        """
+        job = self._thumb_job
+        if job is None or job.revision != self.canvas.revision:
+            job = ThumbnailJob(
+                self.canvas.snapshot_thumbnail(), self.canvas.revision
+            ).start()
+            self._thumb_job = job
+        return job
 
     def _autosave(self):
         if (
             self.autosave_enabled
             and self.current_project_path
             and self.unsaved_changes
+            and self._loader is None
         ):
             self.save_project()
 
-    def save_as_project(self):
+    def save_as_project(self, wait: bool = False):
+        if self._is_loading():
+            return
         path, _ = QFileDialog.getSaveFileName(
             self,
             "Enregistrer sous",
             PROJECTS_DIR,
-            "Pictocode (*.json *.ptc)",
+            "Pictocode (*.json *.ptc *.ptb)",
         )
         if path:
-            if not path.lower().endswith(('.json', '.ptc')):
+            if not path.lower().endswith(('.json', '.ptc', '.ptb')):
                 path += '.json'
             self.current_project_path = path
-            self.save_project()
+            self.save_project(wait=wait)
             base = os.path.basename(os.path.splitext(path)[0])
             self.setWindowTitle(f"Pictocode — {base}")
 
@@ -746,12 +851,44 @@ class MainWindow(QMainWindow):
             PROJECTS_DIR,
             "PNG (*.png);;JPEG (*.jpg *.jpeg)",
         )
-        if path:
-            fmt = "PNG"
-            lower = path.lower()
-            if lower.endswith(".jpg") or lower.endswith(".jpeg"):
-                fmt = "JPEG"
-            self.canvas.export_image(path, fmt)
+        if not path:
+            return
+        fmt = "PNG"
+        lower = path.lower()
+        if lower.endswith(".jpg") or lower.endswith(".jpeg"):
+            fmt = "JPEG"
+        dpi, ok = QInputDialog.getInt(
+            self,
+            "Exporter comme image",
+            "Résolution (ppp) :",
+            int(self.canvas.document_dpi()),
+            1,
+            2400,
+        )
+        if not ok:
+            return
+        # l'instantané est pris ici ; la suite tourne en arrière-plan
+        exporter = ImageExporter(
+            self.canvas.snapshot_image(dpi), path, fmt, self
+        )
+        dialog = QProgressDialog("Export de l'image…", "Annuler", 0, 0, self)
+        dialog.setWindowTitle("Exporter comme image")
+        dialog.setMinimumDuration(500)
+        dialog.canceled.connect(exporter.cancel)
+        exporter.progress.connect(
+            lambda done, total: (dialog.setMaximum(total), dialog.setValue(done))
+        )
+        exporter.finished.connect(dialog.reset)
+        exporter.finished.connect(lambda: self.show_status("Image exportée"))
+        exporter.canceled.connect(lambda: self.show_status("Export annulé"))
+        exporter.failed.connect(dialog.reset)
+        exporter.failed.connect(
+            lambda msg: QMessageBox.critical(
+                self, "Erreur", f"Impossible d'exporter : {msg}"
+            )
+        )
+        exporter.destroyed.connect(dialog.deleteLater)
+        exporter.start()
 
     def export_svg(self):
         path, _ = QFileDialog.getSaveFileName(
@@ -833,6 +970,15 @@ class MainWindow(QMainWindow):
     def flip_vertical(self):
         self.canvas.flip_vertical_selected()
 
+    def bring_to_front(self):
+        self.canvas.bring_to_front_selected()
+
+    def send_to_back(self):
+        self.canvas.send_to_back_selected()
+
+    def simplify_selection(self):
+        self.canvas.simplify_selected()
+
     def delete_selection(self):
         self.canvas.delete_selected()
 
@@ -883,6 +1029,9 @@ class MainWindow(QMainWindow):
     # ------------------------------------------------------------------
     def closeEvent(self, event):
         if self.maybe_save():
+            if self._saver is not None:
+                self._save_again = False
+                self._saver.wait()
             QApplication.instance().removeEventFilter(self._release_filter)
             event.accept()
         else:
@@ -914,6 +1063,11 @@ class MainWindow(QMainWindow):
             self.auto_show_inspector,
             self.float_docks,
             self.dock_title_colors,
+            self.history_depth,
+            self.history_budget,
+            self.image_cache_budget,
+            self.stroke_tolerance,
+            self.stroke_smoothing,
             self,
         )
         if dlg.exec_() == QDialog.Accepted:
@@ -932,6 +1086,17 @@ class MainWindow(QMainWindow):
             self.auto_show_inspector = dlg.get_auto_show_inspector()
             self.float_docks = dlg.get_float_docks()
             self.dock_title_colors = dlg.get_dock_title_colors()
+            self.history_depth = dlg.get_history_depth()
+            self.history_budget = dlg.get_history_budget()
+            self.canvas.set_history_limits(
+                self.history_depth, self.history_budget * 1024 * 1024
+            )
+            self.image_cache_budget = dlg.get_image_cache_budget()
+            store.set_budget(self.image_cache_budget * 1024 * 1024)
+            self.stroke_tolerance = dlg.get_stroke_tolerance()
+            self.stroke_smoothing = dlg.get_stroke_smoothing()
+            self.canvas.set_stroke_options(
+                self.stroke_tolerance, self.stroke_smoothing)
             shorts = dlg.get_shortcuts()
             for name, seq in shorts.items():
                 action = self.actions.get(name)
@@ -963,6 +1128,12 @@ class MainWindow(QMainWindow):
                 "auto_show_inspector", self.auto_show_inspector
             )
             self.settings.setValue("float_docks", self.float_docks)
+            self.settings.setValue("history_depth", self.history_depth)
+            self.settings.setValue("history_budget", self.history_budget)
+            self.settings.setValue(
+                "image_cache_budget", self.image_cache_budget)
+            self.settings.setValue("stroke_tolerance", self.stroke_tolerance)
+            self.settings.setValue("stroke_smoothing", self.stroke_smoothing)
             for name, col in self.dock_title_colors.items():
                 self.settings.setValue(
                     f"dock_title_color_{name}", col.name()
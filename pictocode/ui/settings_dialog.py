@@ -11,6 +11,7 @@ from PyQt5.QtWidgets import (
     QColorDialog,
     QComboBox,
     QSpinBox,
+    QDoubleSpinBox,
     QCheckBox,
     QLabel,
     QKeySequenceEdit,
@@ -42,6 +43,11 @@ class SettingsDialog(QDialog):
         auto_show_inspector: bool = True,
         float_docks: bool = False,
         dock_title_colors: dict[str, QColor] | None = None,
+        history_depth: int = 200,
+        history_budget: int = 64,
+        image_cache_budget: int = 256,
+        stroke_tolerance: float = 1.0,
+        stroke_smoothing: bool = False,
         parent=None,
     ):
         super().__init__(parent)
@@ -92,6 +98,32 @@ class SettingsDialog(QDialog):
         self.float_docks_chk.setChecked(bool(float_docks))
         gen_form.addRow("Fenêtres flottantes :", self.float_docks_chk)
 
+        self.history_depth_spin = QSpinBox()
+        self.history_depth_spin.setRange(1, 10000)
+        self.history_depth_spin.setValue(int(history_depth))
+        gen_form.addRow("Historique (étapes) :", self.history_depth_spin)
+
+        self.history_budget_spin = QSpinBox()
+        self.history_budget_spin.setRange(1, 4096)
+        self.history_budget_spin.setValue(int(history_budget))
+        gen_form.addRow("Mémoire historique (Mo) :", self.history_budget_spin)
+
+        self.image_cache_spin = QSpinBox()
+        self.image_cache_spin.setRange(16, 16384)
+        self.image_cache_spin.setValue(int(image_cache_budget))
+        gen_form.addRow("Cache des images (Mo) :", self.image_cache_spin)
+
+        self.stroke_tolerance_spin = QDoubleSpinBox()
+        self.stroke_tolerance_spin.setRange(0.0, 20.0)
+        self.stroke_tolerance_spin.setSingleStep(0.5)
+        self.stroke_tolerance_spin.setValue(float(stroke_tolerance))
+        gen_form.addRow(
+            "Simplification des tracés (px) :", self.stroke_tolerance_spin)
+
+        self.stroke_smoothing_chk = QCheckBox()
+        self.stroke_smoothing_chk.setChecked(bool(stroke_smoothing))
+        gen_form.addRow("Lisser les tracés :", self.stroke_smoothing_chk)
+
         self.pages.addWidget(gen)
         self.category_list.addItem("Général")
 
@@ -254,6 +286,21 @@ class SettingsDialog(QDialog):
     def get_dock_title_colors(self) -> dict[str, QColor]:
         return self.dock_title_colors
 
+    def get_history_depth(self) -> int:
+        return self.history_depth_spin.value()
+
+    def get_history_budget(self) -> int:
+        return self.history_budget_spin.value()
+
+    def get_image_cache_budget(self) -> int:
+        return self.image_cache_spin.value()
+
+    def get_stroke_tolerance(self) -> float:
+        return self.stroke_tolerance_spin.value()
+
+    def get_stroke_smoothing(self) -> bool:
+        return self.stroke_smoothing_chk.isChecked()
+
     def get_shortcuts(self) -> dict[str, str]:
         return {
             name: edit.keySequence().toString()
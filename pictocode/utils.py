@@ -124,14 +124,22 @@ def generate_pycode(shapes):
             lines.append(f"scene.addItem(tri_item{i})")
 
         elif cls == "FreehandPath":
-            path = shp.path()
-            pts = [path.elementAt(j) for j in range(path.elementCount())]
-            is_poly = len(
-                pts) > 2 and pts[0].x == pts[-1].x and pts[0].y == pts[-1].y
-            if is_poly:
+            from .geometry import bezier_segments, is_closed, points_from_coords
+
+            coords = shp.coords()
+            pts = points_from_coords(coords)
+            if shp.is_smooth() and len(pts) > 1:
+                lines.append(f"path{i} = QPainterPath()")
+                lines.append(f"path{i}.moveTo({pts[0][0]}, {pts[0][1]})")
+                lines.extend(
+                    f"path{i}.cubicTo({c1x}, {c1y}, {c2x}, {c2y}, {x}, {y})"
+                    for c1x, c1y, c2x, c2y, x, y in bezier_segments(coords)
+                )
+                if is_closed(coords):
+                    lines.append(f"path{i}.closeSubpath()")
+            elif is_closed(coords):
                 lines.append(f"poly{i} = QPolygonF([")
-                for p in pts[:-1]:
-                    lines.append(f"    QPointF({p.x}, {p.y}),")
+                lines.extend(f"    QPointF({x}, {y})," for x, y in pts[:-1])
                 lines.append("])")
                 lines.append(f"poly_item{i} = QGraphicsPolygonItem(poly{i})")
                 color = shp.pen().color().name()
@@ -150,9 +158,11 @@ def generate_pycode(shapes):
                 lines.append(f"scene.addItem(poly_item{i})")
             else:
                 lines.append(f"path{i} = QPainterPath()")
-                for idx, p in enumerate(pts):
-                    cmd = "moveTo" if idx == 0 else "lineTo"
-                    lines.append(f"path{i}.{cmd}({p.x}, {p.y})")
+                lines.extend(
+                    f"path{i}.{'moveTo' if idx == 0 else 'lineTo'}({x}, {y})"
+                    for idx, (x, y) in enumerate(pts)
+                )
+            if shp.is_smooth() or not is_closed(coords):
                 lines.append(f"path_item{i} = QGraphicsPathItem(path{i})")
                 color = shp.pen().color().name()
                 width = shp.pen().width()
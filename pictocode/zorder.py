@@ -0,0 +1,66 @@
+# pictocode/zorder.py
+"""
+Index de l'ordre d'empilement des éléments, par calque.
+
+Chaque calque garde la liste triée des ``zValue`` de ses éléments ; le
+premier et le dernier plan s'obtiennent en temps constant et un
+changement de ``zValue`` se répercute par recherche dichotomique, sans
+parcourir toute la scène.
+"""
+
+from bisect import bisect_left, insort
+
+
+class ZOrderIndex:
+    """``zValue`` triées par calque (``None`` : premier niveau de la scène)."""
+
+    def __init__(self):
+        self._values = {}
+        self._entries = {}
+
+    def __contains__(self, item) -> bool:
+        return item in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        self._values.clear()
+        self._entries.clear()
+
+    def add(self, item, layer=None):
+        """(Ré)indexe ``item`` sous ``layer`` avec sa ``zValue`` actuelle."""
+        self.remove(item)
+        z = item.zValue()
+        insort(self._values.setdefault(layer, []), z)
+        self._entries[item] = (layer, z)
+
+    def remove(self, item):
+        entry = self._entries.pop(item, None)
+        if entry is None:
+            return
+        layer, z = entry
+        values = self._values[layer]
+        del values[bisect_left(values, z)]
+        if not values:
+            del self._values[layer]
+
+    def update(self, item):
+        """Répercute un changement de ``zValue`` d'un élément indexé."""
+        entry = self._entries.get(item)
+        if entry is not None and entry[1] != item.zValue():
+            self.add(item, entry[0])
+
+    def layer_of(self, item):
+        entry = self._entries.get(item)
+        return entry[0] if entry is not None else None
+
+    def bottom(self, layer=None) -> float | None:
+        """Plus petite ``zValue`` du calque, ou ``None`` s'il est vide."""
+        values = self._values.get(layer)
+        return values[0] if values else None
+
+    def top(self, layer=None) -> float | None:
+        """Plus grande ``zValue`` du calque, ou ``None`` s'il est vide."""
+        values = self._values.get(layer)
+        return values[-1] if values else None
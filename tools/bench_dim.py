@@ -0,0 +1,68 @@
+# tools/bench_dim.py
+"""Compare l'assombrissement hors document : soustraction de chemins
+(ancienne méthode) contre quatre bandes rectangulaires (``_dim_bands``).
+
+Usage : python tools/bench_dim.py [répétitions]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtCore import QRectF, Qt
+from PyQt5.QtGui import QGuiApplication, QImage, QPainter, QPainterPath
+
+from pictocode.canvas import _DIM_COLOR, _dim_bands
+
+
+def _subtracted(painter, rect, doc):
+    painter.setPen(Qt.NoPen)
+    painter.setBrush(_DIM_COLOR)
+    outer = QPainterPath()
+    outer.addRect(rect)
+    inner = QPainterPath()
+    inner.addRect(doc)
+    painter.drawPath(outer.subtracted(inner))
+
+
+def _bands(painter, rect, bands):
+    for band in bands:
+        r = band.intersected(rect)
+        if not r.isEmpty():
+            painter.fillRect(r, _DIM_COLOR)
+
+
+def _time(fn, image, rect, arg, repeat):
+    painter = QPainter(image)
+    # même transformation qu'une vue dézoomée, centrée sur le document
+    painter.scale(image.width() / rect.width(), image.height() / rect.height())
+    painter.translate(-rect.left(), -rect.top())
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(painter, rect, arg)
+    elapsed = time.perf_counter() - start
+    painter.end()
+    return elapsed / repeat * 1000
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    app = QGuiApplication.instance() or QGuiApplication(sys.argv)
+    image = QImage(1920, 1080, QImage.Format_ARGB32_Premultiplied)
+    image.fill(Qt.white)
+    doc = QRectF(0, 0, 800, 600)
+    bands = _dim_bands(doc)
+    print(f"{'zone exposée':>20} {'soustraction':>14} {'bandes':>10}")
+    for margin in (100, 1000, 10000):
+        rect = doc.adjusted(-margin, -margin, margin, margin)
+        old = _time(_subtracted, image, rect, doc, repeat)
+        new = _time(_bands, image, rect, bands, repeat)
+        label = f"doc ± {margin}"
+        print(f"{label:>20} {old:>11.3f} ms {new:>7.3f} ms")
+    del app
+
+
+if __name__ == "__main__":
+    main()